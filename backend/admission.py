@@ -0,0 +1,272 @@
+"""
+Memory-aware admission control for booking jobs on one instance.
+
+Cloud Tasks for a popular release minute (7:00 AM) can land on the same Cloud
+Run instance together, and each job opens its own browser context(s). Enough of
+them at once can OOM the container and kill every job on it. /api/execute-job
+therefore admits a job through the process-wide AdmissionController before it
+calls execute_booking:
+
+    admit    if the job's contexts (racing.race_contexts) fit under the context
+             cap and the memory it is projected to need fits under the memory
+             cap, it runs straight away.
+    queue    otherwise it waits, first come first served, for running jobs to
+             finish. Cloud Tasks delivers a job ARM_LEAD_SECONDS before its
+             release and running jobs hold their contexts through the release,
+             so the wait runs until ADMISSION_START_MARGIN_SECONDS before the
+             job's own release (never less than ADMISSION_QUEUE_TIMEOUT_SECONDS,
+             which is also the whole wait for a job without `release_at`).
+    shed     if the queue is full or the wait runs out, admit() raises
+             Overloaded and the endpoint answers 503 with Retry-After. The job
+             is still PENDING (it's only claimed inside execute_booking), so
+             Cloud Tasks retries it, possibly on another instance.
+
+Memory is the container's cgroup working set (usage minus inactive page cache),
+or this process tree's RSS where there is no cgroup. The projection adds
+ADMISSION_CONTEXT_MEMORY_MB for every context that is admitted but not yet open,
+plus the new job's. Live contexts are counted by playwright_logic._stealth_session.
+A job is always admitted onto an idle instance, so one oversized job can't wait forever.
+
+GET /api/admission reports concurrency, queue depth, memory and counters.
+
+Configuration (environment variables):
+    ADMISSION_MAX_CONTEXTS            Browser contexts across running jobs. Default 4.
+    ADMISSION_MAX_MEMORY_MB           Memory cap. Default 85% of the cgroup limit; 0 disables the check.
+    ADMISSION_CONTEXT_MEMORY_MB       Expected memory per browser context. Default 250.
+    ADMISSION_MAX_QUEUE               Jobs allowed to wait. Default 8.
+    ADMISSION_QUEUE_TIMEOUT_SECONDS   Shortest wait before shedding. Default 20.
+    ADMISSION_START_MARGIN_SECONDS    Latest a queued job may start before its release and still arm. Default 60.
+    ADMISSION_RETRY_AFTER_SECONDS     Retry-After sent when shedding. Default 5.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+MAX_CONTEXTS = int(os.getenv("ADMISSION_MAX_CONTEXTS", "4"))
+CONTEXT_MEMORY_MB = float(os.getenv("ADMISSION_CONTEXT_MEMORY_MB", "250"))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "8"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "20"))
+START_MARGIN_SECONDS = float(os.getenv("ADMISSION_START_MARGIN_SECONDS", "60"))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+# Queued jobs re-check memory this often even if nothing finished, since it can
+# drop without a job ending (a browser recycled, a context closed early).
+_RECHECK_SECONDS = 1.0
+
+_CGROUP_FILES = (
+    # (usage, limit, stat, inactive-file key): cgroup v2, then v1
+    ("/sys/fs/cgroup/memory.current", "/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.stat", "inactive_file"),
+    ("/sys/fs/cgroup/memory/memory.usage_in_bytes", "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+     "/sys/fs/cgroup/memory/memory.stat", "total_inactive_file"),
+)
+
+_MB = 1024 * 1024
+
+
+class Overloaded(Exception):
+    """The instance can't take the job now; retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _read_int(path):
+    with open(path) as f:
+        raw = f.read().strip()
+    return None if raw == "max" else int(raw)
+
+
+def _cgroup_memory():
+    """(working set MB, limit MB or None) from the container's cgroup, or None without one."""
+    for usage_path, limit_path, stat_path, inactive_key in _CGROUP_FILES:
+        try:
+            usage = _read_int(usage_path)
+        except (OSError, ValueError):
+            continue
+        inactive = 0
+        try:
+            with open(stat_path) as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    if key == inactive_key:
+                        inactive = int(value)
+                        break
+        except (OSError, ValueError):
+            pass
+        try:
+            limit = _read_int(limit_path)
+        except (OSError, ValueError):
+            limit = None
+        if limit is not None and limit >= 1 << 50:  # v1's "unlimited"
+            limit = None
+        return max(0, usage - inactive) / _MB, (limit / _MB if limit else None)
+    return None
+
+
+def _process_tree_rss_mb():
+    """RSS of this process and all its descendants (the Playwright driver and Chromium)."""
+    parents, rss = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                for line in f:
+                    if line.startswith("PPid:"):
+                        parents[int(entry)] = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        rss[int(entry)] = int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    ours, frontier = {os.getpid()}, {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - ours
+        ours |= frontier
+    return sum(rss.get(pid, 0) for pid in ours) / 1024
+
+
+def memory_mb():
+    """(used MB, limit MB or None) for the container, falling back to the process tree."""
+    cgroup = _cgroup_memory()
+    if cgroup is not None:
+        return cgroup
+    try:
+        return _process_tree_rss_mb(), None
+    except OSError:
+        return None, None
+
+
+class AdmissionController:
+    """Admits booking jobs under context and memory caps, queueing or shedding the rest."""
+
+    def __init__(self, max_contexts=MAX_CONTEXTS, max_memory_mb=None, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS, start_margin=START_MARGIN_SECONDS):
+        self.max_contexts = max_contexts
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.start_margin = start_margin
+        if max_memory_mb is None:
+            configured = os.getenv("ADMISSION_MAX_MEMORY_MB")
+            if configured is not None:
+                max_memory_mb = float(configured)
+            else:
+                limit = memory_mb()[1]
+                max_memory_mb = limit * 0.85 if limit else 0
+        self.max_memory_mb = max_memory_mb
+        # Contexts per admission, keyed by a ticket rather than the job id so a
+        # duplicate delivery of a job can't free the slot of the one still running.
+        self.running = {}
+        self.live_contexts = 0
+        self._queue = deque()
+        self._cond = asyncio.Condition()
+        self._counts = {"admitted": 0, "queued": 0, "shed": 0}
+
+    @property
+    def reserved_contexts(self):
+        return sum(self.running.values())
+
+    def _fits(self, contexts):
+        reserved = self.reserved_contexts
+        if reserved == 0:
+            return True
+        if reserved + contexts > self.max_contexts:
+            return False
+        if self.max_memory_mb:
+            used = memory_mb()[0]
+            if used is not None:
+                unopened = max(0, reserved - self.live_contexts)
+                if used + (unopened + contexts) * CONTEXT_MEMORY_MB > self.max_memory_mb:
+                    return False
+        return True
+
+    def _shed(self, job_id, reason):
+        self._counts["shed"] += 1
+        logging.warning("Admission: shedding job %s (%s); %d running, %d queued.",
+                        job_id, reason, len(self.running), len(self._queue))
+        return Overloaded(f"Instance busy: {reason}.")
+
+    def _wait_seconds(self, release_at):
+        """How long a job releasing at `release_at` (aware datetime or None) may queue."""
+        if release_at is None:
+            return self.queue_timeout
+        return max(self.queue_timeout, release_at.timestamp() - self.start_margin - time.time())
+
+    @asynccontextmanager
+    async def admit(self, job_id, contexts=1, release_at=None):
+        """
+        Run the block once job `job_id` (needing `contexts` browser contexts and
+        releasing at `release_at`) is admitted.
+        """
+        ticket = object()
+        async with self._cond:
+            if self._queue or not self._fits(contexts):
+                if len(self._queue) >= self.max_queue:
+                    raise self._shed(job_id, f"queue full ({len(self._queue)} waiting)")
+                self._counts["queued"] += 1
+                wait = self._wait_seconds(release_at)
+                logging.info("Admission: queueing job %s behind %d running, %d queued (up to %.0fs).",
+                             job_id, len(self.running), len(self._queue), wait)
+                self._queue.append(ticket)
+                deadline = time.monotonic() + wait
+                try:
+                    while not (self._queue[0] is ticket and self._fits(contexts)):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._shed(job_id, f"no capacity within {wait:.0f}s")
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=min(remaining, _RECHECK_SECONDS))
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+            self.running[ticket] = contexts
+            self._counts["admitted"] += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.running.pop(ticket, None)
+                self._cond.notify_all()
+
+    def context_opened(self):
+        self.live_contexts += 1
+
+    def context_closed(self):
+        self.live_contexts = max(0, self.live_contexts - 1)
+
+    def stats(self):
+        """Current concurrency, queue depth, memory and counters."""
+        used, limit = memory_mb()
+        return {
+            "running_jobs": len(self.running),
+            "reserved_contexts": self.reserved_contexts,
+            "live_contexts": self.live_contexts,
+            "queue_depth": len(self._queue),
+            "memory_mb": round(used, 1) if used is not None else None,
+            "memory_limit_mb": round(limit, 1) if limit else None,
+            "limits": {
+                "max_contexts": self.max_contexts,
+                "max_memory_mb": round(self.max_memory_mb, 1) if self.max_memory_mb else None,
+                "context_memory_mb": CONTEXT_MEMORY_MB,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "start_margin_seconds": self.start_margin,
+            },
+            **self._counts,
+        }
+
+
+_controller = None
+
+
+def get_controller():
+    """The process-wide controller, created on first use."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
@@ -0,0 +1,198 @@
+"""
+Failure artifacts (error screenshots) kept out of the job documents.
+
+Booking flows capture a screenshot of the page when they fail (capture()) into
+the job's own `booking.screenshots` list, so a job only ever uploads what its
+own pages captured, even with several jobs or race contexts in one process.
+The worker then hands the newest one to the artifact store under
+`<job_id>/<name>.<ext>` and writes only a small reference (`error_screenshot`)
+and an inline thumbnail data URL (`error_thumbnail`, a few KB) to the job.
+GET /api/bookings/{job_id}/screenshot streams the full image back.
+
+Screenshots are taken over CDP (Page.captureScreenshot) so Chromium encodes
+them as WebP or JPEG directly and scales the thumbnail itself; no image
+library is needed. Other browsers fall back to Playwright's JPEG screenshot
+with no thumbnail.
+
+Stores:
+    local   files under ARTIFACT_DIR (development, debug_worker runs).
+    gcs     a Cloud Storage bucket (needs google-cloud-storage). Expire old
+            artifacts with a bucket lifecycle rule.
+
+Configuration (environment variables):
+    ARTIFACT_STORE             "gcs" or "local". Default "gcs" when ARTIFACT_BUCKET is set, else "local".
+    ARTIFACT_BUCKET            Cloud Storage bucket for the gcs store.
+    ARTIFACT_DIR               Directory for the local store. Default "job_artifacts".
+    ARTIFACT_IMAGE_FORMAT      "webp" (default) or "jpeg".
+    ARTIFACT_IMAGE_QUALITY     Encoder quality for full screenshots, 1-100. Default 70.
+    ARTIFACT_THUMBNAIL_WIDTH   Thumbnail width in pixels. Default 320; 0 disables thumbnails.
+"""
+import asyncio
+import base64
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+BUCKET = os.getenv("ARTIFACT_BUCKET", "")
+STORE = os.getenv("ARTIFACT_STORE", "gcs" if BUCKET else "local")
+LOCAL_DIR = os.getenv("ARTIFACT_DIR", "job_artifacts")
+IMAGE_FORMAT = os.getenv("ARTIFACT_IMAGE_FORMAT", "webp")
+IMAGE_QUALITY = int(os.getenv("ARTIFACT_IMAGE_QUALITY", "70"))
+THUMBNAIL_WIDTH = int(os.getenv("ARTIFACT_THUMBNAIL_WIDTH", "320"))
+THUMBNAIL_QUALITY = 50
+CAPTURE_TIMEOUT_SECONDS = 5
+
+_CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+_EXTENSIONS = {"image/webp": "webp", "image/jpeg": "jpg"}
+
+
+@dataclass
+class Screenshot:
+    """One captured page image, held in memory until the worker stores it."""
+    name: str
+    data: bytes
+    content_type: str
+    thumbnail: bytes | None = None
+    captured_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def thumbnail_url(self):
+        if not self.thumbnail:
+            return None
+        return f"data:{self.content_type};base64,{base64.b64encode(self.thumbnail).decode()}"
+
+
+async def _cdp_capture(page, image_format, quality, scale=1.0):
+    size = page.viewport_size or await page.evaluate("({width: innerWidth, height: innerHeight})")
+    cdp = await page.context.new_cdp_session(page)
+    try:
+        shot = await cdp.send("Page.captureScreenshot", {
+            "format": image_format,
+            "quality": quality,
+            "clip": {"x": 0, "y": 0, "width": size["width"], "height": size["height"], "scale": scale},
+        })
+    finally:
+        await cdp.detach()
+    return base64.b64decode(shot["data"]), size
+
+
+async def _capture(page, name):
+    image_format = IMAGE_FORMAT if IMAGE_FORMAT in _CONTENT_TYPES else "webp"
+    try:
+        data, size = await _cdp_capture(page, image_format, IMAGE_QUALITY)
+    except Exception as e:
+        logging.info("Artifacts: CDP screenshot unavailable (%s); using a JPEG page screenshot.", e)
+        data = await page.screenshot(type="jpeg", quality=IMAGE_QUALITY, animations="disabled",
+                                     timeout=CAPTURE_TIMEOUT_SECONDS * 1000)
+        return Screenshot(name, data, "image/jpeg")
+
+    thumbnail = None
+    if THUMBNAIL_WIDTH and size["width"] > THUMBNAIL_WIDTH:
+        try:
+            thumbnail, _ = await _cdp_capture(page, image_format, THUMBNAIL_QUALITY, scale=THUMBNAIL_WIDTH / size["width"])
+        except Exception as e:
+            logging.warning("Artifacts: thumbnail capture failed: %s", e)
+    return Screenshot(name, data, _CONTENT_TYPES[image_format], thumbnail)
+
+
+async def capture(page, booking, name):
+    """
+    Screenshot `page` into `booking.screenshots` (shared by the job's race
+    candidates). Never raises: a failed capture mustn't mask the booking error.
+    """
+    try:
+        shot = await asyncio.wait_for(_capture(page, name), timeout=CAPTURE_TIMEOUT_SECONDS * 2)
+    except Exception as e:
+        logging.warning("Artifacts: failed to capture %s screenshot: %s", name, e)
+        return None
+    screenshots = getattr(booking, "screenshots", None)
+    if screenshots is not None:
+        screenshots.append(shot)
+    logging.info("Artifacts: captured %s screenshot (%d KB).", name, len(shot.data) // 1024)
+    return shot
+
+
+def _key(job_id, name, content_type):
+    return f"{job_id}/{name}.{_EXTENSIONS.get(content_type, 'bin')}"
+
+
+class LocalArtifactStore:
+    """Artifacts as files under a directory."""
+
+    kind = "local"
+
+    def __init__(self, root=LOCAL_DIR):
+        self.root = root
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Artifact key outside the store: {key}")
+        return path
+
+    def put(self, key, data, content_type):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def get(self, key):
+        """The artifact's bytes, or None if it doesn't exist."""
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class GCSArtifactStore:
+    """Artifacts as objects in a Cloud Storage bucket."""
+
+    kind = "gcs"
+
+    def __init__(self, bucket=BUCKET):
+        from google.cloud import storage
+
+        if not bucket:
+            raise ValueError("ARTIFACT_BUCKET is not set")
+        self.bucket = storage.Client().bucket(bucket)
+
+    def put(self, key, data, content_type):
+        self.bucket.blob(key).upload_from_string(data, content_type=content_type)
+
+    def get(self, key):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self.bucket.blob(key).download_as_bytes()
+        except NotFound:
+            return None
+
+
+def save_screenshot(store, job_id, shot):
+    """Upload `shot` for `job_id`; returns the reference stored on the job."""
+    key = _key(job_id, shot.name, shot.content_type)
+    store.put(key, shot.data, shot.content_type)
+    return {
+        "store": store.kind,
+        "key": key,
+        "name": shot.name,
+        "content_type": shot.content_type,
+        "bytes": len(shot.data),
+        "captured_at": shot.captured_at,
+    }
+
+
+_store = None
+
+
+def get_store():
+    """The process-wide artifact store, or None if it can't be created."""
+    global _store
+    if _store is None:
+        try:
+            _store = GCSArtifactStore() if STORE == "gcs" else LocalArtifactStore()
+        except Exception as e:
+            logging.error("Artifacts: failed to create the %s artifact store: %s", STORE, e)
+            return None
+    return _store
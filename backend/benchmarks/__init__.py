@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for PinSeeker's latency-critical paths.
+
+Run from the backend/ directory, e.g.:
+    python -m benchmarks.release_timer_bench
+"""
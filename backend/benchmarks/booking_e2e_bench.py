@@ -0,0 +1,138 @@
+"""
+End-to-end booking latency against the local mock sites (benchmarks/mock_sites.py).
+
+Runs each book_* flow N times, with a fresh release instant per run, and reports
+p50/p95/p99 of:
+    live  release -> the mock server recording the confirmed reservation
+    dry   release -> the flow returning its chosen slot
+Both include the flow's deliberate post-release offset in wait_for_release.
+With --contested N the N best slots are lost to "other golfers" when booked,
+so live runs exercise the fallback to the next-best slot (slot_fallback.py);
+`tries` is the mean number of slots attempted per run.
+
+Flows:
+    cps          book_cps_golf
+    foreup       book_via_foreup_software with the HTTP engine (foreup_api.py)
+    foreup-dom   book_via_foreup_software with the engine disabled
+    eagleclub    book_via_eagleclub
+
+Usage:
+    python -m benchmarks.booking_e2e_bench --runs 10 --latency-ms 80
+    python -m benchmarks.booking_e2e_bench --flows foreup foreup-dom --modes live --pool
+    python -m benchmarks.booking_e2e_bench --modes live --contested 2
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+import foreup_api
+import playwright_logic
+from benchmarks.mock_sites import SiteState, start_server, site_urls
+from benchmarks.release_timer_bench import _percentile
+from timings import JobTimings
+
+FLOWS = {
+    "cps": ("cps", playwright_logic.book_cps_golf, True),
+    "foreup": ("foreup", playwright_logic.book_via_foreup_software, True),
+    "foreup-dom": ("foreup", playwright_logic.book_via_foreup_software, False),
+    "eagleclub": ("eagleclub", playwright_logic.book_via_eagleclub, True),
+}
+
+
+class _Booking:
+    """Stands in for worker.BookingWrapper."""
+    def __init__(self, target, release_epoch):
+        self.desired_date = target
+        self.earliest_time = dtime(7, 0)
+        self.latest_time = dtime(9, 0)
+        self.players = 4
+        self.course_name = "mock"
+        self.release_time = datetime.fromtimestamp(release_epoch, timezone.utc).isoformat()
+        self.timings = JobTimings(self.release_time)
+        self.clock_offset = 0.0
+
+
+async def _run_once(state, url, func, dry_run, arm_lead, target):
+    """
+    One booking run. Returns (ms from release to confirmation (live) or to slot
+    choice (dry), the run's booking with its timings).
+    """
+    release_epoch = time.time() + arm_lead
+    state.reset(release_epoch, target)
+    booking = _Booking(target, release_epoch)
+    await func(url, booking, "golfer@example.com", "mock-password", dry_run=dry_run, headless=True)
+    finished = time.time()
+    if dry_run:
+        return (finished - release_epoch) * 1000, booking
+    if not state.reservations:
+        raise Exception("flow reported success but the mock server recorded no reservation")
+    return (state.reservations[0]["confirmed_at"] - release_epoch) * 1000, booking
+
+
+async def _run(args):
+    state = SiteState(latency_ms=args.latency_ms, contested=args.contested)
+    server, base_url = start_server(state)
+    urls = site_urls(base_url)
+    target = date.today() + timedelta(days=args.days_ahead)
+    if args.pool:
+        from browser_pool import start_pool
+        await start_pool()
+
+    results = {}
+    try:
+        for flow in args.flows:
+            platform, func, engine = FLOWS[flow]
+            for mode in args.modes:
+                samples, tries, failures = [], [], 0
+                for _ in range(args.runs):
+                    foreup_api.ENGINE_ENABLED = engine
+                    try:
+                        ms, booking = await _run_once(state, urls[platform], func, mode == "dry",
+                                                      args.arm_lead, target)
+                        samples.append(ms)
+                        tries.append(len(booking.timings.metrics.get('slot_attempts') or []))
+                    except Exception as e:
+                        failures += 1
+                        logging.error("%s/%s run failed: %s", flow, mode, e)
+                results[(flow, mode)] = (samples, tries, failures)
+    finally:
+        server.shutdown()
+        await foreup_api.close_client()
+        if args.pool:
+            from browser_pool import stop_pool
+            await stop_pool()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end booking latency against mock sites")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--modes", nargs="+", choices=["live", "dry"], default=["live", "dry"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added server latency per API call")
+    parser.add_argument("--arm-lead", type=float, default=20.0, help="Seconds from run start to release")
+    parser.add_argument("--days-ahead", type=int, default=7, help="Target date, in days from today")
+    parser.add_argument("--pool", action="store_true", help="Borrow contexts from a warm browser pool")
+    parser.add_argument("--contested", type=int, default=0, help="Best slots lost to other golfers when booked")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = asyncio.run(_run(args))
+
+    print(f"Release -> confirmation (live) / slot chosen (dry), ms; {args.runs} runs, "
+          f"{args.latency_ms:.0f}ms server latency, {args.contested} contested slot(s)")
+    print(f"{'flow':<12}{'mode':<6}{'ok':>4}{'fail':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}{'tries':>7}")
+    for (flow, mode), (samples, tries, failures) in results.items():
+        if not samples:
+            print(f"{flow:<12}{mode:<6}{0:>4}{failures:>6}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{'-':>7}")
+            continue
+        print(f"{flow:<12}{mode:<6}{len(samples):>4}{failures:>6}{_percentile(samples, 50):>10.1f}"
+              f"{_percentile(samples, 95):>10.1f}{_percentile(samples, 99):>10.1f}{statistics.mean(samples):>10.1f}"
+              f"{statistics.mean(tries):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
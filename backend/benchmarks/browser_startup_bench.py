@@ -0,0 +1,123 @@
+"""
+Benchmark: Chromium startup cost for the default vs lean launch profile
+(browser_profile.py).
+
+Each run cold-launches Chromium with the profile's switches, opens a context
+with its viewport and navigates to the mock ForeUp booking page
+(benchmarks/mock_sites.py), then measures:
+
+    launch_ms   chromium.launch() returning
+    first_nav   launch start to the first page's `load` event
+    procs       Chromium processes running at that point
+    rss_mb      their summed resident memory (PSS where the kernel reports it,
+                so shared pages aren't counted once per process)
+
+and reports p50/p95 per profile. Linux only (reads /proc).
+
+Usage:
+    python -m benchmarks.browser_startup_bench --runs 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from playwright.async_api import async_playwright
+
+import browser_profile
+from benchmarks.mock_sites import SiteState, start_server, site_urls
+from benchmarks.release_timer_bench import _percentile
+
+
+def _children():
+    """pid -> ppid for every process."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            parents[int(entry)] = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return parents
+
+
+def _memory_kb(pid):
+    for path, key in ((f"/proc/{pid}/smaps_rollup", "Pss:"), (f"/proc/{pid}/status", "VmRSS:")):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(key):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def _chromium_footprint():
+    """(process count, MB) for Chromium processes descended from this one."""
+    parents = _children()
+    ours, frontier = set(), {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - ours
+        ours |= frontier
+    procs = []
+    for pid in ours:
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"chrom" in f.read().lower():
+                    procs.append(pid)
+        except OSError:
+            continue
+    return len(procs), sum(_memory_kb(pid) for pid in procs) / 1024
+
+
+async def _run_once(p, profile, url):
+    started = time.perf_counter()
+    browser = await p.chromium.launch(headless=True, args=browser_profile.launch_args(profile))
+    launch_ms = (time.perf_counter() - started) * 1000
+    context = await browser.new_context(viewport=browser_profile.viewport(profile))
+    page = await context.new_page()
+    await page.goto(url, wait_until="load")
+    first_nav_ms = (time.perf_counter() - started) * 1000
+    procs, rss_mb = _chromium_footprint()
+    await browser.close()
+    return {"launch_ms": launch_ms, "first_nav": first_nav_ms, "procs": procs, "rss_mb": rss_mb}
+
+
+async def _run(args):
+    server, base_url = start_server(SiteState())
+    url = site_urls(base_url)["foreup"]
+    results = {}
+    try:
+        async with async_playwright() as p:
+            for profile in args.profiles:
+                results[profile] = [await _run_once(p, profile, url) for _ in range(args.runs)]
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chromium launch profile startup benchmark")
+    parser.add_argument("--profiles", nargs="+", choices=list(browser_profile.PROFILES),
+                        default=list(browser_profile.PROFILES))
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args))
+    metrics = ("launch_ms", "first_nav", "procs", "rss_mb")
+    print(f"{args.runs} cold launches per profile; p50 / p95")
+    print(f"{'profile':<10}" + "".join(f"{m:>18}" for m in metrics))
+    for profile, runs in results.items():
+        cells = []
+        for metric in metrics:
+            values = [r[metric] for r in runs]
+            cells.append(f"{_percentile(values, 50):>9.1f} /{_percentile(values, 95):>7.1f}")
+        print(f"{profile:<10}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark: stale-job cron, full PENDING scan vs indexed release_at range query.
+
+Seeds N PENDING `cronbench-*` jobs into tee_time_jobs (default 100k), of which
+--stale released more than 5 minutes ago and the rest over the next 30 days,
+then times one cron pass per strategy:
+
+    scan      the old /api/cron: stream every PENDING job, parse each
+              release_time with fromisoformat, update stale ones one by one
+    indexed   JobStore.fail_stale: `status == PENDING AND release_at < cutoff`
+              (keys only), failed through one BulkWriter
+
+The stale jobs are put back to PENDING before every run. Reports per strategy
+the documents read, jobs failed and p50/max wall time. Seeds and deletes its
+documents through a BulkWriter, so it refuses to run without
+FIRESTORE_EMULATOR_HOST unless --allow-production is given (which would also
+need the status/release_at index from firestore.indexes.json deployed).
+
+Usage:
+    gcloud emulators firestore start --host-port=localhost:8081 &
+    FIRESTORE_EMULATOR_HOST=localhost:8081 GOOGLE_CLOUD_PROJECT=demo \\
+        python -m benchmarks.cron_scan_bench --jobs 100000 --stale 200 --runs 3
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+from google.cloud import firestore
+
+from benchmarks.release_timer_bench import _percentile
+from job_store import COLLECTION, JobStore
+
+STALE_AFTER = datetime.timedelta(minutes=5)
+FAILED = {"status": "FAILED", "result_log": "Missed release window (benchmark)"}
+
+
+def _job_ids(count):
+    return [f"cronbench-{i:06d}" for i in range(count)]
+
+
+def _seed(client, job_ids, stale, now):
+    writer = client.bulk_writer()
+    for i, job_id in enumerate(job_ids):
+        if i < stale:
+            release = now - STALE_AFTER - datetime.timedelta(minutes=1 + i % 60)
+        else:
+            release = now + datetime.timedelta(minutes=1 + (i * 7) % (30 * 24 * 60))
+        writer.set(client.collection(COLLECTION).document(job_id), {
+            "id": job_id,
+            "status": "PENDING",
+            "uid": "cronbench",
+            "course_name": "Benchmark Links",
+            "desired_date": release.date().isoformat(),
+            "earliest_time": "07:00",
+            "latest_time": "11:00",
+            "players": 4,
+            "release_time": release.isoformat(),
+            "release_at": release,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        })
+    writer.close()
+
+
+def _reset(client, job_ids):
+    writer = client.bulk_writer()
+    for job_id in job_ids:
+        writer.update(client.collection(COLLECTION).document(job_id), {"status": "PENDING"})
+    writer.close()
+
+
+def _delete(client, job_ids):
+    writer = client.bulk_writer()
+    for job_id in job_ids:
+        writer.delete(client.collection(COLLECTION).document(job_id))
+    writer.close()
+
+
+async def _scan(store, now):
+    """The pre-release_at cron: returns (documents read, jobs failed)."""
+    read, failed = 0, []
+    for job_id, job_data in await store.pending():
+        read += 1
+        release_time = datetime.datetime.fromisoformat(job_data['release_time'])
+        if (release_time - now).total_seconds() <= -STALE_AFTER.total_seconds():
+            await store.update(job_id, FAILED)
+            failed.append(job_id)
+    return read, failed
+
+
+async def _indexed(store, now):
+    failed = await store.fail_stale(now - STALE_AFTER, FAILED)
+    # The range query returns exactly the stale jobs, so that's all it reads.
+    return len(failed), failed
+
+
+async def _run(args):
+    sync_client = firestore.Client()
+    store = JobStore(firestore.AsyncClient())
+    job_ids = _job_ids(args.jobs)
+    stale_ids = job_ids[:args.stale]
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    started = time.perf_counter()
+    await asyncio.to_thread(_seed, sync_client, job_ids, args.stale, now)
+    print(f"Seeded {args.jobs} PENDING jobs ({args.stale} stale) in {time.perf_counter() - started:.1f}s")
+
+    strategies = {"scan": _scan, "indexed": _indexed}
+    results = {}
+    try:
+        for name in args.modes:
+            runs = []
+            for _ in range(args.runs):
+                await asyncio.to_thread(_reset, sync_client, stale_ids)
+                started = time.perf_counter()
+                read, failed = await strategies[name](store, datetime.datetime.now(datetime.timezone.utc))
+                runs.append(((time.perf_counter() - started) * 1000, read, len(failed)))
+            results[name] = runs
+    finally:
+        if not args.keep:
+            await asyncio.to_thread(_delete, sync_client, job_ids)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stale-job cron: full PENDING scan vs indexed release_at query")
+    parser.add_argument("--modes", nargs="+", choices=["scan", "indexed"], default=["scan", "indexed"])
+    parser.add_argument("--jobs", type=int, default=100_000, help="PENDING jobs to seed")
+    parser.add_argument("--stale", type=int, default=200, help="How many of them are past their release")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded jobs in place afterwards")
+    parser.add_argument("--allow-production", action="store_true",
+                        help="Run against real Firestore when FIRESTORE_EMULATOR_HOST isn't set")
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST") and not args.allow_production:
+        sys.exit("Set FIRESTORE_EMULATOR_HOST (or pass --allow-production) to run the benchmark.")
+
+    results = asyncio.run(_run(args))
+    print(f"{args.jobs} PENDING jobs, {args.stale} stale; {args.runs} cron runs per strategy")
+    print(f"{'strategy':<10}{'docs read':>11}{'failed':>8}{'p50 ms':>10}{'max ms':>10}")
+    for name, runs in results.items():
+        elapsed = [run[0] for run in runs]
+        _, read, failed = runs[-1]
+        print(f"{name:<10}{read:>11}{failed:>8}{_percentile(elapsed, 50):>10.1f}{max(elapsed):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Date navigation cost: direct (date_nav.py) versus month-arrow clicking.
+
+Runs the CPS and ForeUp DOM flows in dry-run mode against the local mock sites
+(benchmarks/mock_sites.py) with DATE_NAV_DIRECT on and off, for a target date
+some months ahead, and reports p50/p95 of the two navigation legs recorded in
+each run's `date_nav` metric:
+    arm   reaching the target month before the release (deep link / picker API vs arrows)
+    fire  loading the target day's tee sheet after the release (direct click vs month toggle)
+plus the per-leg time saved at p50.
+
+Usage:
+    python -m benchmarks.date_nav_bench --runs 10 --days-ahead 70 --latency-ms 80
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, timedelta
+
+import date_nav
+import foreup_api
+import playwright_logic
+from benchmarks.booking_e2e_bench import _run_once
+from benchmarks.mock_sites import SiteState, start_server, site_urls
+from benchmarks.release_timer_bench import _percentile
+
+FLOWS = {
+    "cps": ("cps", playwright_logic.book_cps_golf),
+    "foreup-dom": ("foreup", playwright_logic.book_via_foreup_software),
+}
+
+
+async def _run(args):
+    target = date.today() + timedelta(days=args.days_ahead)
+    state = SiteState(latency_ms=args.latency_ms, target=target)
+    server, base_url = start_server(state)
+    urls = site_urls(base_url)
+    foreup_api.ENGINE_ENABLED = False
+
+    results = {}
+    try:
+        for flow in args.flows:
+            platform, func = FLOWS[flow]
+            for direct in (True, False):
+                date_nav.ENABLED = direct
+                legs = {"arm": [], "fire": []}
+                methods = set()
+                for _ in range(args.runs):
+                    try:
+                        _, booking = await _run_once(state, urls[platform], func, True, args.arm_lead, target)
+                    except Exception as e:
+                        logging.error("%s run failed: %s", flow, e)
+                        continue
+                    report = booking.timings.metrics.get('date_nav') or {}
+                    for leg in legs:
+                        if report.get(f"{leg}_ms") is not None:
+                            legs[leg].append(report[f"{leg}_ms"])
+                            methods.add(report[leg])
+                results[(flow, direct)] = (legs, sorted(methods))
+    finally:
+        server.shutdown()
+    return target, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct vs arrow-click date navigation")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--days-ahead", type=int, default=70, help="Target date, in days from today")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added server latency per API call")
+    parser.add_argument("--arm-lead", type=float, default=20.0, help="Seconds from run start to release")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    target, results = asyncio.run(_run(args))
+
+    print(f"Date navigation to {target} ({date_nav.months_ahead(target)} month(s) ahead), ms; {args.runs} runs")
+    print(f"{'flow':<12}{'path':<8}{'arm p50':>10}{'arm p95':>10}{'fire p50':>10}{'fire p95':>10}  methods")
+    for (flow, direct), (legs, methods) in results.items():
+        cells = []
+        for leg in ("arm", "fire"):
+            for pct in (50, 95):
+                cells.append(f"{_percentile(legs[leg], pct):>10.1f}" if legs[leg] else f"{'-':>10}")
+        print(f"{flow:<12}{'direct' if direct else 'arrows':<8}{''.join(cells)}  {', '.join(methods)}")
+    for flow in args.flows:
+        direct, arrows = results.get((flow, True)), results.get((flow, False))
+        if not (direct and arrows):
+            continue
+        saved = []
+        for leg in ("arm", "fire"):
+            if direct[0][leg] and arrows[0][leg]:
+                saved.append(f"{leg} {_percentile(arrows[0][leg], 50) - _percentile(direct[0][leg], 50):+.1f}ms")
+        print(f"{flow}: saved at p50 — {', '.join(saved) or 'n/a'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Local stand-in for ForeUp's booking API that replays recorded responses.
+
+Serves the JSON in benchmarks/fixtures/foreup/ on the same paths the SPA (and
+foreup_api.py) call, with optional added latency and a "taken" mode where the
+pending reservation is rejected as if another golfer won the slot.
+
+Usage:
+    # Serve on :8765 and point the engine at it
+    python -m benchmarks.foreup_replay --port 8765
+    FOREUP_API_BASE=http://127.0.0.1:8765 python replicate_playwright.py ...
+
+    # Self-check: drive foreup_api against the stand-in (dry run, live, slot taken)
+    python -m benchmarks.foreup_replay --check
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+from datetime import date, time as dtime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "foreup")
+
+ROUTES = {
+    ("GET", "/index.php/api/booking/times"): "times.json",
+    ("POST", "/index.php/api/booking/users/login"): "login.json",
+    ("POST", "/index.php/api/booking/pending_reservation"): "pending_reservation.json",
+    ("POST", "/index.php/api/booking/users/reservations"): "reservations.json",
+}
+
+
+def _load(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+def make_handler(latency_ms=0.0, slot_taken=False):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        requests_seen = []
+
+        def _serve(self, method):
+            path = urlsplit(self.path).path
+            if method == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+            ReplayHandler.requests_seen.append((method, path))
+            fixture = ROUTES.get((method, path))
+            if fixture == "pending_reservation.json" and slot_taken:
+                fixture = "pending_reservation_taken.json"
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            if fixture is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = _load(fixture)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return ReplayHandler
+
+
+def start_server(port=0, latency_ms=0.0, slot_taken=False):
+    """Start the stand-in in a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, slot_taken))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class _Booking:
+    desired_date = date(2026, 6, 13)
+    earliest_time = dtime(7, 0)
+    latest_time = dtime(9, 0)
+    players = 4
+
+
+async def _check():
+    import foreup_api
+
+    def session_for(base_url):
+        return foreup_api.ForeUpSession(base_url, "19530", "1791", "3046", jwt="replay-token")
+
+    server, base_url = start_server()
+    try:
+        result = await foreup_api.book_via_api(session_for(base_url), _Booking(), dry_run=True)
+        assert result == "Dry run success at 7:10 am", result
+        print(f"dry run: {result}")
+
+        start = time.perf_counter()
+        result = await foreup_api.book_via_api(session_for(base_url), _Booking(), dry_run=False)
+        assert result.startswith("Success!"), result
+        print(f"live:    {result} ({(time.perf_counter() - start) * 1000:.1f}ms)")
+    finally:
+        server.shutdown()
+
+    server, base_url = start_server(slot_taken=True)
+    try:
+        try:
+            await foreup_api.book_via_api(session_for(base_url), _Booking(), dry_run=False)
+            raise AssertionError("expected SlotUnavailable")
+        except foreup_api.SlotUnavailable as e:
+            print(f"taken:   SlotUnavailable({e})")
+    finally:
+        server.shutdown()
+        await foreup_api.close_client()
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ForeUp booking API replay server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added server latency per request")
+    parser.add_argument("--slot-taken", action="store_true", help="Reject pending reservations as already taken")
+    parser.add_argument("--check", action="store_true", help="Run the engine against the stand-in and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        asyncio.run(_check())
+        return
+
+    server, base_url = start_server(args.port, args.latency_ms, args.slot_taken)
+    print(f"ForeUp replay server listening on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: event-loop lag under Firestore load, sync client vs JobStore.
+
+Simulates a burst of API traffic on the event loop the booking flows share: C
+concurrent "requests", each reading a job, updating it and, every tenth one,
+querying the PENDING jobs (like /api/cron), N in total. Meanwhile a probe task
+sleeps 5ms at a time and records how late it wakes up, which is exactly the
+delay a release timer (release_timer.py) handing off to the loop would see.
+
+    sync    the old way: firestore.Client calls made directly in the coroutines
+    async   job_store.JobStore on firestore.AsyncClient
+
+Reports throughput and p50/p99/max loop lag per mode. Uses throwaway
+`loadtest-*` documents in tee_time_jobs and deletes them afterwards, so it
+refuses to run without FIRESTORE_EMULATOR_HOST unless --allow-production is given.
+
+Usage:
+    gcloud emulators firestore start --host-port=localhost:8081 &
+    FIRESTORE_EMULATOR_HOST=localhost:8081 GOOGLE_CLOUD_PROJECT=demo \\
+        python -m benchmarks.loop_lag_bench --requests 400 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from google.cloud import firestore
+
+from benchmarks.release_timer_bench import _percentile
+from job_store import COLLECTION, JobStore
+
+PROBE_INTERVAL = 0.005
+
+
+async def _probe(stop, lags):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+def _sync_request(client):
+    async def request(i, job_id):
+        ref = client.collection(COLLECTION).document(job_id)
+        ref.get()
+        ref.update({"updated_at": time.time()})
+        if i % 10 == 0:
+            list(client.collection(COLLECTION).where('status', '==', 'PENDING').stream())
+    return request
+
+
+def _async_request(store):
+    async def request(i, job_id):
+        await store.get(job_id)
+        await store.update(job_id, {"updated_at": time.time()})
+        if i % 10 == 0:
+            await store.pending()
+    return request
+
+
+async def _load(request, job_ids, total, concurrency):
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, lags))
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await request(i, job_ids[i % len(job_ids)])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return total / elapsed, lags
+
+
+async def _run(args):
+    sync_client = firestore.Client()
+    store = JobStore(firestore.AsyncClient())
+    job_ids = [f"loadtest-{i}" for i in range(args.docs)]
+    for job_id in job_ids:
+        await store.create(job_id, {"id": job_id, "status": "PENDING", "uid": "loadtest", "updated_at": time.time()})
+    results = {}
+    try:
+        for mode in args.modes:
+            request = _sync_request(sync_client) if mode == "sync" else _async_request(store)
+            results[mode] = await _load(request, job_ids, args.requests, args.concurrency)
+    finally:
+        for job_id in job_ids:
+            await store.delete(job_id)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag under Firestore load: sync client vs JobStore")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--docs", type=int, default=50, help="Throwaway job documents to spread the load over")
+    parser.add_argument("--allow-production", action="store_true",
+                        help="Run against real Firestore when FIRESTORE_EMULATOR_HOST isn't set")
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST") and not args.allow_production:
+        sys.exit("Set FIRESTORE_EMULATOR_HOST (or pass --allow-production) to run the load test.")
+
+    results = asyncio.run(_run(args))
+    print(f"{args.requests} requests, {args.concurrency} concurrent; loop lag ms (probe every {PROBE_INTERVAL * 1000:.0f}ms)")
+    print(f"{'mode':<8}{'req/s':>9}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}")
+    for mode, (throughput, lags) in results.items():
+        print(f"{mode:<8}{throughput:>9.1f}{_percentile(lags, 50):>10.2f}{_percentile(lags, 99):>10.2f}{max(lags):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
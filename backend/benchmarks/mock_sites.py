@@ -0,0 +1,253 @@
+"""
+Local stand-in booking sites for end-to-end benchmarks.
+
+Serves one origin with three mock platforms whose DOM and XHRs match what the
+flows in playwright_logic.py target:
+
+    CPS Golf     /onlineresweb/search-teetime    (login, ngx date picker, checkout steps)
+    ForeUp       /index.php/booking/19530/1791   (booking classes, datepicker, booking modal, JSON API)
+    Eagle Club   /eagle/#/tee-slot               (login, day strip, reservation modal)
+
+Every site keeps the target date locked and its tee sheet empty until the
+configured release instant, and every API call pays the configured server
+latency. Confirmed reservations are recorded with their server-side arrival
+time so a benchmark can measure release-to-confirmation.
+
+With `contested=N`, the N best slots for a 4-player 7-9am booking are still
+listed on the sheet but rejected as "no longer available" when booked, as if
+other golfers won them between the sheet loading and our confirm.
+
+Usage:
+    # Serve on :8766, releasing 60s from now, 7 days out
+    python -m benchmarks.mock_sites --port 8766 --release-in 60 --days-ahead 7 --latency-ms 80
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "mock_sites")
+
+COURSE_ID = "19530"
+SCHEDULE_ID = "1791"
+
+# (hour, minute, open spots) for every tee time on the mock sheet. The first
+# in-window times are short-handed so a 4-player booking has to skip them.
+SHEET = [(6, 30, 4), (6, 40, 4), (6, 50, 4), (7, 0, 2), (7, 10, 4), (7, 20, 3), (7, 30, 4),
+         (7, 40, 4), (7, 50, 1), (8, 0, 4), (8, 10, 4), (8, 20, 4), (8, 30, 2), (8, 40, 4),
+         (8, 50, 4), (9, 0, 4), (9, 10, 4), (9, 20, 4), (9, 30, 3), (9, 40, 4), (9, 50, 4)]
+
+PAGES = {
+    "/onlineresweb/search-teetime": "cps.html",
+    "/index.php/booking/": "foreup.html",
+    "/eagle/": "eagleclub.html",
+}
+
+
+class SiteState:
+    """Release instant, target date and latency shared by all three mock sites."""
+
+    def __init__(self, release_epoch=None, target=None, latency_ms=0.0, contested=0):
+        self.lock = threading.Lock()
+        self.latency_ms = latency_ms
+        self.contested = contested
+        self.reset(release_epoch or time.time(), target or date.today() + timedelta(days=7))
+
+    def reset(self, release_epoch, target):
+        """Re-arm the sites for a new run: new release instant, no reservations, all slots open."""
+        with self.lock:
+            self.release_epoch = release_epoch
+            self.target = target
+            self.reservations = []
+            self.taken = set()
+            window = [datetime(target.year, target.month, target.day, h, m) for h, m, spots in SHEET
+                      if (7, 0) <= (h, m) <= (9, 0) and spots >= 4]
+            self.lost = set(window[:self.contested])
+
+    def released(self):
+        return time.time() >= self.release_epoch
+
+    def sheet(self, day):
+        """[(datetime, open spots)] for `day`; empty for the target date until release."""
+        if day == self.target and not self.released():
+            return []
+        with self.lock:
+            taken = set(self.taken)
+        return [(datetime(day.year, day.month, day.day, h, m), spots) for h, m, spots in SHEET
+                if datetime(day.year, day.month, day.day, h, m) not in taken]
+
+    def book(self, platform, start):
+        """Record a confirmed reservation. Returns False if the slot was already taken."""
+        with self.lock:
+            if start in self.taken or start in self.lost:
+                return False
+            self.taken.add(start)
+            self.reservations.append({"platform": platform, "start": start, "confirmed_at": time.time()})
+            return True
+
+    def config_js(self):
+        return json.dumps({
+            "release": int(self.release_epoch * 1000),
+            "target": self.target.isoformat(),
+            "today": date.today().isoformat(),
+            "course_id": COURSE_ID,
+            "schedule_id": SCHEDULE_ID,
+        })
+
+
+def _foreup_time(start, spots):
+    return {
+        "time": start.strftime("%Y-%m-%d %H:%M"),
+        "course_id": int(COURSE_ID),
+        "schedule_id": int(SCHEDULE_ID),
+        "teesheet_side_id": 2401,
+        "available_spots": spots,
+        "holes": 18,
+        "booking_class_id": 3046,
+        "green_fee": 38,
+        "cart_fee": 22,
+    }
+
+
+def make_handler(state):
+    class MockSiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, content_type="application/json", headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _page(self, name):
+            with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+                html = f.read().replace("{{CONFIG}}", state.config_js())
+            self._send(200, html.encode(), "text/html; charset=utf-8")
+
+        def _body(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if "json" in (self.headers.get("Content-Type") or ""):
+                return json.loads(raw or b"{}")
+            return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if "/api/" not in parts.path:
+                for prefix, name in PAGES.items():
+                    if parts.path.startswith(prefix):
+                        return self._page(name)
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            self._api("GET", parts.path, query)
+
+        def do_POST(self):
+            self._api("POST", urlsplit(self.path).path, self._body())
+
+        def _api(self, method, path, params):
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+            route = (method, path)
+
+            # --- CPS Golf ---
+            if route == ("POST", "/onlineresweb/api/login"):
+                return self._send(200, {"success": True})
+            if route == ("GET", "/onlineres/onlinereservation/TeeTimes"):
+                day = date.fromisoformat(params["searchDate"])
+                return self._send(200, {"content": [
+                    {"startTime": start.strftime("%Y-%m-%dT%H:%M:%S"), "availablePlayers": spots, "price": 42}
+                    for start, spots in state.sheet(day)]})
+            if route == ("POST", "/onlineresweb/api/reservation"):
+                start = datetime.strptime(params["startTime"], "%Y-%m-%dT%H:%M:%S")
+                if not state.book("cps", start):
+                    return self._send(200, {"success": False, "message": "This tee time is no longer available."})
+                return self._send(200, {"success": True, "confirmationNumber": f"CPS{start:%m%d%H%M}"})
+
+            # --- ForeUp ---
+            if route == ("POST", "/index.php/api/booking/users/login"):
+                return self._send(200, {"first_name": "Mock", "jwt": "mock.jwt.token", "logged_in": True},
+                                  headers={"Set-Cookie": "PHPSESSID=mock-session; Path=/"})
+            if route == ("GET", "/index.php/api/booking/times"):
+                day = datetime.strptime(params["date"], "%m-%d-%Y").date()
+                return self._send(200, [_foreup_time(start, spots) for start, spots in state.sheet(day)])
+            if route == ("POST", "/index.php/api/booking/pending_reservation"):
+                start = datetime.strptime(params["time"], "%Y-%m-%d %H:%M")
+                if start in state.taken or start in state.lost:
+                    return self._send(200, {"success": False, "msg": "Time is no longer available"})
+                return self._send(200, {"success": True, "reservation_id": f"TTID_{start:%m%d%H%M}"})
+            if route == ("POST", "/index.php/api/booking/users/reservations"):
+                start = datetime.strptime(params["time"], "%Y-%m-%d %H:%M")
+                if not state.book("foreup", start):
+                    return self._send(409, {"success": False, "msg": "Time is no longer available"})
+                return self._send(200, {"TTID": params.get("pending_reservation_id"), "time": params["time"]})
+
+            # --- Eagle Club ---
+            if route == ("POST", "/eagle/api/login"):
+                return self._send(200, {"success": True})
+            if route == ("GET", "/eagle/api/tee-slots"):
+                day = date.fromisoformat(params["date"])
+                return self._send(200, {"data": {"teeSlots": [
+                    {"teeTime": start.strftime("%Y-%m-%dT%H:%M:%S"), "availableSpots": spots, "rate": 45}
+                    for start, spots in state.sheet(day)]}})
+            if route == ("POST", "/eagle/api/reservations"):
+                start = datetime.strptime(params["teeTime"], "%Y-%m-%dT%H:%M:%S")
+                if not state.book("eagleclub", start):
+                    return self._send(200, {"success": False, "message": "Tee time unavailable."})
+                return self._send(200, {"success": True, "message": f"Reservation confirmed for {start:%I:%M %p}."})
+
+            self._send(404, {"error": f"no mock route for {method} {path}"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return MockSiteHandler
+
+
+def start_server(state, port=0):
+    """Start the mock sites in a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def site_urls(base_url):
+    """Booking URLs for each mock platform, shaped like the real ones in course_config.py."""
+    return {
+        "cps": f"{base_url}/onlineresweb/search-teetime?TeeOffTimeMin=0&TeeOffTimeMax=23.999722222222225",
+        "foreup": f"{base_url}/index.php/booking/{COURSE_ID}/{SCHEDULE_ID}#/teetimes",
+        "eagleclub": f"{base_url}/eagle/#/tee-slot?dbname=mock",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock CPS / ForeUp / Eagle Club booking sites")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--release-in", type=float, default=60.0, help="Seconds from now until the tee sheet opens")
+    parser.add_argument("--days-ahead", type=int, default=7, help="Target date, in days from today")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added server latency per API call")
+    parser.add_argument("--contested", type=int, default=0, help="Best slots that are lost to other golfers when booked")
+    args = parser.parse_args()
+
+    state = SiteState(time.time() + args.release_in, date.today() + timedelta(days=args.days_ahead), args.latency_ms,
+                      args.contested)
+    server, base_url = start_server(state, args.port)
+    print(f"Mock booking sites on {base_url}, releasing {state.target} at "
+          f"{datetime.fromtimestamp(state.release_epoch):%H:%M:%S} (Ctrl+C to stop)")
+    for platform, url in site_urls(base_url).items():
+        print(f"  {platform:<10} {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
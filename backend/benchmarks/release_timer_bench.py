@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: release trigger firing error under event-loop load.
+
+Compares the legacy wait_for_release fine stage (poll datetime.now() every
+asyncio.sleep(0.005)) against ReleaseTimer. Background coroutines hog the loop
+in short CPU bursts to mimic Playwright/Firestore traffic from other jobs.
+
+"thread" is when the timer thread fired; "loop" is when the awaiting coroutine
+actually resumed, which is what the booking flow experiences.
+
+Usage:
+    python -m benchmarks.release_timer_bench --trials 50 --load 8
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from release_timer import ReleaseTimer
+
+
+async def _legacy_wait(target_epoch):
+    while time.time() < target_epoch:
+        await asyncio.sleep(0.005)
+
+
+async def _loop_hog(stop, burst_ms):
+    """Occupy the event loop in CPU bursts of up to burst_ms."""
+    while not stop.is_set():
+        end = time.perf_counter() + random.uniform(0, burst_ms) / 1000
+        while time.perf_counter() < end:
+            pass
+        # Yield like an I/O-bound task would between bursts of work.
+        await asyncio.sleep(0.001)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def _run(trials, load, burst_ms, lead):
+    stop = asyncio.Event()
+    hogs = [asyncio.create_task(_loop_hog(stop, burst_ms)) for _ in range(load)]
+    results = {"legacy 5ms poll": [], "ReleaseTimer (loop)": [], "ReleaseTimer (thread)": []}
+    try:
+        for _ in range(trials):
+            target = time.time() + lead
+            await _legacy_wait(target)
+            results["legacy 5ms poll"].append((time.time() - target) * 1000)
+
+            target = time.time() + lead
+            timer = ReleaseTimer(target, handoff_seconds=lead / 2)
+            report = await timer.wait()
+            results["ReleaseTimer (loop)"].append(report["loop_error_ms"])
+            results["ReleaseTimer (thread)"].append(report["thread_error_ms"])
+    finally:
+        stop.set()
+        await asyncio.gather(*hogs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Release trigger jitter benchmark")
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--load", type=int, default=8, help="Number of loop-hogging coroutines")
+    parser.add_argument("--burst-ms", type=float, default=4.0, help="Max CPU burst per hog iteration")
+    parser.add_argument("--lead", type=float, default=0.2, help="Seconds from scheduling to target per trial")
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args.trials, args.load, args.burst_ms, args.lead))
+
+    print(f"Firing error (ms) over {args.trials} trials, {args.load} loop hogs, bursts <= {args.burst_ms}ms")
+    print(f"{'strategy':<24}{'p50':>10}{'p99':>10}{'max':>10}{'mean':>10}")
+    for name, errors in results.items():
+        print(f"{name:<24}{_percentile(errors, 50):>10.3f}{_percentile(errors, 99):>10.3f}"
+              f"{max(errors):>10.3f}{statistics.mean(errors):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark: page-ready time with no blocking, the old Python route handler, and
+browser-level blocking (request_blocking.py).
+
+Serves a synthetic booking page that, like the real ones, pulls in images, web
+fonts and an analytics script next to the XHRs that matter, then fires a burst
+of tee-sheet XHRs and marks itself ready once they have all answered. Each mode
+loads it `--runs` times in a fresh context:
+
+    none        everything loads
+    route       context.route("**/*", ...) aborting images/media/fonts in Python (the
+                old _new_context); every request, XHRs included, round-trips to Python
+    setblocked  imagesEnabled=false at launch + Network.enable and
+                Network.setBlockedURLs on a CDP session per page
+    native      imagesEnabled=false at launch + request_blocking.block(): Fetch.enable
+                pausing only the blocked requests
+
+and reports p50/p95 of page-ready time and of the tee-sheet XHR duration as the
+page measured it, plus, per page load, how many route callbacks and CDP events
+reached Python and how many images/fonts/analytics scripts the server still
+served (0 means blocking took effect).
+
+Usage:
+    python -m benchmarks.request_blocking_bench --runs 10 --images 40 --fonts 6 --xhrs 8
+"""
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright
+
+import request_blocking
+from benchmarks.release_timer_bench import _percentile
+
+# The synthetic analytics script is served locally, so block it by path too.
+LOCAL_ANALYTICS = "*/analytics/*"
+
+
+def _page_html(images, fonts, xhrs):
+    faces = "".join(f"@font-face {{ font-family: f{i}; src: url('/font/f{i}.woff2') format('woff2'); }}"
+                    for i in range(fonts))
+    texts = "".join(f"<p style='font-family: f{i}'>Tee times</p>" for i in range(fonts))
+    imgs = "".join(f"<img src='/img/{i}.png' width='40' height='40'>" for i in range(images))
+    return f"""<html><head><style>{faces}</style>
+<script src="/analytics/gtm.js"></script></head>
+<body>{texts}{imgs}
+<script>
+document.addEventListener('DOMContentLoaded', async () => {{
+    const calls = [];
+    for (let i = 0; i < {xhrs}; i++) calls.push(fetch('/api/sheet?i=' + i).then(r => r.json()));
+    await Promise.all(calls);
+    const sheet = performance.getEntriesByType('resource').filter(e => e.name.includes('/api/sheet'));
+    window.__sheetMs = sheet.map(e => e.duration);
+    window.__ready = true;
+}});
+</script></body></html>"""
+
+
+def _start_server(args, served):
+    html = _page_html(args.images, args.fonts, args.xhrs).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type, delay_ms):
+            time.sleep(delay_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/page":
+                self._send(html, "text/html", 0)
+            elif path.startswith("/api/"):
+                self._send(b'{"times": []}', "application/json", args.api_ms)
+            elif path.startswith("/analytics/"):
+                served[0] += 1
+                self._send(b"window.dataLayer = window.dataLayer || [];", "application/javascript", args.asset_ms)
+            elif path.startswith("/img/"):
+                served[0] += 1
+                self._send(b"\x89PNG" + b"\0" * 2048, "image/png", args.asset_ms)
+            elif path.startswith("/font/"):
+                served[0] += 1
+                self._send(b"\0" * 16384, "font/woff2", args.asset_ms)
+            else:
+                self.send_error(404)
+
+        def log_message(self, fmt, *a):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/page"
+
+
+def _count_events(cdp, counter):
+    """Count every CDP event the session delivers to Python, whatever its method."""
+    def count(params):
+        counter[0] += 1
+    cdp.on("event", count)
+
+
+async def _load(browser, url, mode, counter):
+    context = await browser.new_context()
+    if mode == "route":
+        async def abort_heavy_requests(route):
+            counter[0] += 1
+            if route.request.resource_type in ["image", "media", "font"]:
+                await route.abort()
+            else:
+                await route.continue_()
+        await context.route("**/*", abort_heavy_requests)
+    page = await context.new_page()
+    patterns = request_blocking.BLOCKED_URL_PATTERNS + [LOCAL_ANALYTICS]
+    if mode == "setblocked":
+        cdp = await context.new_cdp_session(page)
+        _count_events(cdp, counter)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": patterns})
+    elif mode == "native":
+        # The block list is set up before the first navigation, so no event can arrive before we count.
+        cdp = await request_blocking.block(page, patterns)
+        if cdp is None:
+            raise RuntimeError("request_blocking.block() failed; is REQUEST_BLOCKING=0?")
+        _count_events(cdp, counter)
+    started = time.perf_counter()
+    await page.goto(url, wait_until="commit")
+    await page.wait_for_function("window.__ready === true", timeout=30000)
+    ready_ms = (time.perf_counter() - started) * 1000
+    sheet_ms = await page.evaluate("window.__sheetMs")
+    await context.close()
+    return ready_ms, sheet_ms
+
+
+async def _run(args):
+    served = [0]
+    server, url = _start_server(args, served)
+    results = {}
+    try:
+        async with async_playwright() as p:
+            for mode in args.modes:
+                launch_args = request_blocking.LAUNCH_ARGS if mode in ("setblocked", "native") else []
+                browser = await p.chromium.launch(headless=True, args=launch_args)
+                counter = [0]
+                ready, sheet = [], []
+                await _load(browser, url, mode, [0])  # warm-up
+                served[0] = 0
+                for _ in range(args.runs):
+                    ready_ms, sheet_ms = await _load(browser, url, mode, counter)
+                    ready.append(ready_ms)
+                    sheet.extend(sheet_ms)
+                await browser.close()
+                results[mode] = (ready, sheet, counter[0] / args.runs, served[0] / args.runs)
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request blocking: none vs Python route vs browser-level")
+    parser.add_argument("--modes", nargs="+", choices=["none", "route", "setblocked", "native"],
+                        default=["none", "route", "setblocked", "native"])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--fonts", type=int, default=6)
+    parser.add_argument("--xhrs", type=int, default=8)
+    parser.add_argument("--asset-ms", type=float, default=40.0, help="Server delay per image/font/script")
+    parser.add_argument("--api-ms", type=float, default=20.0, help="Server delay per tee-sheet XHR")
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args))
+    print(f"{args.images} images, {args.fonts} fonts, 1 analytics script, {args.xhrs} XHRs; {args.runs} runs")
+    print(f"{'mode':<12}{'ready p50':>11}{'ready p95':>11}{'xhr p50':>10}{'xhr p95':>10}{'py/page':>9}{'served':>8}")
+    for mode, (ready, sheet, callbacks, heavy) in results.items():
+        print(f"{mode:<12}{_percentile(ready, 50):>11.1f}{_percentile(ready, 95):>11.1f}"
+              f"{_percentile(sheet, 50):>10.1f}{_percentile(sheet, 95):>10.1f}{callbacks:>9.0f}{heavy:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: per-slot inner_text() loop vs. single-call batched slot extraction.
+
+Renders a synthetic tee sheet with N slots (ForeUp-style labels) and measures
+how long it takes to find the last slot in the window both ways. The legacy loop
+pays one Playwright round trip per slot; _extract_slots pays one in total.
+
+Usage:
+    python -m benchmarks.slot_extraction_bench --counts 10 30 60 120 --repeat 5
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+
+from playwright.async_api import async_playwright
+
+from playwright_logic import _extract_slots
+
+SELECTOR = '.booking-start-time-label, .time-summary-ob-left, .time-label'
+
+
+def _sheet_html(count):
+    rows = []
+    for i in range(count):
+        minutes = 6 * 60 + i * 8
+        hour, minute = divmod(minutes, 60)
+        label = f"{(hour - 1) % 12 + 1}:{minute:02d}{'am' if hour < 12 else 'pm'}"
+        rows.append(f'<div class="time time-tile"><div class="booking-start-time-label">{label}</div>'
+                    f'<div class="booking-slot-details">4 players · 18 holes · $38</div></div>')
+    return f"<html><body><div class='times'>{''.join(rows)}</div></body></html>"
+
+
+async def _legacy(page):
+    for slot in await page.locator(SELECTOR).all():
+        txt = (await slot.inner_text()).strip().lower()
+        re.search(r'(\d{1,2}:\d{2})\s*(am|pm)', txt)
+
+
+async def _batched(page):
+    await _extract_slots(page, SELECTOR)
+
+
+async def _time(fn, page, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn(page)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def _run(counts, repeat):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        print(f"{'slots':>6}{'legacy ms':>12}{'batched ms':>12}{'saved ms':>10}{'saved/slot':>12}")
+        for count in counts:
+            await page.set_content(_sheet_html(count))
+            legacy = await _time(_legacy, page, repeat)
+            batched = await _time(_batched, page, repeat)
+            saved = legacy - batched
+            print(f"{count:>6}{legacy:>12.1f}{batched:>12.1f}{saved:>10.1f}{saved / count:>12.2f}")
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot extraction latency benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 30, 60, 120])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(_run(args.counts, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
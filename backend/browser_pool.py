@@ -0,0 +1,291 @@
+"""
+Process-wide pool of warm stealth Chromium browsers.
+
+Launching Chromium costs several seconds on Cloud Run, so instead of every
+booking run doing its own `p.chromium.launch()`, the FastAPI app starts a small
+pool of browsers at boot. Each booking borrows a fresh, isolated context from
+one of them and closes it when done; the browser itself stays up.
+
+Browsers are health-checked in the background and recycled once they exceed
+their max age or max number of uses, so a leaking renderer never lives forever.
+Health probes, closes and relaunches all run outside the pool lock, which only
+guards swapping entries in and out, so acquire() never waits behind them.
+
+Configuration (environment variables):
+    BROWSER_POOL_SIZE              Number of warm browsers (0 disables the pool). Default 1.
+    BROWSER_POOL_MAX_AGE_SECONDS   Recycle a browser after this many seconds. Default 1800.
+    BROWSER_POOL_MAX_USES          Recycle a browser after this many contexts. Default 20.
+    BROWSER_POOL_HEALTH_INTERVAL   Seconds between background health checks. Default 30.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+from playwright_stealth import Stealth
+
+from playwright_logic import _launch_stealth_browser, _new_context
+
+_pool = None
+
+
+def get_pool():
+    """Return the running pool, or None if the process has no warm browsers."""
+    return _pool
+
+
+class _PooledBrowser:
+    """A launched browser plus the bookkeeping used by the recycling policy."""
+    def __init__(self, browser):
+        self.browser = browser
+        self.launched_at = time.monotonic()
+        self.uses = 0
+        self.active = 0
+        self.retiring = False
+
+    def age(self):
+        return time.monotonic() - self.launched_at
+
+    def is_expired(self, max_age, max_uses):
+        return self.age() >= max_age or self.uses >= max_uses
+
+
+class BrowserPool:
+    """Keeps `size` stealth Chromium browsers warm and hands out fresh contexts."""
+
+    def __init__(self, size=1, max_age=1800, max_uses=20, health_interval=30, headless=True):
+        self.size = max(1, size)
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.health_interval = health_interval
+        self.headless = headless
+
+        self._playwright_cm = None
+        self._playwright = None
+        self._browsers = []
+        self._lock = asyncio.Lock()
+        self._maintenance_task = None
+        # The launch pass in progress, shared by every caller of _fill().
+        self._fill_task = None
+        # Background _retire() runs, kept so they aren't garbage-collected mid-flight.
+        self._retire_tasks = set()
+        self._launches = 0
+        self._recycled = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            size=int(os.getenv("BROWSER_POOL_SIZE", "1")),
+            max_age=float(os.getenv("BROWSER_POOL_MAX_AGE_SECONDS", "1800")),
+            max_uses=int(os.getenv("BROWSER_POOL_MAX_USES", "20")),
+            health_interval=float(os.getenv("BROWSER_POOL_HEALTH_INTERVAL", "30")),
+        )
+
+    async def start(self):
+        """Start the Playwright driver and pre-launch every browser in the pool."""
+        self._playwright_cm = Stealth().use_async(async_playwright())
+        self._playwright = await self._playwright_cm.__aenter__()
+        await self._fill()
+        self._maintenance_task = asyncio.create_task(self._maintain())
+        logging.info("Browser pool started with %d warm browser(s).", len(self._browsers))
+
+    async def stop(self):
+        """Close every browser and shut the Playwright driver down."""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+        if self._retire_tasks:
+            await asyncio.gather(*self._retire_tasks, return_exceptions=True)
+        if self._fill_task:
+            await asyncio.gather(self._fill_task, return_exceptions=True)
+        async with self._lock:
+            browsers, self._browsers = self._browsers, []
+        for entry in browsers:
+            await self._close_browser(entry)
+        if self._playwright_cm:
+            await self._playwright_cm.__aexit__(None, None, None)
+        logging.info("Browser pool stopped.")
+
+    @asynccontextmanager
+    async def acquire(self, storage_state=None):
+        """Borrow a fresh, isolated context on a warm browser for one booking run."""
+        async with self._lock:
+            entry = self._checkout()
+        if entry is None:
+            await self._fill()
+            async with self._lock:
+                entry = self._checkout()
+        if entry is None:
+            raise Exception("Browser pool has no healthy browsers available.")
+
+        context = None
+        try:
+            context = await _new_context(entry.browser, storage_state=storage_state)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logging.warning("Browser pool: failed to close context: %s", e)
+            entry.active -= 1
+            if entry.is_expired(self.max_age, self.max_uses):
+                entry.retiring = True
+            if entry.retiring and entry.active == 0:
+                task = asyncio.create_task(self._retire(entry))
+                self._retire_tasks.add(task)
+                task.add_done_callback(self._retired)
+
+    def _retired(self, task):
+        self._retire_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.warning("Browser pool: failed to recycle browser: %s", task.exception())
+
+    def stats(self):
+        """Snapshot of pool state for diagnostics."""
+        return {
+            "size": self.size,
+            "browsers": [
+                {
+                    "age_seconds": round(entry.age(), 1),
+                    "uses": entry.uses,
+                    "active_contexts": entry.active,
+                    "retiring": entry.retiring,
+                    "connected": entry.browser.is_connected(),
+                }
+                for entry in self._browsers
+            ],
+            "active_contexts": sum(entry.active for entry in self._browsers),
+            "launches": self._launches,
+            "recycled": self._recycled,
+        }
+
+    # -- internals (only _checkout expects the caller to hold self._lock) ----
+
+    async def _launch(self):
+        browser = await _launch_stealth_browser(self._playwright, headless=self.headless)
+        self._launches += 1
+        return _PooledBrowser(browser)
+
+    async def _fill(self):
+        """Launch browsers until `size` are live; concurrent callers share one pass."""
+        if self._fill_task is None or self._fill_task.done():
+            self._fill_task = asyncio.create_task(self._launch_missing())
+        await asyncio.shield(self._fill_task)
+
+    async def _launch_missing(self):
+        async with self._lock:
+            missing = self.size - len([entry for entry in self._browsers if not entry.retiring])
+        for _ in range(missing):
+            try:
+                entry = await self._launch()
+            except Exception as e:
+                logging.error("Browser pool: failed to launch browser: %s", e)
+                continue
+            async with self._lock:
+                self._browsers.append(entry)
+
+    def _checkout(self):
+        """Count a use on the least busy live browser and return it, or None if there is none."""
+        for entry in self._browsers:
+            if not entry.browser.is_connected():
+                logging.warning("Browser pool: dropping disconnected browser.")
+                entry.retiring = True
+            elif entry.is_expired(self.max_age, self.max_uses):
+                entry.retiring = True
+
+        # Disconnected browsers have nothing left to drain.
+        for entry in [e for e in self._browsers if e.retiring and not e.browser.is_connected()]:
+            self._browsers.remove(entry)
+            self._recycled += 1
+
+        available = [entry for entry in self._browsers if not entry.retiring]
+        if not available:
+            return None
+        entry = min(available, key=lambda entry: entry.active)
+        entry.uses += 1
+        entry.active += 1
+        return entry
+
+    async def _close_browser(self, entry):
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            logging.warning("Browser pool: error closing browser: %s", e)
+
+    async def _drop(self, entry):
+        """Take an idle browser out of the pool; False if it's gone or was checked out meanwhile."""
+        async with self._lock:
+            if entry not in self._browsers:
+                return False
+            if entry.active > 0:
+                # Borrowed since we looked; acquire() retires it once it drains.
+                entry.retiring = True
+                return False
+            self._browsers.remove(entry)
+            self._recycled += 1
+            return True
+
+    async def _retire(self, entry):
+        """Close a drained browser and launch its replacement."""
+        if not await self._drop(entry):
+            return
+        logging.info("Browser pool: recycling browser (age %.0fs, %d uses).", entry.age(), entry.uses)
+        await self._close_browser(entry)
+        await self._fill()
+
+    async def _is_healthy(self, entry):
+        if not entry.browser.is_connected():
+            return False
+        if entry.active > 0:
+            # A booking is using it right now; don't add load to probe it.
+            return True
+        try:
+            probe = await asyncio.wait_for(entry.browser.new_context(), timeout=10)
+            await probe.close()
+            return True
+        except Exception as e:
+            logging.warning("Browser pool: health probe failed: %s", e)
+            return False
+
+    async def _maintain(self):
+        """Background loop: probe idle browsers, recycle expired ones, refill to size."""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                async with self._lock:
+                    idle = [entry for entry in self._browsers if entry.active == 0]
+                for entry in idle:
+                    healthy = await self._is_healthy(entry)
+                    if not healthy or entry.retiring or entry.is_expired(self.max_age, self.max_uses):
+                        if await self._drop(entry):
+                            await self._close_browser(entry)
+                await self._fill()
+            except Exception as e:
+                logging.error("Browser pool: maintenance pass failed: %s", e)
+
+
+async def start_pool():
+    """Start the process-wide pool if BROWSER_POOL_SIZE > 0. Safe to call twice."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    if int(os.getenv("BROWSER_POOL_SIZE", "1")) <= 0:
+        logging.info("Browser pool disabled (BROWSER_POOL_SIZE=0).")
+        return None
+    pool = BrowserPool.from_env()
+    await pool.start()
+    _pool = pool
+    return _pool
+
+
+async def stop_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.stop()
@@ -0,0 +1,94 @@
+"""
+Chromium launch profile for booking browsers.
+
+Playwright's own launch switches already turn off extensions, sync, component
+updates, background networking, first-run UI and crash reporting, so the
+"lean" profile adds what they leave on and what matters on a small Cloud Run
+instance:
+
+    processes  --renderer-process-limit caps renderers (cross-site iframes and
+               popups otherwise get their own) at no fewer than the contexts
+               admission control lets run at once, so concurrent jobs and race
+               candidates on the same course never share a renderer's main
+               thread; --no-zygote (fine with --no-sandbox) drops the zygote
+               processes.
+    features   notifications, audio and print preview off.
+    viewport   1280x800 instead of 1920x1080: still a desktop layout on every
+               booking site, with less to rasterize per frame.
+
+Playwright refuses `--user-data-dir` with `launch()` (only persistent contexts
+take a profile directory, and those can't hand out isolated contexts per job),
+so instead of a template profile the Docker image runs `python -m browser_profile`
+at build time: one throwaway launch that leaves the font cache and the other
+per-user caches Chromium builds on first start already in the image.
+
+benchmarks/browser_startup_bench.py compares launch-to-first-navigation time
+and memory for both profiles.
+
+Configuration (environment variables):
+    BROWSER_PROFILE           "lean" (default) or "default" (the original three flags, 1920x1080).
+    BROWSER_RENDERER_LIMIT    Renderer process cap in the lean profile. Default (and minimum)
+                              ADMISSION_MAX_CONTEXTS.
+"""
+import asyncio
+import logging
+import os
+
+import admission
+
+PROFILE = os.getenv("BROWSER_PROFILE", "lean")
+RENDERER_LIMIT = max(int(os.getenv("BROWSER_RENDERER_LIMIT", "0")), admission.MAX_CONTEXTS)
+
+BASE_ARGS = ['--disable-blink-features=AutomationControlled', '--disable-gpu', '--no-sandbox']
+
+PROFILES = {
+    "default": {
+        "args": [],
+        "viewport": {'width': 1920, 'height': 1080},
+    },
+    "lean": {
+        "args": [
+            f'--renderer-process-limit={RENDERER_LIMIT}',
+            '--no-zygote',
+            '--disable-notifications',
+            '--mute-audio',
+            '--disable-print-preview',
+            '--window-size=1280,800',
+        ],
+        "viewport": {'width': 1280, 'height': 800},
+    },
+}
+
+
+def _profile(name=None):
+    name = name or PROFILE
+    if name not in PROFILES:
+        logging.warning("Browser profile: unknown BROWSER_PROFILE %r, using 'default'.", name)
+        name = "default"
+    return PROFILES[name]
+
+
+def launch_args(name=None):
+    """Chromium switches for the profile, on top of BASE_ARGS."""
+    return BASE_ARGS + _profile(name)["args"]
+
+
+def viewport(name=None):
+    return dict(_profile(name)["viewport"])
+
+
+async def warm():
+    """One throwaway launch so Chromium's first-start caches are built (Docker build step)."""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=launch_args())
+        page = await browser.new_page(viewport=viewport())
+        await page.set_content("<p style='font-family: sans-serif'>warm</p>")
+        await browser.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(warm())
+    logging.info("Browser profile: Chromium caches warmed.")
@@ -0,0 +1,135 @@
+"""
+Clock-offset estimation against booking platform hosts.
+
+`wait_for_release` fires on our container clock, but tee sheets open on the
+booking platform's clock. This module estimates the skew between the two by
+sampling the HTTP `Date` header of the course host over several round trips,
+NTP-style: each sample bounds the server clock to an interval, and intersecting
+those intervals across samples narrows the offset well below the header's
+one-second resolution.
+
+Convention: `offset_seconds` is server clock minus local clock. A positive offset
+means the platform is ahead of us, so we must fire earlier by that amount.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+# Only trust an estimate whose uncertainty is below this many seconds.
+MAX_TRUSTED_ERROR_SECONDS = float(os.getenv('CLOCK_SYNC_MAX_ERROR', '0.5'))
+# Ignore absurd offsets (misconfigured proxy caches, stale CDN Date headers).
+MAX_TRUSTED_OFFSET_SECONDS = float(os.getenv('CLOCK_SYNC_MAX_OFFSET', '30'))
+CACHE_TTL_SECONDS = 300
+
+_cache = {}
+
+
+class ClockEstimate:
+    """Offset/RTT estimate for one host, plus the uncertainty of the offset."""
+    def __init__(self, host, offset_seconds, error_seconds, rtt_seconds, samples):
+        self.host = host
+        self.offset_seconds = offset_seconds
+        self.error_seconds = error_seconds
+        self.rtt_seconds = rtt_seconds
+        self.samples = samples
+        self.measured_at = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def trusted(self):
+        return (self.error_seconds <= MAX_TRUSTED_ERROR_SECONDS
+                and abs(self.offset_seconds) <= MAX_TRUSTED_OFFSET_SECONDS)
+
+    @property
+    def correction_seconds(self):
+        """Offset to feed into wait_for_release, or 0.0 if the estimate isn't trustworthy."""
+        return self.offset_seconds if self.trusted else 0.0
+
+    def to_dict(self):
+        return {
+            "host": self.host,
+            "offset_ms": round(self.offset_seconds * 1000, 1),
+            "error_ms": round(self.error_seconds * 1000, 1),
+            "rtt_ms": round(self.rtt_seconds * 1000, 1),
+            "samples": self.samples,
+            "applied_ms": round(self.correction_seconds * 1000, 1),
+            "measured_at": self.measured_at,
+        }
+
+
+def _proxies():
+    proxy_server = os.getenv("PLAYWRIGHT_PROXY_SERVER")
+    if not proxy_server:
+        return None
+    return {"http": proxy_server, "https": proxy_server}
+
+
+def _sample_host(origin, samples, timeout):
+    """Blocking: take `samples` Date-header round trips and intersect their bounds."""
+    session = requests.Session()
+    proxies = _proxies()
+    lower, upper = float('-inf'), float('inf')
+    midpoints = []
+    rtts = []
+
+    for i in range(samples):
+        t0 = time.time()
+        resp = session.head(origin, timeout=timeout, allow_redirects=False, proxies=proxies)
+        t1 = time.time()
+        date_header = resp.headers.get('Date')
+        if not date_header:
+            continue
+        server_ts = parsedate_to_datetime(date_header).timestamp()
+
+        # The server stamped its clock somewhere in [t0, t1] local time, and the
+        # header truncates to the second, so server time was in [server_ts, server_ts + 1).
+        lower = max(lower, server_ts - t1)
+        upper = min(upper, server_ts + 1 - t0)
+        midpoints.append(server_ts + 0.5 - (t0 + t1) / 2)
+        rtts.append(t1 - t0)
+
+        # Spread samples across the second so the truncation boundary lands
+        # in a different place each time and the intervals actually narrow.
+        if i < samples - 1:
+            time.sleep((1.0 / samples) + 0.013)
+
+    if not rtts:
+        raise Exception(f"No Date header returned by {origin}")
+
+    if lower <= upper:
+        offset = (lower + upper) / 2
+        error = (upper - lower) / 2
+    else:
+        # Inconsistent samples (e.g. load-balanced hosts with different clocks):
+        # fall back to the mean midpoint and report the spread as the error.
+        offset = sum(midpoints) / len(midpoints)
+        error = (max(midpoints) - min(midpoints)) / 2 + 0.5
+
+    return offset, error, min(rtts), len(rtts)
+
+
+async def estimate_offset(url, samples=8, timeout=5.0):
+    """
+    Estimate the clock offset of the host serving `url`.
+    Results are cached per host for CACHE_TTL_SECONDS so concurrent jobs share them.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc
+    cached = _cache.get(host)
+    if cached and time.monotonic() - cached[0] < CACHE_TTL_SECONDS:
+        return cached[1]
+
+    origin = f"{parts.scheme}://{host}/"
+    offset, error, rtt, count = await asyncio.to_thread(_sample_host, origin, samples, timeout)
+    estimate = ClockEstimate(host, offset, error, rtt, count)
+    _cache[host] = (time.monotonic(), estimate)
+
+    logging.info("Clock Sync: %s offset %+.1fms (±%.1fms, rtt %.1fms, %d samples)%s",
+                 host, offset * 1000, error * 1000, rtt * 1000, count,
+                 "" if estimate.trusted else " — not trusted, ignoring")
+    return estimate
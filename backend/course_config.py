@@ -24,11 +24,11 @@ COURSE_CONFIG = {
         "func": playwright_logic.book_cps_old_post,
     },
     "orchard creek": {
-        "url": "https://foreupsoftware.com/index.php/booking/19530/1791?_gl=1*yg2s5f*_ga*OTc1NDk3MjU5LjE3Nzc3Mjc1NDE.*_ga_WQPLP348DP*czE3NzgzMjYwMTEkbzIkZzAkdDE3NzgzMjYwMTEkajYwJGwwJGgw#teetimes",
+        "url": "https://foreupsoftware.com/index.php/booking/19530/1791#teetimes",
         "func": playwright_logic.book_orchard_creek,
     },
     "schenectady": {
-        "url": "https://foreupsoftware.com/index.php/booking/20480/4739?_gl=1*is3gta*_ga*MzM4MjY1MTE4LjE3NzgzMjYxMzA.*_ga_WQPLP348DP*czE3NzgzMjYxMzAkbzEkZzAkdDE3NzgzMjYxMzMkajU3JGwwJGgw#/teetimes",
+        "url": "https://foreupsoftware.com/index.php/booking/20480/4739#/teetimes",
         "func": playwright_logic.book_schenectady_muni,
     },
     "stadium": {
@@ -0,0 +1,124 @@
+"""
+Direct date navigation for the booking flows.
+
+Instead of clicking a calendar's month arrow once per month ahead during the
+arm phase, and toggling prev/next after the release to refresh the calendar's
+disabled days, the flows go straight to the target date through each platform's
+own routing or state API:
+
+    cps     The search-teetime page takes the date as a `searchDate=YYYY-MM-DD`
+            query parameter (the same name its TeeTimes API uses), so the first
+            page load opens the calendar on the target month.
+    foreup  The booking page's bootstrap-datepicker jQuery API:
+            `$(picker).datepicker('setDate', target)` moves the calendar (and,
+            once the day is open, the tee sheet) to the target date.
+
+Either is checked by the calendar header showing the target month; if it
+doesn't, the flow clicks its arrows as before. After the release the flows
+click the target day directly and only fall back to the month toggle if that
+click doesn't load the tee sheet. Eagle Club's day strip has no months to page
+through, so it is unaffected.
+
+Each run records what it used and how long it took as `date_nav` on the job's
+timings (see record()); benchmarks/date_nav_bench.py compares both paths.
+
+Configuration (environment variables):
+    DATE_NAV_DIRECT   "1" to use direct navigation (default), "0" to always click the arrows.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+ENABLED = os.getenv("DATE_NAV_DIRECT", "1") == "1"
+
+# How long a direct day click gets to produce the day's tee sheet after the
+# release before the flow falls back to toggling the month.
+DAY_CLICK_TIMEOUT = 1.0
+
+# Moves a bootstrap-datepicker on the page to the given date. False if the page
+# has no datepicker plugin to talk to.
+_PICKER_SET_DATE_JS = """
+(iso) => {
+    const $ = window.jQuery;
+    if (!$ || !$.fn || !$.fn.datepicker) return false;
+    const picker = $('.datepicker, #date-field, [data-provide="datepicker"]');
+    if (!picker.length) return false;
+    const [y, m, d] = iso.split('-').map(Number);
+    picker.datepicker('setDate', new Date(y, m - 1, d));
+    return true;
+}
+"""
+
+
+def months_ahead(target, today=None):
+    """Calendar months between today and `target` (0 if it's this month)."""
+    today = today or datetime.today().date()
+    return max(0, (target.year - today.year) * 12 + target.month - today.month)
+
+
+def deep_link(platform, url, target):
+    """`url` with the target date in the platform's own query parameter, or `url` unchanged."""
+    if not ENABLED or platform != "cps":
+        return url
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "searchDate"]
+    query.append(("searchDate", target.isoformat()))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+# The header's month name, and its year if it shows one: across a year boundary
+# "January" alone could be the wrong January.
+_ON_MONTH_JS = """
+([sel, month, year]) => {
+    const el = document.querySelector(sel);
+    if (!el || !el.textContent.includes(month)) return false;
+    const years = el.textContent.match(/\\b\\d{4}\\b/g);
+    return !years || years.includes(year);
+}
+"""
+
+
+async def on_target_month(page, header_selector, target, timeout=1500):
+    """True once the calendar header under `header_selector` names the target month (and year, if shown)."""
+    try:
+        await page.wait_for_function(
+            _ON_MONTH_JS, arg=[header_selector, target.strftime('%B'), str(target.year)], timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def set_picker_date(page, target, header_selector, timeout=1500):
+    """Move a bootstrap-datepicker straight to `target`. True if the calendar got there."""
+    if not ENABLED:
+        return False
+    try:
+        if not await page.evaluate(_PICKER_SET_DATE_JS, target.isoformat()):
+            return False
+    except Exception as e:
+        logging.debug("Date nav: datepicker API unavailable: %s", e)
+        return False
+    return await on_target_month(page, header_selector, target, timeout=timeout)
+
+
+class DateNav:
+    """What one run used to reach the target date, and what it cost; recorded as `date_nav`."""
+
+    def __init__(self, timings, target):
+        self.timings = timings
+        self.report = {"months_ahead": months_ahead(target), "arm": None, "arm_ms": None,
+                       "fire": None, "fire_ms": None}
+        timings.record('date_nav', self.report)
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+
+    def done(self, phase, method):
+        """Close the `phase` ('arm' or 'fire') started by start(), reached via `method`."""
+        elapsed = round((time.monotonic() - self._started) * 1000, 1)
+        self.report[phase] = method
+        self.report[f"{phase}_ms"] = elapsed
+        logging.info("Date nav: %s reached the target date via %s in %.0fms.", phase, method, elapsed)
@@ -20,11 +20,23 @@ def fetch_latest_failure():
     
     print(f"Job ID: {doc.id}")
     for k, v in data.items():
-        if k != 'error_screenshot':
+        if k not in ('error_screenshot', 'error_thumbnail'):
             print(f"{k}: {v}")
     
     screenshot = data.get('error_screenshot')
-    if screenshot:
+    if isinstance(screenshot, dict):
+        import artifacts
+        store = artifacts.get_store()
+        image = store.get(screenshot['key']) if store and store.kind == screenshot.get('store') else None
+        if image is None:
+            print(f"Screenshot {screenshot['key']} not found in the {screenshot.get('store')} artifact store.")
+            return
+        out_path = f"/Users/jeffgerard/.gemini/antigravity/brain/d80aae5c-c1f3-4d87-89e7-cbb471aa42fc/error_screenshot_latest.{screenshot['key'].rsplit('.', 1)[-1]}"
+        with open(out_path, 'wb') as f:
+            f.write(image)
+        print(f"Screenshot saved to {out_path}")
+    elif screenshot:
+        # Jobs from before artifacts.py kept the PNG inline
         import base64
         out_path = '/Users/jeffgerard/.gemini/antigravity/brain/d80aae5c-c1f3-4d87-89e7-cbb471aa42fc/error_screenshot_latest.png'
         with open(out_path, 'wb') as f:
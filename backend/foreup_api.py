@@ -0,0 +1,277 @@
+"""
+Direct HTTP booking engine for ForeUp.
+
+The ForeUp booking SPA loads tee times and books them through JSON XHR endpoints
+under /index.php/api/booking. Once the Playwright flow has loaded the page and
+logged in (arm phase), this engine replays those calls on a shared, pooled httpx
+client using the browser's cookies and auth token: fetch times for the date,
+pick the slot, create the pending reservation and confirm it. No DOM, no sleeps.
+
+The Playwright flow in playwright_logic.book_via_foreup_software stays as the
+fallback whenever the engine is disabled, can't build a session, or errors.
+
+Configuration (environment variables):
+    FOREUP_HTTP_ENGINE   "1" to enable the engine (default), "0" to always use the DOM flow.
+    FOREUP_API_BASE      Override the API origin, e.g. a local replay server in benchmarks/.
+"""
+import logging
+import os
+import re
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import httpx
+
+import prewarm
+import racing
+import slot_fallback
+import tee_sheet
+from timings import get_timings
+
+ENGINE_ENABLED = os.getenv("FOREUP_HTTP_ENGINE", "1") == "1"
+API_KEY = "no_limits"  # Public key the booking SPA itself sends on every call.
+
+_client = None
+
+
+def get_client():
+    """Shared pooled client; keeps TLS connections to ForeUp warm across jobs."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            proxy=os.getenv("PLAYWRIGHT_PROXY_SERVER") or None,
+            follow_redirects=False,
+            event_hooks={"request": [prewarm.attach_trace]},
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+SlotUnavailable = slot_fallback.SlotUnavailable
+
+
+class ReservationUncertain(Exception):
+    """The confirm call went out but we can't tell whether it succeeded. Never retry via the DOM."""
+
+
+class ForeUpSession:
+    """Everything the API calls need, harvested from the logged-in browser session."""
+    def __init__(self, base_url, course_id, schedule_id, booking_class_id, cookies=None, jwt=None, referer=None):
+        self.base_url = base_url.rstrip('/')
+        self.course_id = course_id
+        self.schedule_id = schedule_id
+        self.booking_class_id = booking_class_id
+        self.cookies = cookies or {}
+        self.jwt = jwt
+        self.referer = referer
+
+    def headers(self):
+        headers = {
+            "Api-Key": API_KEY,
+            "X-Requested-With": "XMLHttpRequest",
+            "X-Fu-Golfer-Location": "foreup",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+        }
+        if self.jwt:
+            headers["X-Authorization"] = f"Bearer {self.jwt}"
+        if self.referer:
+            headers["Referer"] = self.referer
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        return headers
+
+
+def api_base(url):
+    """Origin the engine sends its API calls to for a booking page URL."""
+    parts = urlsplit(url)
+    return (os.getenv("FOREUP_API_BASE") or f"{parts.scheme}://{parts.netloc}").rstrip('/')
+
+
+def parse_booking_url(url):
+    """Extract (course_id, schedule_id, booking_class_id) from a ForeUp booking URL."""
+    parts = urlsplit(url)
+    course_id = schedule_id = None
+    m = re.search(r'/booking/(\d+)(?:/(\d+))?', parts.path)
+    if m:
+        course_id, schedule_id = m.group(1), m.group(2)
+    fragment_query = parts.fragment.split('?', 1)[1] if '?' in parts.fragment else ''
+    bc = parse_qs(fragment_query).get('bc') or parse_qs(parts.query).get('bc')
+    return course_id, schedule_id, (bc[0] if bc else None)
+
+
+class SessionSniffer:
+    """
+    Listens to the page's own ForeUp XHRs during the arm phase and remembers the
+    schedule/booking-class it queries and the auth token it receives at login
+    (or sends, when the login was restored from the session cache).
+    """
+    def __init__(self, page, url):
+        self.url = url
+        self.course_id, self.schedule_id, self.booking_class_id = parse_booking_url(url)
+        self.jwt = None
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+
+    def _on_request(self, request):
+        if "/api/booking/times" not in request.url:
+            return
+        # A restored login (session_cache.py) never hits the login endpoint, but
+        # the SPA still sends its token on every API call.
+        auth = request.headers.get("x-authorization") or ""
+        if auth.startswith("Bearer "):
+            self.jwt = auth[len("Bearer "):]
+        query = parse_qs(urlsplit(request.url).query)
+        if query.get("booking_class"):
+            self.booking_class_id = query["booking_class"][0]
+        if query.get("schedule_id"):
+            self.schedule_id = query["schedule_id"][0]
+
+    async def _on_response(self, response):
+        if "/api/booking/users/login" not in response.url or response.status != 200:
+            return
+        try:
+            data = await response.json()
+            self.jwt = data.get("jwt") or self.jwt
+        except Exception:
+            pass
+
+    async def build_session(self, context):
+        """Return a ForeUpSession, or None if we never learned enough to use the API."""
+        if not (self.course_id and self.schedule_id and self.booking_class_id):
+            return None
+        base_url = api_base(self.url)
+        host = urlsplit(base_url).hostname
+        cookies = {c["name"]: c["value"] for c in await context.cookies() if host and host.endswith(c["domain"].lstrip('.'))}
+        return ForeUpSession(base_url, self.course_id, self.schedule_id, self.booking_class_id,
+                             cookies=cookies, jwt=self.jwt, referer=self.url)
+
+
+async def fetch_times(session, date, players):
+    """GET the tee sheet for `date` exactly as the SPA does."""
+    params = {
+        "time": "all",
+        "date": date.strftime("%m-%d-%Y"),
+        "holes": "all",
+        "players": players,
+        "booking_class": session.booking_class_id,
+        "schedule_id": session.schedule_id,
+        "schedule_ids[]": session.schedule_id,
+        "specials_only": 0,
+        "api_key": API_KEY,
+    }
+    resp = await get_client().get(f"{session.base_url}/index.php/api/booking/times",
+                                  params=params, headers=session.headers())
+    resp.raise_for_status()
+    data = resp.json()
+    return data if isinstance(data, list) else []
+
+
+async def reserve(session, slot, players, holes=18, carts=True, before_confirm=None):
+    """
+    Create the pending reservation and confirm it. Returns the confirmation payload.
+    `before_confirm` runs between the two; raising there abandons the pending hold.
+    """
+    client = get_client()
+    form = {
+        "time": slot["time"],
+        "holes": holes,
+        "players": players,
+        "carts": "true" if carts else "false",
+        "schedule_id": slot.get("schedule_id", session.schedule_id),
+        "teesheet_side_id": slot.get("teesheet_side_id", ""),
+        "course_id": session.course_id,
+        "booking_class_id": slot.get("booking_class_id", session.booking_class_id),
+        "duration": 1,
+        "foreup_discount": "false",
+        "foreup_trade_discount_rate": slot.get("foreup_trade_discount_rate", 0),
+        "trade_min_players": slot.get("trade_min_players", 0),
+        "cart_fee": slot.get("cart_fee", 0),
+        "cart_fee_tax": slot.get("cart_fee_tax", 0),
+        "green_fee": slot.get("green_fee", 0),
+        "green_fee_tax": slot.get("green_fee_tax", 0),
+    }
+    resp = await client.post(f"{session.base_url}/index.php/api/booking/pending_reservation",
+                             data=form, headers=session.headers())
+    if resp.status_code in (409, 410):
+        raise SlotUnavailable(f"Slot {slot['time']} is no longer available (HTTP {resp.status_code}).")
+    resp.raise_for_status()
+    pending = resp.json()
+    if not pending.get("success") or not pending.get("reservation_id"):
+        raise SlotUnavailable(f"Pending reservation rejected for {slot['time']}: {pending.get('msg', pending)}")
+
+    if before_confirm is not None:
+        before_confirm()
+
+    payload = dict(slot)
+    payload.update({
+        "pending_reservation_id": pending["reservation_id"],
+        "players": players,
+        "holes": holes,
+        "carts": carts,
+        "course_id": session.course_id,
+    })
+    try:
+        resp = await client.post(f"{session.base_url}/index.php/api/booking/users/reservations",
+                                 json=payload, headers=session.headers())
+    except httpx.TransportError as e:
+        raise ReservationUncertain(f"Confirm request for {slot['time']} failed mid-flight: {e}")
+    if resp.status_code in (409, 410):
+        raise SlotUnavailable(f"Slot {slot['time']} was taken before our confirm (HTTP {resp.status_code}).")
+    # Any other outcome of a sent confirm may have booked the tee time, so nothing
+    # below may let the caller fall back to the DOM flow and book a second one.
+    if resp.status_code >= 400:
+        raise ReservationUncertain(f"Confirm request for {slot['time']} returned HTTP {resp.status_code}.")
+    try:
+        confirmation = resp.json()
+    except ValueError as e:
+        raise ReservationUncertain(f"Confirm response for {slot['time']} wasn't JSON: {e}")
+    if not isinstance(confirmation, dict) or not (confirmation.get("TTID") or confirmation.get("reservation_id")):
+        raise ReservationUncertain(f"ForeUp API did not confirm the reservation: {confirmation}")
+    return confirmation
+
+
+async def book_via_api(session, booking, dry_run=False):
+    """
+    Fetch, pick and book in a handful of requests, falling back to the next-best
+    slot when one is taken (see slot_fallback.py). Mirrors the DOM flow's result strings.
+    """
+    timings = get_timings(booking)
+
+    async def fetch():
+        times = await fetch_times(session, booking.desired_date, booking.players)
+        return tee_sheet.parse("foreup", times, booking.desired_date) or []
+
+    slots = await fetch()
+    matches = tee_sheet.rank_slots(slots, booking.desired_date, booking.earliest_time, booking.latest_time, booking.players)
+    if matches:
+        tee_sheet.record_visible(timings, "first_load", visible_epoch=time.time())
+    elif getattr(booking, 'release_time', None):
+        # Not released yet (or a stale cache): poll the times endpoint until the window opens.
+        matches = await timings.budget.wait('slot_poll', tee_sheet.poll_for_slots(fetch, booking, timings, "data_endpoint"))
+    ranked = slot_fallback.candidates_for(booking, matches)
+    if not ranked:
+        raise Exception(f'No tee time found between {booking.earliest_time} and {booking.latest_time}')
+
+    logging.info("ForeUp API: Found matching tee time(s): %s", ", ".join(s.label.lower() for s in ranked))
+    if dry_run:
+        return f'Dry run success at {ranked[0].label.lower()}'
+
+    if not session.jwt:
+        raise Exception("ForeUp API: no auth token captured from the browser login.")
+
+    async def attempt(slot, deadline):
+        return await reserve(session, slot.raw, booking.players,
+                             before_confirm=lambda: racing.claim_confirm(booking))
+
+    confirmation, slot = await slot_fallback.try_in_order(
+        ranked, attempt, timings, label=lambda s: s.label.lower())
+    logging.info("ForeUp API: Reservation confirmed: %s", confirmation.get("TTID") or confirmation.get("reservation_id"))
+    return f'Success! Booked {slot.label.lower()}.'
@@ -0,0 +1,257 @@
+"""
+Async data layer for booking jobs (the `tee_time_jobs` collection).
+
+The FastAPI routes and the worker share one event loop with Playwright and the
+release timers (release_timer.py), so a blocking gRPC call there stalls every
+job running in the process. JobStore owns every read, write, query and
+transaction on `tee_time_jobs` and makes them on `firestore.AsyncClient`, so
+they yield to the loop while waiting on Firestore.
+
+main.py and worker.py get the process-wide store from get_store() (None if
+Firestore can't be reached, like their sync `db`). Other collections
+(session_cache.py, release_stats.py) still use the sync client.
+benchmarks/loop_lag_bench.py measures event-loop lag under a Firestore load
+with the sync client versus this store.
+
+Booking lists (list_page) are an ordered `uid == X ORDER BY created_at DESC`
+query, so they need the composite index in firestore.indexes.json at the repo
+root (`firebase deploy --only firestore:indexes`). They read only LIST_FIELDS:
+error screenshots, credentials and timing blobs stay on the server until a
+single job's detail is asked for (get). Pages are chained with opaque cursor
+tokens encoding the last row's (created_at, id).
+
+Jobs also carry `release_at`, their `release_time` as a native Firestore
+timestamp, so the cron and the worker range-query PENDING jobs by release
+(`status == PENDING AND release_at < cutoff`, a second composite index) instead
+of streaming the whole queue and parsing every ISO string. Stale jobs are
+failed through a BulkWriter, each write conditioned on the document being
+unchanged since the query read it, so a job claimed in between isn't
+overwritten. Jobs created before `release_at` existed are invisible to those
+queries until `python -m job_store backfill-release-at` has been run.
+benchmarks/cron_scan_bench.py compares both cron strategies on a seeded emulator.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime, timezone
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+COLLECTION = "tee_time_jobs"
+
+# Fields the booking list needs; everything else is detail-only.
+LIST_FIELDS = [
+    "id", "status", "course", "course_name", "desired_date", "earliest_time", "latest_time",
+    "players", "release_time", "result_log", "progress", "created_at", "updated_at",
+]
+
+
+def release_at(release_time):
+    """`release_time` (ISO 8601 string) as an aware datetime, for the `release_at` field."""
+    value = datetime.fromisoformat(release_time.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        raise ValueError(f"release_time has no UTC offset: {release_time!r}")
+    return value
+
+
+def _encode_cursor(data):
+    raw = json.dumps([data.get("created_at"), data["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token):
+    """(created_at, id) from a cursor token; ValueError if it isn't one."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(job_id, str) or not job_id:
+        raise ValueError("Invalid cursor")
+    return created_at, job_id
+
+
+class JobStore:
+    """Reads, writes and transactions for `tee_time_jobs` documents."""
+
+    def __init__(self, client):
+        self.client = client
+        self._sync_client = None
+
+    @property
+    def sync_client(self):
+        """A sync client for BulkWriter, which only works on `firestore.Client`; use from a thread."""
+        if self._sync_client is None:
+            self._sync_client = firestore.Client(project=self.client.project)
+        return self._sync_client
+
+    def _ref(self, job_id):
+        return self.client.collection(COLLECTION).document(job_id)
+
+    async def get(self, job_id):
+        """The job's data, or None if it doesn't exist."""
+        snapshot = await self._ref(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def create(self, job_id, data):
+        await self._ref(job_id).set(data)
+
+    async def update(self, job_id, fields):
+        await self._ref(job_id).update(fields)
+
+    async def delete(self, job_id):
+        await self._ref(job_id).delete()
+
+    async def list_page(self, uid, limit, cursor=None):
+        """
+        One page of `uid`'s jobs, newest first, projected to LIST_FIELDS.
+        Returns (jobs, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor.
+        """
+        query = (
+            self.client.collection(COLLECTION)
+            .where('uid', '==', uid)
+            .order_by('created_at', direction=firestore.Query.DESCENDING)
+            .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+            .select(LIST_FIELDS)
+        )
+        if cursor:
+            created_at, job_id = _decode_cursor(cursor)
+            query = query.start_after({"created_at": created_at, FieldPath.document_id(): self._ref(job_id)})
+        # One extra row tells us whether there's another page without a count query.
+        jobs = []
+        async for doc in query.limit(limit + 1).stream():
+            jobs.append({"id": doc.id, **doc.to_dict()})
+        if len(jobs) <= limit:
+            return jobs, None
+        jobs = jobs[:limit]
+        return jobs, _encode_cursor(jobs[-1])
+
+    async def report_progress(self, job_id, phase):
+        """Set the job's `progress` (the booking phase now running) for live streams."""
+        await self.update(job_id, {"progress": {"phase": phase, "at": datetime.now(timezone.utc).isoformat()}})
+
+    async def pending(self):
+        """(job_id, data) for every PENDING job."""
+        query = self.client.collection(COLLECTION).where('status', '==', 'PENDING')
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    def _pending_by_release(self):
+        return self.client.collection(COLLECTION).where('status', '==', 'PENDING').order_by('release_at')
+
+    async def releasing_between(self, start, end, limit=None):
+        """(job_id, data) for PENDING jobs releasing in (start, end], soonest first."""
+        query = self._pending_by_release().where('release_at', '>', start).where('release_at', '<=', end)
+        if limit:
+            query = query.limit(limit)
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def fail_stale(self, cutoff, fields):
+        """
+        Apply `fields` (a FAILED status and log) to every PENDING job released
+        before `cutoff`. Only the matching documents are read, keys only, and the
+        writes go out through one BulkWriter. Returns the IDs actually updated.
+        """
+        query = self._pending_by_release().where('release_at', '<', cutoff).select([])
+        stale = [doc async for doc in query.stream()]
+        if not stale:
+            return []
+        return await asyncio.to_thread(self._bulk_update, stale, fields)
+
+    def _bulk_update(self, snapshots, fields):
+        client = self.sync_client
+        updated = []
+        writer = client.bulk_writer()
+        writer.on_write_result(lambda reference, result, _: updated.append(reference.id))
+
+        def skip(failure, _):
+            # A failed precondition means the job changed (was claimed) after the query; leave it.
+            logging.info("Job store: left job %s alone: %s", failure.operation.reference.id, failure.message)
+            return False
+
+        writer.on_write_error(skip)
+        for snapshot in snapshots:
+            writer.update(client.collection(COLLECTION).document(snapshot.id), fields,
+                          option=client.write_option(last_update_time=snapshot.update_time))
+        writer.close()
+        return updated
+
+    async def backfill_release_at(self):
+        """Set `release_at` on PENDING jobs that predate it. Returns how many were set."""
+        missing = []
+        for job_id, data in await self.pending():
+            if data.get('release_at') is not None or not data.get('release_time'):
+                continue
+            try:
+                missing.append((job_id, release_at(data['release_time'])))
+            except ValueError as e:
+                logging.warning("Job store: job %s has an unusable release_time: %s", job_id, e)
+
+        def write():
+            client = self.sync_client
+            writer = client.bulk_writer()
+            for job_id, value in missing:
+                writer.update(client.collection(COLLECTION).document(job_id), {"release_at": value})
+            writer.close()
+
+        if missing:
+            await asyncio.to_thread(write)
+        return len(missing)
+
+    async def claim(self, job_id):
+        """
+        Atomically move a PENDING job to RUNNING. Returns (claimed, reason); only
+        one caller can ever claim a given job.
+        """
+        @firestore.async_transactional
+        async def claim_job_transaction(transaction, ref):
+            snapshot = await ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return False, "Not found"
+
+            current_status = snapshot.get('status')
+            if current_status != 'PENDING':
+                return False, f"Status is '{current_status}'"
+
+            transaction.update(ref, {"status": "RUNNING"})
+            return True, "Claimed"
+
+        return await claim_job_transaction(self.client.transaction(), self._ref(job_id))
+
+    async def delete_owned(self, job_ids, uid):
+        """Delete those of `job_ids` that belong to `uid` in one batch. Returns how many."""
+        batch = self.client.batch()
+        deleted = 0
+        async for snapshot in self.client.get_all([self._ref(job_id) for job_id in job_ids]):
+            if snapshot.exists and snapshot.to_dict().get("uid") == uid:
+                batch.delete(snapshot.reference)
+                deleted += 1
+        if deleted:
+            await batch.commit()
+        return deleted
+
+
+_store = None
+
+
+def get_store():
+    """The process-wide JobStore, or None if Firestore is unavailable."""
+    global _store
+    if _store is None:
+        try:
+            _store = JobStore(firestore.AsyncClient())
+        except Exception as e:
+            logging.error("Job store: failed to create the async Firestore client: %s", e)
+            return None
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tee_time_jobs maintenance")
+    parser.add_argument("command", choices=["backfill-release-at"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    count = asyncio.run(JobStore(firestore.AsyncClient()).backfill_release_at())
+    logging.info("Job store: backfilled release_at on %d PENDING jobs.", count)
@@ -1,9 +1,10 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 from google.cloud import firestore, tasks_v2
 from google.protobuf import timestamp_pb2
+import asyncio
 import datetime
 import os
 import uuid
@@ -12,7 +13,8 @@ from firebase_admin import credentials, auth
 import threading
 import subprocess
 import sys
-from utils import encrypt_password
+from utils import encrypt_password, ARM_LEAD_SECONDS
+from job_store import get_store, release_at
 
 # Initialize FastAPI
 app = FastAPI(title="PinSeeker API")
@@ -31,9 +33,10 @@ def schedule_booking_task(job_id, release_time_iso):
     client = tasks_v2.CloudTasksClient()
     parent = client.queue_path(project, location, queue)
     
-    # Schedule for 60 seconds before release
+    # Schedule early enough for the arm phase (launch, login, date navigation) to
+    # finish well before release; the job then parks until the release instant.
     release_time = datetime.datetime.fromisoformat(release_time_iso)
-    schedule_time = release_time - datetime.timedelta(seconds=60)
+    schedule_time = release_time - datetime.timedelta(seconds=ARM_LEAD_SECONDS)
     
     # Cloud Tasks requires a timestamp in the future. 
     # If release is very soon, schedule for 'now'
@@ -100,6 +103,20 @@ except Exception as e:
     print(f"Warning: Failed to initialize Firestore. {e}")
     db = None
 
+@app.on_event("startup")
+async def start_browser_pool():
+    """Pre-launch warm Chromium browsers so bookings don't pay a cold launch."""
+    try:
+        from browser_pool import start_pool
+        await start_pool()
+    except Exception as e:
+        print(f"Warning: Failed to start browser pool, bookings will cold-launch Chromium. {e}")
+
+@app.on_event("shutdown")
+async def stop_browser_pool():
+    from browser_pool import stop_pool
+    await stop_pool()
+
 # Pydantic Model for incoming booking requests
 class BookingRequest(BaseModel):
     course: int
@@ -125,33 +142,108 @@ def verify_firebase_token(request: Request):
         raise HTTPException(status_code=401, detail=f"Invalid authentication token: {e}")
 
 @app.get("/api/bookings")
-async def list_bookings(request: Request):
+async def list_bookings(request: Request, limit: int = Query(20, ge=1, le=100), cursor: str | None = None):
     user = verify_firebase_token(request)
     
-    if not db:
-        return []
+    store = get_store()
+    if not store:
+        return {"items": [], "next_cursor": None}
     
     try:
-        # Fetch only jobs created by this specific user
-        jobs_ref = db.collection('tee_time_jobs').where('uid', '==', user['uid'])
-        docs = jobs_ref.stream()
-        
-        # Sort in memory by creation time descending and limit to latest 20
-        # This prevents needing a custom composite Firestore index
-        jobs = [doc.to_dict() for doc in docs]
-        jobs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        return jobs[:20]
+        # Newest first, one page at a time (uid + created_at index in firestore.indexes.json).
+        # Only the list fields are read; screenshots and credentials come from GET /api/bookings/{job_id}.
+        jobs, next_cursor = await store.list_page(user['uid'], limit, cursor)
+        return {"items": jobs, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Fetch error: {e}")
-        return []
+        return {"items": [], "next_cursor": None}
+
+# Declared before /api/bookings/{job_id} so "stream" isn't taken for a job ID.
+@app.get("/api/bookings/stream")
+async def stream_bookings(request: Request):
+    """Server-sent events with live changes to the user's jobs (see stream_hub.py)."""
+    user = verify_firebase_token(request)
+    
+    import stream_hub
+    hub = stream_hub.get_hub()
+    if hub is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    return StreamingResponse(
+        hub.events(user["uid"], request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/bookings/{job_id}")
+async def get_booking(job_id: str, request: Request):
+    """One job in full (result log, timings, screenshot reference and thumbnail), minus the course password."""
+    user = verify_firebase_token(request)
+    
+    store = get_store()
+    if not store:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+        
+    job_data = await store.get(job_id)
+    
+    if job_data is None:
+        raise HTTPException(status_code=404, detail="Booking request not found")
+    
+    # Verify user ownership of this job
+    if job_data.get("uid") != user["uid"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view this booking request")
+    
+    job_data.pop("course_password", None)
+    return job_data
+
+@app.get("/api/bookings/{job_id}/screenshot")
+async def get_booking_screenshot(job_id: str, request: Request):
+    """The job's full failure screenshot, streamed from the artifact store."""
+    user = verify_firebase_token(request)
+    
+    store = get_store()
+    if not store:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+        
+    job_data = await store.get(job_id)
+    
+    if job_data is None:
+        raise HTTPException(status_code=404, detail="Booking request not found")
+    
+    # Verify user ownership of this job
+    if job_data.get("uid") != user["uid"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view this booking request")
+    
+    ref = job_data.get("error_screenshot")
+    if not isinstance(ref, dict):
+        raise HTTPException(status_code=404, detail="No screenshot stored for this booking request")
+    
+    import artifacts
+    artifact_store = artifacts.get_store()
+    if artifact_store is None or artifact_store.kind != ref.get("store"):
+        raise HTTPException(status_code=404, detail="Screenshot store not available")
+    
+    data = await asyncio.to_thread(artifact_store.get, ref["key"])
+    if data is None:
+        raise HTTPException(status_code=404, detail="Screenshot no longer available")
+    return Response(content=data, media_type=ref.get("content_type", "application/octet-stream"),
+                    headers={"Cache-Control": "private, max-age=3600"})
 
 @app.post("/api/bookings", status_code=201)
 async def create_booking(booking_request: BookingRequest, request: Request):
     user = verify_firebase_token(request)
 
-    if not db:
+    store = get_store()
+    if not store:
         raise HTTPException(status_code=500, detail="Database connection not available")
 
+    try:
+        release_at_value = release_at(booking_request.release_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid release_time: {e}")
+
     # Generate a unique ID for the job
     job_id = str(uuid.uuid4())
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
@@ -175,6 +267,8 @@ async def create_booking(booking_request: BookingRequest, request: Request):
         "latest_time": booking_request.latest_time,
         "players": booking_request.players,
         "release_time": booking_request.release_time,
+        # Native timestamp for the indexed release-time range queries (cron, worker)
+        "release_at": release_at_value,
         "course_email": booking_request.course_email,
         "course_password": encrypted_password,
         "password_encrypted": bool(booking_request.course_password and encrypted_password != booking_request.course_password),
@@ -185,8 +279,7 @@ async def create_booking(booking_request: BookingRequest, request: Request):
 
     try:
         # Write to Firestore collection 'tee_time_jobs'
-        doc_ref = db.collection('tee_time_jobs').document(job_id)
-        doc_ref.set(job_data)
+        await store.create(job_id, job_data)
 
         # Schedule a Cloud Task for event-driven execution
         schedule_booking_task(job_id, booking_request.release_time)
@@ -200,16 +293,14 @@ async def create_booking(booking_request: BookingRequest, request: Request):
 async def cancel_booking(job_id: str, request: Request):
     user = verify_firebase_token(request)
     
-    if not db:
+    store = get_store()
+    if not store:
         raise HTTPException(status_code=500, detail="Database connection not available")
         
-    doc_ref = db.collection('tee_time_jobs').document(job_id)
-    doc = doc_ref.get()
+    job_data = await store.get(job_id)
     
-    if not doc.exists:
+    if job_data is None:
         raise HTTPException(status_code=404, detail="Booking request not found")
-        
-    job_data = doc.to_dict()
     
     # Verify user ownership of this job
     if job_data.get("uid") != user["uid"]:
@@ -224,7 +315,7 @@ async def cancel_booking(job_id: str, request: Request):
         
     try:
         now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        doc_ref.update({
+        await store.update(job_id, {
             "status": "CANCELLED",
             "result_log": "Cancelled by user",
             "updated_at": now
@@ -238,23 +329,21 @@ async def cancel_booking(job_id: str, request: Request):
 async def delete_booking(job_id: str, request: Request):
     user = verify_firebase_token(request)
     
-    if not db:
+    store = get_store()
+    if not store:
         raise HTTPException(status_code=500, detail="Database connection not available")
         
-    doc_ref = db.collection('tee_time_jobs').document(job_id)
-    doc = doc_ref.get()
+    job_data = await store.get(job_id)
     
-    if not doc.exists:
+    if job_data is None:
         raise HTTPException(status_code=404, detail="Booking request not found")
-        
-    job_data = doc.to_dict()
     
     # Verify user ownership of this job
     if job_data.get("uid") != user["uid"]:
         raise HTTPException(status_code=403, detail="Not authorized to delete this booking request")
         
     try:
-        doc_ref.delete()
+        await store.delete(job_id)
         return {"status": "success", "message": "Booking request successfully deleted."}
     except Exception as e:
         print(f"Firestore delete error: {e}")
@@ -267,28 +356,18 @@ class BatchDeleteRequest(BaseModel):
 async def batch_delete_bookings(req: BatchDeleteRequest, request: Request):
     user = verify_firebase_token(request)
     
-    if not db:
+    store = get_store()
+    if not store:
         raise HTTPException(status_code=500, detail="Database connection not available")
         
-    batch = db.batch()
-    deleted_count = 0
-    
-    for job_id in req.job_ids:
-        doc_ref = db.collection('tee_time_jobs').document(job_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            job_data = doc.to_dict()
-            if job_data.get("uid") == user["uid"]:
-                batch.delete(doc_ref)
-                deleted_count += 1
+    try:
+        deleted_count = await store.delete_owned(req.job_ids, user["uid"])
+    except Exception as e:
+        print(f"Firestore batch delete error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete booking requests")
                 
     if deleted_count > 0:
-        try:
-            batch.commit()
-            return {"status": "success", "message": f"Successfully deleted {deleted_count} booking requests."}
-        except Exception as e:
-            print(f"Firestore batch delete error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to delete booking requests")
+        return {"status": "success", "message": f"Successfully deleted {deleted_count} booking requests."}
     else:
         return {"status": "success", "message": "No bookings were deleted."}
 
@@ -298,64 +377,60 @@ class ExecuteJobRequest(BaseModel):
 @app.post("/api/execute-job")
 async def execute_job(req: ExecuteJobRequest):
     """Called by Cloud Tasks to execute a specific booking job."""
-    if not db:
+    store = get_store()
+    if not store:
         raise HTTPException(status_code=500, detail="Database not initialized")
     
-    doc_ref = db.collection('tee_time_jobs').document(req.job_id)
-    doc = doc_ref.get()
+    job_data = await store.get(req.job_id)
     
-    if not doc.exists:
+    if job_data is None:
         raise HTTPException(status_code=404, detail="Job not found")
-        
-    job_data = doc.to_dict()
     
     # Import execute_booking from worker.py
     # We do this inside the function to avoid circular imports or early initialization issues
     from worker import execute_booking
+    import admission
+    import racing
     
     # We run it synchronously here so Cloud Run stays active until it finishes.
     # Cloud Tasks will wait for the response.
     try:
-        await execute_booking(req.job_id, job_data)
-        return {"status": "success", "job_id": req.job_id}
-    except Exception as e:
-        print(f"Execution error: {e}")
-        # Returning a non-2xx would cause Cloud Tasks to retry. 
-        # For now we return 200 but the job status in Firestore will be FAILED.
-        return {"status": "failed", "error": str(e)}
+        # Queue behind (or shed to another instance) when this one is at its context/memory limits.
+        async with admission.get_controller().admit(req.job_id, contexts=racing.race_contexts(job_data),
+                                                    release_at=job_data.get('release_at')):
+            try:
+                await execute_booking(req.job_id, job_data)
+                return {"status": "success", "job_id": req.job_id}
+            except Exception as e:
+                print(f"Execution error: {e}")
+                # Returning a non-2xx would cause Cloud Tasks to retry. 
+                # For now we return 200 but the job status in Firestore will be FAILED.
+                return {"status": "failed", "error": str(e)}
+    except admission.Overloaded as e:
+        # The job is still PENDING; a 503 makes Cloud Tasks retry it.
+        print(f"Admission shed job {req.job_id}: {e}")
+        return JSONResponse(status_code=503, content={"status": "overloaded", "error": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
 
 @app.get("/api/cron")
 async def trigger_cron():
     """Cleanup stale jobs (Missed release windows)."""
-    if not db:
+    store = get_store()
+    if not store:
         return {"status": "error", "message": "Database not initialized"}
         
     now_utc = datetime.datetime.now(datetime.timezone.utc)
-    cleaned_jobs = []
     
     try:
-        # Check PENDING jobs
-        jobs_ref = db.collection('tee_time_jobs').where('status', '==', 'PENDING')
-        docs = jobs_ref.stream()
-        
-        for doc in docs:
-            job_data = doc.to_dict()
-            release_time_str = job_data.get('release_time')
-            if not release_time_str:
-                continue
-                
-            release_time = datetime.datetime.fromisoformat(release_time_str)
-            time_until_release = (release_time - now_utc).total_seconds()
-            
-            # Clean up stale jobs that were missed (more than 5 minutes in the past)
-            if time_until_release <= -300:
-                print(f"Cron marking stale job {doc.id} as FAILED (Missed release window).")
-                db.collection('tee_time_jobs').document(doc.id).update({
-                    "status": "FAILED",
-                    "result_log": "Missed release window (bot was not running or scheduler failed)",
-                    "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
-                })
-                cleaned_jobs.append(doc.id)
+        # Clean up stale jobs that were missed (released more than 5 minutes ago).
+        # Only those are read (status + release_at index), and they're failed in one bulk write.
+        cleaned_jobs = await store.fail_stale(now_utc - datetime.timedelta(minutes=5), {
+            "status": "FAILED",
+            "result_log": "Missed release window (bot was not running or scheduler failed)",
+            "updated_at": now_utc.isoformat()
+        })
+        for job_id in cleaned_jobs:
+            print(f"Cron marked stale job {job_id} as FAILED (Missed release window).")
                 
         return {"status": "success", "cleaned_jobs": cleaned_jobs}
     except Exception as e:
@@ -397,6 +472,40 @@ def test_proxy():
             "error": str(e)
         }
 
+@app.get("/api/browser-pool")
+def browser_pool_status():
+    """Diagnostic endpoint exposing the warm browser pool's health and recycling state."""
+    from browser_pool import get_pool
+    pool = get_pool()
+    if pool is None:
+        return {"status": "disabled"}
+    return {"status": "running", **pool.stats()}
+
+@app.get("/api/admission")
+def admission_status():
+    """Diagnostic endpoint exposing booking concurrency, queue depth and memory against the admission limits."""
+    import admission
+    return admission.get_controller().stats()
+
+@app.get("/api/session-cache")
+def session_cache_status():
+    """Diagnostic endpoint exposing the course-login cache hit rate and login time saved."""
+    import session_cache
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    if not session_cache.ENABLED:
+        return {"status": "disabled"}
+    return {"status": "enabled", **session_cache.stats(db)}
+
+@app.get("/api/release-offsets")
+def release_offsets():
+    """Diagnostic endpoint exposing each course's observed release timing and learned fire offset."""
+    import release_stats
+    from course_config import COURSE_CONFIG
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    return release_stats.report(db, COURSE_CONFIG.keys())
+
 @app.get("/api/test-tailscale")
 def test_tailscale():
     """Diagnostic endpoint to inspect the Tailscale network status and exit node peer connectivity."""
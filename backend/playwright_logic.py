@@ -1,16 +1,30 @@
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import asyncio
+from contextlib import asynccontextmanager
 from playwright_stealth import Stealth
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import time
 import re
 import logging
 import os
 
+import admission
+import artifacts
+import browser_profile
+import foreup_api
+import date_nav
+import prewarm
+import racing
+import request_blocking
+import slot_fallback
+from release_timer import ReleaseTimer
+from tee_sheet import POLL_INTERVAL_MS, Slot, TeeSheetWatcher, poll_for_slots, rank_slots, record_visible
+from timings import get_timings
+
 # --- Constants & Setup ---
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'
-SCREENSHOT_DIR = 'screenshots'
-os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+# Default delay after the nominal release before firing, for courses without a learned offset.
+RELEASE_OFFSET_SECONDS = 0.250
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # ---------------------------------------------------------------------------
@@ -22,14 +36,22 @@ def parse_time(date_obj, time_obj):
     return datetime.combine(date_obj, time_obj)
 
 
-async def wait_for_release(release_time_str, lead_seconds=1.0, offset_seconds=0.250):
+async def wait_for_release(release_time_str, lead_seconds=1.0, offset_seconds=None, clock_offset=0.0):
     """
-    Precision wait loop to synchronize execution with the exact release time.
-    Calculates time difference and coarse-sleeps, then fine-sleeps/busy-waits.
+    Precision wait to synchronize execution with the exact release time.
+    Coarse-sleeps on the event loop, then hands the last `lead_seconds` to a
+    ReleaseTimer thread that fires on the monotonic clock (see release_timer.py).
+
+    `clock_offset` is the booking platform's clock minus ours (see clock_sync.py);
+    a positive value means the server is ahead, so we fire that much earlier.
+    `offset_seconds` is how long after the release to fire: a course's learned
+    offset (see release_stats.py), or RELEASE_OFFSET_SECONDS if None.
+
+    Returns the trigger jitter report, or None if no wait was needed.
     """
     if not release_time_str:
         logging.info("Precision Sync: No release_time provided, executing immediately.")
-        return
+        return None
         
     try:
         # Normalize ISO 8601 'Z' suffix to '+00:00' for Python compatibility
@@ -37,6 +59,9 @@ async def wait_for_release(release_time_str, lead_seconds=1.0, offset_seconds=0.
             release_time_str = release_time_str[:-1] + '+00:00'
             
         release_dt = datetime.fromisoformat(release_time_str)
+        if clock_offset:
+            logging.info("Precision Sync: Correcting for server clock offset of %+.1fms.", clock_offset * 1000)
+            release_dt = release_dt - timedelta(seconds=clock_offset)
         now_dt = datetime.now(timezone.utc)
         
         diff = (release_dt - now_dt).total_seconds()
@@ -44,37 +69,28 @@ async def wait_for_release(release_time_str, lead_seconds=1.0, offset_seconds=0.
         if diff <= 0:
             logging.info("Precision Sync: Release time %s is in the past (by %.2fs), executing immediately.", 
                          release_time_str, abs(diff))
-            return
+            return None
             
         logging.info("Precision Sync: Synchronizing for release at %s (Current: %s, Diff: %.2fs)", 
                      release_time_str, now_dt.isoformat(), diff)
-                     
-        # Stage 1: Coarse sleep until lead_seconds before target
-        coarse_wait = diff - lead_seconds
-        if coarse_wait > 0:
-            logging.info("Precision Sync: Coarse sleeping for %.2fs...", coarse_wait)
-            await asyncio.sleep(coarse_wait)
-            
-        # Stage 2: Fine-grained loop (busy-wait with tiny sleeps) to hit target precision
+
+        if offset_seconds is None:
+            offset_seconds = RELEASE_OFFSET_SECONDS
         # Target offset_seconds after release to ensure the server-side release is fully live and processed
-        target_ts = release_dt.timestamp() + offset_seconds
-        
-        while True:
-            current_ts = datetime.now(timezone.utc).timestamp()
-            if current_ts >= target_ts:
-                break
-            # Use 5ms sleeps to keep accuracy high while preventing CPU pegging
-            await asyncio.sleep(0.005)
+        timer = ReleaseTimer(release_dt.timestamp() + offset_seconds, handoff_seconds=lead_seconds)
+        report = await timer.wait()
             
-        logging.info("Precision Sync: TARGET REACHED (Current: %s). Releasing trigger!", 
-                     datetime.now(timezone.utc).isoformat())
+        logging.info("Precision Sync: TARGET REACHED (thread error %.3fms, loop error %.3fms). Releasing trigger!", 
+                     report["thread_error_ms"], report["loop_error_ms"])
+        return report
                      
     except Exception as e:
         logging.error("Precision Sync: Error in wait_for_release: %s", e)
+        return None
 
 
-async def _new_stealth_context(p, headless=True):
-    """Launch a Chromium context with anti-bot flags and optional proxy support."""
+async def _launch_stealth_browser(p, headless=True):
+    """Launch a Chromium browser with the configured launch profile (browser_profile.py) and optional proxy support."""
     proxy_server = os.getenv("PLAYWRIGHT_PROXY_SERVER")
     proxy_username = os.getenv("PLAYWRIGHT_PROXY_USERNAME")
     proxy_password = os.getenv("PLAYWRIGHT_PROXY_PASSWORD")
@@ -87,54 +103,372 @@ async def _new_stealth_context(p, headless=True):
             proxy_dict["username"] = proxy_username
             proxy_dict["password"] = proxy_password
 
-    browser = await p.chromium.launch(
+    return await p.chromium.launch(
         headless=headless,
-        args=['--disable-blink-features=AutomationControlled', '--disable-gpu', '--no-sandbox'],
+        args=browser_profile.launch_args() + request_blocking.LAUNCH_ARGS,
         proxy=proxy_dict
     )
-    context = await browser.new_context(
+
+
+async def _new_context(browser, storage_state=None):
+    """
+    Open a fresh, isolated context on an already-running browser, optionally
+    pre-loaded with a saved login (see session_cache.py). Heavy and analytics
+    requests are blocked per page by _new_page(), not by a route handler.
+    """
+    return await browser.new_context(
         user_agent=USER_AGENT,
-        viewport={'width': 1920, 'height': 1080},
-        timezone_id='America/New_York'
+        viewport=browser_profile.viewport(),
+        timezone_id='America/New_York',
+        storage_state=storage_state,
     )
 
-    async def abort_heavy_requests(route):
-        if route.request.resource_type in ["image", "media", "font"]:
-            await route.abort()
-        else:
-            await route.continue_()
-    await context.route("**/*", abort_heavy_requests)
 
+async def _new_page(context):
+    """Open a page with images, fonts, media and analytics blocked inside Chromium (see request_blocking.py)."""
+    page = await context.new_page()
+    await request_blocking.block(page)
+    return page
+
+
+async def _new_stealth_context(p, headless=True, storage_state=None):
+    """Launch a Chromium context with anti-bot flags and optional proxy support."""
+    browser = await _launch_stealth_browser(p, headless=headless)
+    context = await _new_context(browser, storage_state=storage_state)
     return browser, context
 
+
+@asynccontextmanager
+async def _stealth_session(headless=True, storage_state=None):
+    """
+    Yield a ready-to-use stealth browser context for a single booking run.
+
+    Borrows a context from the process-wide warm browser pool when one is running
+    (see browser_pool.py), otherwise falls back to a cold Chromium launch. Either
+    way the context is torn down when the block exits. `storage_state` restores
+    a cached course login into the new context.
+    """
+    from browser_pool import get_pool
+
+    # Live contexts feed the instance's admission control (see admission.py).
+    controller = admission.get_controller()
+    pool = get_pool()
+    if pool is not None and pool.headless == headless:
+        async with pool.acquire(storage_state=storage_state) as context:
+            controller.context_opened()
+            try:
+                yield context
+            finally:
+                controller.context_closed()
+        return
+
+    async with Stealth().use_async(async_playwright()) as p:
+        browser, context = await _new_stealth_context(p, headless=headless, storage_state=storage_state)
+        controller.context_opened()
+        try:
+            yield context
+        finally:
+            controller.context_closed()
+            await browser.close()
+
+# ---------------------------------------------------------------------------
+# Condition-based waits (instead of fixed wait_for_timeout sleeps). Each one has
+# its own upper bound and never raises on timeout; the flow carries on and the
+# next real action fails loudly if the page genuinely isn't ready.
+# ---------------------------------------------------------------------------
+
+# Resolves once the DOM under `selector` has gone `quietMs` without a mutation,
+# or after `timeoutMs` regardless.
+_DOM_QUIET_JS = """
+([selector, quietMs, timeoutMs]) => new Promise(resolve => {
+    const root = document.querySelector(selector) || document.body;
+    let quiet = null;
+    const done = () => { observer.disconnect(); clearTimeout(quiet); clearTimeout(hard); resolve(true); };
+    const observer = new MutationObserver(() => { clearTimeout(quiet); quiet = setTimeout(done, quietMs); });
+    const hard = setTimeout(done, timeoutMs);
+    quiet = setTimeout(done, quietMs);
+    observer.observe(root, { childList: true, subtree: true, attributes: true, characterData: true });
+})
+"""
+
+
+async def _wait_dom_quiet(page, selector='body', quiet_ms=150, timeout=2000):
+    """Wait for Angular/React to stop re-rendering `selector`, bounded by `timeout` ms."""
+    try:
+        await page.evaluate(_DOM_QUIET_JS, [selector, quiet_ms, timeout])
+    except Exception as e:
+        logging.debug("DOM quiet wait on %s ended early: %s", selector, e)
+
+
+async def _text_of(page, selector):
+    return await page.evaluate(
+        "sel => { const el = document.querySelector(sel); return el ? el.textContent.trim() : ''; }", selector)
+
+
+async def _wait_text_change(page, selector, before, timeout):
+    """Wait until `selector`'s text differs from `before` (e.g. a calendar header after a month arrow)."""
+    try:
+        await page.wait_for_function(
+            "([sel, before]) => { const el = document.querySelector(sel); return !!el && el.textContent.trim() !== before; }",
+            arg=[selector, before], timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def _wait_visible(locator, timeout, state='visible'):
+    """Wait for a locator state; returns False instead of raising on timeout."""
+    try:
+        await locator.wait_for(state=state, timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def _cached_login_valid(session, login_prompt):
+    """
+    For a run that restored a cached course login (session_cache.py): True if the
+    page shows no login prompt, i.e. the session is still good and the flow can
+    skip its login. Records the hit or expiry on the session.
+    """
+    if session is None or session.storage_state is None:
+        return False
+    if await login_prompt.is_visible():
+        session.expired()
+        return False
+    session.hit()
+    return True
+
+
+# Returns every slot matching `selector` in one CDP round trip, instead of one
+# inner_text() call per element. `index` is the element's position in
+# querySelectorAll order, so `page.locator(selector).nth(index)` re-finds it.
+_EXTRACT_SLOTS_JS = r"""
+(selector) => {
+    const results = [];
+    document.querySelectorAll(selector).forEach((el, idx) => {
+        const txt = el.textContent || '';
+        const m = txt.match(/(\d{1,2}:\d{2})\s*([AP])\.?\s*M?/i);
+        if (!m) return;
+        const blocked = '[disabled], [aria-disabled="true"], .disabled, .is-disabled, .unavailable, .booked';
+        const rect = el.getBoundingClientRect();
+        results.push({
+            index: idx,
+            time: m[1],
+            ampm: m[2].toUpperCase() + 'M',
+            text: txt.trim().slice(0, 200),
+            disabled: el.matches(blocked) || !!el.closest(blocked),
+            visible: rect.width > 0 && rect.height > 0,
+        });
+    });
+    return results;
+}
+"""
+
+
+async def _extract_slots(page, selector):
+    """Extract time, DOM index and availability metadata for every slot in one call."""
+    return await page.evaluate(_EXTRACT_SLOTS_JS, selector)
+
+
+def _slots_in_window(entries, booking):
+    """Enabled extracted slots inside the booking window as Slots, in page (time) order, one per time."""
+    earliest = parse_time(booking.desired_date, booking.earliest_time)
+    latest = parse_time(booking.desired_date, booking.latest_time)
+    date_str = booking.desired_date.strftime('%Y-%m-%d')
+    in_window = {}
+    for entry in entries:
+        if entry['disabled']:
+            continue
+        try:
+            avail = datetime.strptime(f"{date_str} {entry['time']}{entry['ampm']}", '%Y-%m-%d %I:%M%p')
+        except ValueError:
+            continue
+        if earliest <= avail <= latest and avail not in in_window:
+            in_window[avail] = Slot(avail)
+    return list(in_window.values())
+
+
+def _slot_element(page, slot_selector, slot):
+    """The first element under `slot_selector` that renders `slot`'s time."""
+    return page.locator(slot_selector).filter(has_text=slot.text_pattern()).first
+
+
+async def _ranked_sheet_slots(page, watcher, booking, slot_selector, timeout=5000):
+    """
+    This run's candidate slots, best first (see slot_fallback.py). Ranked from
+    intercepted tee-sheet data once the best one has rendered; from a DOM scan
+    if there is no data yet, nothing in the window, or it never showed up.
+    Empty if the window has no bookable slot.
+    """
+    ranked = slot_fallback.candidates_for(booking, rank_slots(
+        watcher.slots or [], booking.desired_date, booking.earliest_time, booking.latest_time, booking.players))
+    if ranked:
+        if await _wait_visible(_slot_element(page, slot_selector, ranked[0]), timeout):
+            logging.info("Found matching tee time(s) from tee sheet data: %s", ", ".join(s.label for s in ranked))
+            return ranked
+        logging.warning("Tee sheet slot %s not rendered, falling back to DOM scan.", ranked[0].label)
+
+    # Extract all tee time strings atomically in a single JS call to avoid stale
+    # element references caused by the SPA re-rendering the grid mid-iteration.
+    ranked = slot_fallback.candidates_for(booking, _slots_in_window(await _extract_slots(page, slot_selector), booking))
+    if ranked:
+        logging.info("Found matching tee time(s) in the DOM: %s", ", ".join(s.label for s in ranked))
+    return ranked
+
+
+async def _wait_for_open_sheet(page, watcher, booking, timings, slot_selector, rerender):
+    """
+    After the release, make sure the tee sheet has a slot in the booking window
+    before searching it, and record when slots became visible. While it's empty
+    (late release, cached page) poll it: by replaying the page's tee-sheet
+    request when it made one, else by `rerender()` (re-clicking the day) and
+    reading the fresh XHR or DOM. Once replayed data shows slots, re-renders so
+    the page draws them.
+    """
+    if not getattr(booking, 'release_time', None):
+        return
+    in_window = lambda slots: rank_slots(slots or [], booking.desired_date, booking.earliest_time,
+                                         booking.latest_time, booking.players)
+    if in_window(watcher.slots):
+        record_visible(timings, 'first_load', visible_epoch=watcher.received_epoch)
+        return
+    if watcher.slots is None and _slots_in_window(await _extract_slots(page, slot_selector), booking):
+        record_visible(timings, 'first_load', visible_epoch=time.time())
+        return
+
+    replay = watcher.request is not None
+
+    async def fetch():
+        if replay:
+            return await watcher.refetch()
+        watcher.reset()
+        await rerender()
+        slots = await watcher.wait_for_slots(timeout=POLL_INTERVAL_MS / 1000)
+        if slots is None:
+            slots = _slots_in_window(await _extract_slots(page, slot_selector), booking)
+        return slots
+
+    budget = timings.budget
+    found = await budget.wait('slot_poll', poll_for_slots(fetch, booking, timings, 'data_endpoint' if replay else 'rerender'))
+    if found and replay:
+        watcher.reset()
+        await rerender()
+        await budget.wait('slot_poll', watcher.wait_for_slots(timeout=5))
+
+
+async def _click_into_slot(page, element, opened, deadline, budget, wait_label, tries=3, wait_ms=2000,
+                           center_click=False):
+    """
+    Click a tee time until `opened` (its booking modal or first checkout step)
+    shows; `center_click` adds a raw mouse click for cards that swallow the
+    element click. Raises SlotUnavailable if the site says the slot is gone, or if it
+    never opens before `deadline`; nothing is reserved yet at this point, so the
+    caller can safely move on to its next slot.
+    """
+    unavailable = page.get_by_text(slot_fallback.UNAVAILABLE_TEXT).first
+    clicks = 0
+    while clicks < tries and time.monotonic() < deadline:
+        clicks += 1
+        logging.info("Clicking tee time slot (Attempt %d)", clicks)
+        try:
+            await element.scroll_into_view_if_needed(timeout=slot_fallback.remaining_ms(deadline, 2000))
+            await element.click(force=True, timeout=slot_fallback.remaining_ms(deadline, 2000))
+            box = await element.bounding_box() if center_click else None
+            if box:
+                await page.mouse.click(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+        except Exception as e:
+            logging.warning("Click action error: %s", e)
+        # The bound on the modal is the retry gap; no extra sleep before re-clicking.
+        await budget.wait(wait_label, _wait_visible(opened.or_(unavailable).first,
+                                                    timeout=slot_fallback.remaining_ms(deadline, wait_ms)))
+        if await opened.is_visible():
+            return
+        if await unavailable.is_visible():
+            raise slot_fallback.SlotUnavailable((await unavailable.inner_text()).strip())
+    raise slot_fallback.SlotUnavailable(f"Booking modal did not open after {clicks} click(s).")
+
+
+# True once a CPS checkout has either navigated away (booked) or shows a
+# rejection notice matching the pattern passed in (see slot_fallback.py).
+_CHECKOUT_SETTLED_JS = """
+(pattern) => !location.href.toLowerCase().includes('checkout') || new RegExp(pattern, 'i').test(document.body.innerText)
+"""
+
+
+async def _unavailable_after_confirm(page):
+    """
+    After a final confirm that didn't confirm: raise SlotUnavailable if the site
+    says the slot went to someone else (so it's safe to try the next one).
+    """
+    unavailable = page.get_by_text(slot_fallback.UNAVAILABLE_TEXT).first
+    if await unavailable.is_visible():
+        raise slot_fallback.SlotUnavailable((await unavailable.inner_text()).strip())
+
+async def _open_target_day(booking, watcher, budget, nav, click_day, toggle_month, timeout):
+    """
+    After the release: click the target day and wait up to `timeout` seconds for
+    its tee sheet. Clicks the day directly first (see date_nav.py) and only calls
+    `toggle_month` to refresh the calendar's disabled days if that didn't load
+    the sheet. Returns the intercepted slots, or None.
+    """
+    release_time = getattr(booking, 'release_time', None)
+    nav.start()
+    method, slots = 'day_click', None
+    if date_nav.ENABLED or not release_time:
+        watcher.reset()
+        await click_day()
+        slots = await budget.wait('tee_sheet', watcher.wait_for_slots(
+            timeout=date_nav.DAY_CLICK_TIMEOUT if release_time else timeout))
+    if slots is None and release_time:
+        method = 'month_toggle'
+        await toggle_month()
+        watcher.reset()
+        await click_day()
+        slots = await budget.wait('tee_sheet', watcher.wait_for_slots(timeout=timeout))
+    nav.done('fire', method)
+    return slots
+
 # ---------------------------------------------------------------------------
 # CPS Golf (Capital Hills / Old Post Road)
 # ---------------------------------------------------------------------------
 
 async def book_cps_golf(url, booking, email, password, dry_run=False, headless=True):
     """Verified flow for CPS Golf sites."""
-    async with Stealth().use_async(async_playwright()) as p:
-        browser, context = await _new_stealth_context(p, headless=headless)
-        page = await context.new_page()
+    timings = get_timings(booking)
+    budget = timings.budget
+    session = getattr(booking, 'session', None)
+    timings.mark('arm')
+    timings.step('launch')
+    async with _stealth_session(headless=headless, storage_state=session and session.storage_state) as context:
+        page = await _new_page(context)
+        watcher = TeeSheetWatcher(page, 'cps', booking.desired_date)
+        warm = prewarm.Prewarmer(page, timings)
         try:
+            timings.step('goto')
             logging.info("Navigating to CPS Golf URL: %s", url)
-            await page.goto(url, wait_until='networkidle')
-
-            # --- Auth ---
-            logging.info("Starting authentication.")
-            await page.get_by_role('button', name='Sign In').click()
-
-            email_field = page.get_by_role('textbox', name='Email', exact=True)
-            await email_field.wait_for(state='visible', timeout=10000)
-            await email_field.fill(email)
-            await page.get_by_role('button', name='NEXT').click()
-
-            pass_field = page.get_by_role('textbox', name='Password', exact=True)
-            await pass_field.wait_for(state='visible', timeout=10000)
-            await pass_field.fill(password)
-            await page.get_by_role('button', name='SIGN IN', exact=True).click()
-            
-            logging.info("Sign-in button clicked. Waiting for dashboard to load.")
+            # Carries the target date, so the calendar opens on the right month (see date_nav.py)
+            await page.goto(date_nav.deep_link('cps', url, booking.desired_date), wait_until='networkidle')
+
+            # --- Auth (skipped when a cached login is still valid) ---
+            timings.step('login')
+            cached = await _cached_login_valid(session, page.get_by_role('button', name='Sign In'))
+            login_started = time.monotonic()
+            if not cached:
+                logging.info("Starting authentication.")
+                await page.get_by_role('button', name='Sign In').click()
+
+                email_field = page.get_by_role('textbox', name='Email', exact=True)
+                await email_field.wait_for(state='visible', timeout=10000)
+                await email_field.fill(email)
+                await page.get_by_role('button', name='NEXT').click()
+
+                pass_field = page.get_by_role('textbox', name='Password', exact=True)
+                await pass_field.wait_for(state='visible', timeout=10000)
+                await pass_field.fill(password)
+                await page.get_by_role('button', name='SIGN IN', exact=True).click()
+
+                logging.info("Sign-in button clicked. Waiting for dashboard to load.")
             # Wait for any of these to confirm the dashboard is live
             try:
                 await page.locator('.ngx-dates-picker-container, app-ngx-dates-picker, .topbar-title, .advancefilter-container').first.wait_for(state='visible', timeout=25000)
@@ -143,15 +477,23 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                 logging.warning("Dashboard container not detected via locator, falling back to networkidle.")
                 await page.wait_for_load_state('networkidle', timeout=15000)
             
-            # Additional settling time for headless
-            await page.wait_for_timeout(3000)
+            if not cached and session is not None:
+                await session.save(context, (time.monotonic() - login_started) * 1000)
+
+            # Let the dashboard finish its initial render before touching the calendar
+            await _wait_dom_quiet(page, '.ngx-dates-picker-container, app-ngx-dates-picker', quiet_ms=300, timeout=3000)
 
             # --- Navigate date ---
+            timings.step('calendar')
             logging.info("Navigating to target date: %s", booking.desired_date)
-            
-            today = datetime.today().date()
-            months_ahead = (booking.desired_date.year - today.year) * 12 + booking.desired_date.month - today.month
-            if months_ahead > 0:
+            nav = date_nav.DateNav(timings, booking.desired_date)
+            nav.start()
+            months_ahead = nav.report['months_ahead']
+            if months_ahead == 0:
+                nav.done('arm', 'current_month')
+            elif date_nav.ENABLED and await date_nav.on_target_month(page, '.topbar-container', booking.desired_date):
+                nav.done('arm', 'deep_link')
+            else:
                 logging.info("Target date is in a future month. Navigating calendar ahead by %d month(s).", months_ahead)
                 arrow_selector = ".topbar-container > div:last-child, .topbar-container div:has(svg polygon#Forward)"
                 for i in range(months_ahead):
@@ -159,8 +501,10 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                     await btn.wait_for(state='visible', timeout=8000)
                     # Remove 'disabled' class if present before clicking
                     await btn.evaluate("el => el.classList.remove('disabled')")
+                    month_label = await _text_of(page, '.topbar-container')
                     await btn.click(force=True)
-                    await page.wait_for_timeout(1500)
+                    await _wait_text_change(page, '.topbar-container', month_label, timeout=1500)
+                nav.done('arm', 'arrows')
             
             day_str = str(booking.desired_date.day)
             day_button = page.locator('.ngx-dates-picker-container .day-unit').filter(has_text=re.compile(rf'^{day_str}$')).first
@@ -186,48 +530,67 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                 }
             }""")
             
-            # Precision wait until release time
-            await wait_for_release(getattr(booking, 'release_time', None))
+            # --- Armed: park here until release ---
+            timings.mark('release_wait')
+            warm.start()
+            trigger = await wait_for_release(getattr(booking, 'release_time', None),
+                                             offset_seconds=getattr(booking, 'release_offset', None),
+                                             clock_offset=getattr(booking, 'clock_offset', 0.0))
+            timings.record('release_trigger', trigger)
+            timings.mark('fire')
+            warm.fire()
             
-            # Toggle month right after wait to refresh calendar states
-            if getattr(booking, 'release_time', None):
+            # Click the day straight away; toggle the month to refresh calendar states only if that fails
+            timings.step('tee_sheet')
+
+            async def click_day():
+                await day_button.click(force=True)
+                logging.info(f"Clicked day {day_str} directly.")
+
+            async def toggle_month():
+                nonlocal day_button
                 try:
                     logging.info("Precision Sync: Toggling month to refresh calendar states.")
                     prev_btn = page.locator('.topbar-container > div:first-child').first
                     next_btn = page.locator('.topbar-container > div:last-child').first
                     if await prev_btn.is_visible(timeout=2000) and await next_btn.is_visible(timeout=2000):
                         await prev_btn.evaluate("el => el.classList.remove('disabled')")
+                        month_label = await _text_of(page, '.topbar-container')
                         await prev_btn.click(force=True)
-                        await page.wait_for_timeout(300)
+                        await budget.wait('month_toggle', _wait_text_change(page, '.topbar-container', month_label, timeout=300))
+                        prev_label = await _text_of(page, '.topbar-container')
                         await next_btn.click(force=True)
-                        await page.wait_for_timeout(300)
+                        await budget.wait('month_toggle', _wait_text_change(page, '.topbar-container', prev_label, timeout=300))
                         # Re-locate the day element since DOM re-rendered
                         day_button = page.locator('.ngx-dates-picker-container .day-unit').filter(has_text=re.compile(rf'^{day_str}$')).first
                         if not await day_button.is_visible():
                              day_button = page.get_by_text(day_str, exact=True).first
                 except Exception as e:
                     logging.warning("Failed to toggle month: %s", e)
-            
-            await day_button.click(force=True)
-            logging.info(f"Clicked day {day_str} directly.")
-            await page.wait_for_load_state('networkidle', timeout=10000)
+
+            # The day's tee sheet arrives as JSON; no need to wait for the page to go network-idle.
+            if await _open_target_day(booking, watcher, budget, nav, click_day, toggle_month, timeout=10) is None:
+                await budget.wait('tee_sheet', page.wait_for_load_state('networkidle', timeout=10000))
 
             # --- Players & Holes ---
             logging.info("Selecting %d players and 18 holes.", booking.players)
-            await page.wait_for_timeout(2000)
+            await budget.wait('render', _wait_dom_quiet(page, quiet_ms=150, timeout=2000))
             try:
+                watcher.reset()
                 await page.get_by_role("button", name=str(booking.players), exact=True).click(force=True, timeout=8000)
-                await page.wait_for_timeout(1500)
+                # Changing the player filter re-queries the tee sheet
+                await budget.wait('players_filter', watcher.wait_for_slots(timeout=1.5))
                 
                 logging.info("Opening holes dropdown.")
                 # The Holes dropdown is the second mat-select on the page (first is Course)
                 holes_select = page.locator('mat-select#mat-select-8, mat-select').nth(1)
                 await holes_select.wait_for(state='visible', timeout=8000)
                 await holes_select.click(force=True)
-                await page.wait_for_timeout(1000)
+                overlay = page.locator('.cdk-overlay-container')
+                await budget.wait('holes_overlay', _wait_visible(overlay.locator('mat-option').first, timeout=1000))
 
                 logging.info("Selecting '18 Holes'.")
-                overlay = page.locator('.cdk-overlay-container')
+                watcher.reset()
                 try:
                     await overlay.get_by_text("18 Holes", exact=True).first.click(force=True, timeout=3000)
                 except Exception:
@@ -235,13 +598,13 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                         await overlay.get_by_text("18", exact=True).first.click(force=True, timeout=3000)
                     except Exception:
                         logging.warning("Could not find 18 Holes option in overlay, continuing with default.")
-                await page.wait_for_timeout(2000)
+                await budget.wait('holes_filter', watcher.wait_for_slots(timeout=2.0))
             except Exception as e:
                 logging.warning("Failed to set players/holes via codegen sequence: %s", e)
 
             # --- Expand all time sections ---
             logging.info("Expanding all tee time sections.")
-            await page.wait_for_timeout(1500) 
+            await budget.wait('render', _wait_dom_quiet(page, quiet_ms=150, timeout=1500))
             for label in [
                 'Show more Morning tee times', 'Show more Mid Day tee times',
                 'Show more Late Day tee times', 'Show more Evening tee times',
@@ -252,123 +615,97 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                         await btn.click(force=True, timeout=2000)
                     except: pass
 
-            # --- Find tee time in window ---
+            # --- Find tee times in window ---
+            timings.step('slot_search')
             logging.info("Searching for tee time between %s and %s.", booking.earliest_time, booking.latest_time)
-            earliest = parse_time(booking.desired_date, booking.earliest_time)
-            latest = parse_time(booking.desired_date, booking.latest_time)
-
-            # Extract all tee time strings atomically in a single JS call to avoid
-            # stale element references caused by Angular re-rendering the grid mid-iteration.
-            raw_times = await page.evaluate('''
-                () => {
-                    const els = document.querySelectorAll('button, mat-card, .teetime-card, [class*="teetime"]');
-                    const results = [];
-                    els.forEach((el, idx) => {
-                        const txt = el.textContent || '';
-                        const m = txt.match(/(\\d{1,2}:\\d{2})\\s*([AP])\\s*M?/i);
-                        if (m) results.push({ index: idx, time: m[1], ampm: m[2].toUpperCase() + 'M', text: txt.trim() });
-                    });
-                    return results;
-                }
-            ''')
-
-            booking_index = None
-            best_time_str = ''
-
-            date_str = booking.desired_date.strftime('%Y-%m-%d')
-            for entry in raw_times:
-                ts = f"{entry['time']}{entry['ampm']}"
-                try:
-                    avail = datetime.strptime(f"{date_str} {ts}", '%Y-%m-%d %I:%M%p')
-                    if earliest <= avail <= latest:
-                        booking_index = entry['index']
-                        best_time_str = ts
-                        logging.info("Found matching tee time: %s (DOM index %d)", best_time_str, booking_index)
-                        break
-                except ValueError:
-                    continue
-
-            if booking_index is None:
+            slot_selector = 'button, mat-card, .teetime-card, [class*="teetime"]'
+            await _wait_for_open_sheet(page, watcher, booking, timings, slot_selector, click_day)
+            ranked = await _ranked_sheet_slots(page, watcher, booking, slot_selector)
+            if not ranked:
                 raise Exception(f'No tee time found between {booking.earliest_time} and {booking.latest_time}')
 
-            # Re-locate the element fresh from the DOM right before clicking
-            booking_element = page.locator('button, mat-card, .teetime-card, [class*="teetime"]').nth(booking_index)
-
             if dry_run:
-                return f'Dry run success at {best_time_str}'
+                return f'Dry run success at {ranked[0].label.replace(" ", "")}'
 
-            # --- Book & Finalize ---
-            logging.info("Attempting to book tee time: %s", best_time_str)
+            # --- Book & Finalize, falling back to the next-best slot if one is lost ---
+            next_or_continue = page.get_by_role("button", name=re.compile(r'Next|Continue', re.I)).first
 
-            # 1. Click tee time until the checkout modal/notice appears
-            modal_opened = False
-            for attempt in range(6):
-                logging.info(f"Clicking tee time slot (Attempt {attempt + 1})")
+            async def back_to_sheet():
+                """Close a lost slot's checkout and return to the tee sheet."""
                 try:
-                    await booking_element.scroll_into_view_if_needed()
-                    await booking_element.click(force=True)
-                    
-                    box = await booking_element.bounding_box()
-                    if box:
-                        await page.mouse.click(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+                    await page.keyboard.press('Escape')
+                    if "checkout" in page.url.lower():
+                        await page.go_back(wait_until='commit')
+                    await budget.wait('render', _wait_dom_quiet(page, quiet_ms=150, timeout=1000))
                 except Exception as e:
-                    logging.warning(f"Click action error: {e}")
-                
+                    logging.warning("Could not return to the tee sheet: %s", e)
+
+            async def attempt(slot, deadline):
+                best_time_str = slot.label.replace(' ', '')
+                timings.step('click')
+                logging.info("Attempting to book tee time: %s", best_time_str)
                 try:
-                    next_or_continue = page.get_by_role("button", name=re.compile(r'Next|Continue', re.I)).first
-                    await next_or_continue.wait_for(state='visible', timeout=5000)
+                    # 1. Click tee time until the checkout modal/notice appears
+                    await _click_into_slot(page, _slot_element(page, slot_selector, slot), next_or_continue,
+                                           deadline, budget, 'checkout_modal', center_click=True)
                     logging.info("Checkout modal/notice opened.")
-                    modal_opened = True
-                    break
-                except PlaywrightTimeoutError:
-                    await page.wait_for_timeout(2000)
-                    continue
 
-            if not modal_opened:
-                screenshot_path = os.path.join(SCREENSHOT_DIR, 'modal_fail_debug.png')
-                await page.screenshot(path=screenshot_path, timeout=5000, animations="disabled")
-                raise Exception("Checkout modal/notice failed to open after clicking tee time slot.")
+                    # 2. Sequence through the checkout steps (click Next/Continue through terms & notices)
+                    timings.step('confirm')
+                    for step in range(3):
+                        btn = page.get_by_role("button", name=re.compile(r'Next|Continue', re.I)).first
+                        if await btn.is_visible(timeout=3000):
+                            logging.info(f"Clicking modal step button: {await btn.inner_text()}")
+                            await btn.click(force=True)
+                            await budget.wait('checkout_step', _wait_dom_quiet(page, '.cdk-overlay-container', quiet_ms=200, timeout=2000))
+                        else:
+                            break
 
-            # 2. Sequence through the checkout steps (click Next/Continue through terms & notices)
-            try:
-                for step in range(3):
-                    btn = page.get_by_role("button", name=re.compile(r'Next|Continue', re.I)).first
-                    if await btn.is_visible(timeout=3000):
-                        logging.info(f"Clicking modal step button: {await btn.inner_text()}")
-                        await btn.click(force=True)
-                        await page.wait_for_timeout(2000)
-                    else:
-                        break
+                    logging.info("Looking for button: Complete/Finalize Reservation")
+                    finalize_btn = page.get_by_role("button", name=re.compile(r'Complete Reservation|Finalize Reservation|Book', re.I)).first
+                    if not await budget.wait('checkout_step', _wait_visible(
+                            finalize_btn, timeout=slot_fallback.remaining_ms(deadline, 15000))):
+                        raise slot_fallback.SlotUnavailable("Checkout never offered a Complete Reservation button.")
+                except slot_fallback.SlotUnavailable:
+                    await back_to_sheet()
+                    raise
+                # Only one racing candidate may ever press the final button.
+                racing.claim_confirm(booking)
 
-                logging.info("Looking for button: Complete/Finalize Reservation")
-                finalize_btn = page.get_by_role("button", name=re.compile(r'Complete Reservation|Finalize Reservation|Book', re.I)).first
-                await finalize_btn.wait_for(state='visible', timeout=15000)
-                
                 clicked_successfully = False
-                for attempt in range(6):
-                    logging.info(f"Clicking Complete/Finalize Reservation (Attempt {attempt + 1})")
+                for click in range(6):
+                    logging.info(f"Clicking Complete/Finalize Reservation (Attempt {click + 1})")
                     try:
                         await finalize_btn.scroll_into_view_if_needed()
-                        if attempt % 2 == 0:
+                        if click % 2 == 0:
                             await finalize_btn.click(force=True)
                         else:
                             await finalize_btn.dispatch_event("click")
                     except Exception as e:
                         logging.warning(f"Click action threw an error: {e}")
-                    
+
                     try:
-                        await page.wait_for_url(lambda url: "checkout" not in url.lower(), timeout=5000)
+                        # Leaving checkout means the reservation went through; a "no longer
+                        # available" notice means it was rejected for good, so try the next slot.
+                        await budget.wait('confirm', page.wait_for_function(
+                            _CHECKOUT_SETTLED_JS, arg=slot_fallback.UNAVAILABLE_TEXT.pattern, timeout=5000))
+                    except PlaywrightTimeoutError:
+                        logging.warning("URL did not change. Retrying...")
+                        continue
+                    if "checkout" not in page.url.lower():
                         logging.info("URL changed! Proceeding to success verification.")
                         clicked_successfully = True
                         break
-                    except PlaywrightTimeoutError:
-                        logging.warning("URL did not change. Retrying...")
-                        await page.wait_for_timeout(2000)
+                    try:
+                        await _unavailable_after_confirm(page)
+                    except slot_fallback.SlotUnavailable:
+                        await back_to_sheet()
+                        raise
 
                 try:
                     await page.wait_for_load_state('domcontentloaded', timeout=20000)
                 except: pass
-                
+
                 # Verify success — check for 'Return to Tee Times' button, known
                 # confirmation text patterns, or a URL change away from checkout.
                 return_btn = page.get_by_role('button', name='Return to Tee Times')
@@ -397,19 +734,25 @@ async def book_cps_golf(url, booking, email, password, dry_run=False, headless=T
                         raise Exception(f"Still on checkout page after clicking Finalize. URL: {page.url}")
                     else:
                         raise Exception(f"Finalize button clicked, but reached an unknown state. URL: {page.url}")
-            
+                return best_time_str
+
+            try:
+                best_time_str, _ = await slot_fallback.try_in_order(ranked, attempt, timings, label=lambda s: s.label)
+            except slot_fallback.SlotUnavailable:
+                await artifacts.capture(page, booking, 'modal_fail_debug')
+                raise
             except PlaywrightTimeoutError as e:
                 logging.error(f"Confirmation sequence timed out: {e}")
                 raise Exception(f"Failed to complete booking steps: {e}")
-            
+
             return f'Success! Booked {best_time_str}'
 
+        except racing.RaceLost:
+            raise
         except Exception as e:
             logging.error("An error occurred in book_cps_golf: %s", e, exc_info=True)
-            await page.screenshot(path=os.path.join(SCREENSHOT_DIR, 'cps_golf_error.png'), timeout=5000, animations="disabled")
+            await artifacts.capture(page, booking, 'cps_golf_error')
             raise
-        finally:
-            await browser.close()
 
 async def book_cps_old_post(url, booking, email, password, dry_run=False, headless=True):
     return await book_cps_golf(url, booking, email, password, dry_run=dry_run, headless=headless)
@@ -422,34 +765,134 @@ async def book_town_of_colonie(url, booking, email, password, dry_run=False, hea
 # ForeUp
 # ---------------------------------------------------------------------------
 
+def _foreup_login_link(page):
+    """ForeUp's header "Log In" link; only shown while signed out."""
+    return page.locator('a, button').filter(
+        has_text=re.compile(r'^\s*(Log\s?In|Sign\s?In)\s*$', re.IGNORECASE)
+    ).first
+
+
+async def _foreup_login(page, booking, email, password):
+    """
+    Log in through ForeUp's header "Log In" link during the arm phase, so the
+    post-release path doesn't pay for the login modal. Returns True if a login
+    was performed; False if no login link was shown (already signed in, or the
+    course only prompts for login after a slot is picked).
+    """
+    login_link = _foreup_login_link(page)
+    try:
+        if not await login_link.is_visible(timeout=3000):
+            return False
+    except Exception:
+        return False
+
+    logging.info("Arm: logging in to ForeUp before release.")
+    await login_link.click()
+    email_input = page.get_by_placeholder("Email").first
+    pass_input = page.get_by_placeholder("Password").first
+    await email_input.wait_for(state='visible', timeout=10000)
+    await email_input.fill(email)
+    await pass_input.fill(password)
+    await pass_input.press("Enter")
+    try:
+        await email_input.wait_for(state='hidden', timeout=15000)
+    except PlaywrightTimeoutError:
+        await artifacts.capture(page, booking, 'foreup_login_error')
+        raise Exception("Golf course login failed - credentials may be incorrect, or portal blocked login.")
+    logging.info("Arm: ForeUp login successful.")
+    return True
+
+
+async def _wait_foreup_confirmation(page, conf_locator, timeout, rejected=None):
+    """
+    Race a confirmation-looking URL against a confirmation element. Returns True on either.
+    Every ForeUp page lives under /index.php/booking/, so only a URL that changed
+    after the click counts, and 'booking' itself is not a confirmation keyword.
+    If the `rejected` locator (a "no longer available" error) shows first, raises SlotUnavailable.
+    """
+    url_keywords = ('confirm', 'success', 'reservation')
+    before = page.url
+    waits = {
+        asyncio.create_task(page.wait_for_url(
+            lambda u: u != before and any(k in u.lower() for k in url_keywords), timeout=timeout * 1000)): "URL",
+        asyncio.create_task(conf_locator.wait_for(state='visible', timeout=timeout * 1000)): "text",
+    }
+    if rejected is not None:
+        waits[asyncio.create_task(rejected.wait_for(state='visible', timeout=timeout * 1000))] = "rejection"
+    pending = set(waits)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if waits[task] == "rejection":
+                        raise slot_fallback.SlotUnavailable((await rejected.inner_text()).strip())
+                    logging.info("ForeUp: Confirmation %s detected: %s", waits[task], page.url)
+                    return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
 async def book_via_foreup_software(url, booking, email, password, dry_run=False, headless=False, pay_at_facility=False):
     """Verified flow for ForeUp sites."""
-    async with Stealth().use_async(async_playwright()) as p:
-        browser, context = await _new_stealth_context(p, headless=headless)
-        page = await context.new_page()
+    timings = get_timings(booking)
+    budget = timings.budget
+    session = getattr(booking, 'session', None)
+    timings.mark('arm')
+    timings.step('launch')
+    async with _stealth_session(headless=headless, storage_state=session and session.storage_state) as context:
+        page = await _new_page(context)
+        # Learn the schedule, booking class and auth token from the page's own XHRs
+        # so the fire phase can book over HTTP (see foreup_api.py).
+        sniffer = foreup_api.SessionSniffer(page, url) if foreup_api.ENGINE_ENABLED else None
+        watcher = TeeSheetWatcher(page, 'foreup', booking.desired_date)
+        warm = prewarm.Prewarmer(page, timings)
+        if sniffer is not None:
+            warm.add_http(foreup_api.api_base(url), foreup_api.get_client())
         try:
+            timings.step('goto')
             logging.info("Navigating to ForeUp URL: %s", url)
             await page.goto(url, wait_until='networkidle', timeout=60000)
 
             # --- Booking class: click Public as GUEST (before login) ---
             try:
                 logging.info("Trying to select 'Public' booking class.")
-                await page.locator('button, a, div').filter(
-                    has_text=re.compile(r'^\s*Public.*$', re.IGNORECASE)
-                ).first.click(timeout=8000)
-                await page.wait_for_load_state('networkidle')
+                # Choosing a class loads that class's tee sheet; that XHR is the signal the page is ready.
+                async with page.expect_response(lambda r: '/api/booking/times' in r.url, timeout=15000):
+                    await page.locator('button, a, div').filter(
+                        has_text=re.compile(r'^\s*Public.*$', re.IGNORECASE)
+                    ).first.click(timeout=8000)
             except PlaywrightTimeoutError:
                 logging.warning("Could not find or click 'Public' booking class, continuing anyway.")
 
+            # --- Login up front (arm phase) so the release path is click + confirm only ---
+            timings.step('login')
+            if not await _cached_login_valid(session, _foreup_login_link(page)):
+                login_started = time.monotonic()
+                if await _foreup_login(page, booking, email, password) and session is not None:
+                    await session.save(context, (time.monotonic() - login_started) * 1000)
+
             # --- Navigate to target date ---
+            timings.step('calendar')
             logging.info("Navigating to target date: %s", booking.desired_date)
             target = booking.desired_date
-            today = datetime.today().date()
-            months_ahead = (target.year - today.year) * 12 + target.month - today.month
-            if months_ahead > 0:
+            month_header = '.datepicker-switch, .fc-toolbar-title, .month-label'
+            nav = date_nav.DateNav(timings, target)
+            nav.start()
+            months_ahead = nav.report['months_ahead']
+            if months_ahead == 0:
+                nav.done('arm', 'current_month')
+            elif await date_nav.set_picker_date(page, target, month_header):
+                nav.done('arm', 'picker_api')
+            else:
                 for _ in range(months_ahead):
+                    month_label = await _text_of(page, month_header)
                     await page.locator('th.next, button.next-arrow, .fc-next-button, button[aria-label="next"]').first.click()
-                    await page.wait_for_timeout(1000)
+                    await _wait_text_change(page, month_header, month_label, timeout=1000)
+                nav.done('arm', 'arrows')
 
             # Click the day
             day_str = str(target.day)
@@ -471,152 +914,188 @@ async def book_via_foreup_software(url, booking, email, password, dry_run=False,
                 }
             }""")
             
-            # Precision wait until release time
-            await wait_for_release(getattr(booking, 'release_time', None))
+            # --- Armed: park here until release ---
+            timings.mark('release_wait')
+            warm.start()
+            trigger = await wait_for_release(getattr(booking, 'release_time', None),
+                                             offset_seconds=getattr(booking, 'release_offset', None),
+                                             clock_offset=getattr(booking, 'clock_offset', 0.0))
+            timings.record('release_trigger', trigger)
+            timings.mark('fire')
+            warm.fire()
+
+            # --- Fast path: book over ForeUp's JSON API, DOM flow below is the fallback ---
+            timings.step('api_booking')
+            if sniffer is not None:
+                try:
+                    api_session = await sniffer.build_session(context)
+                    if api_session is not None:
+                        return await foreup_api.book_via_api(api_session, booking, dry_run=dry_run)
+                    logging.info("ForeUp API: session details not captured, using the Playwright flow.")
+                except (foreup_api.ReservationUncertain, racing.RaceLost):
+                    # The reservation may already exist (or another racer is confirming);
+                    # booking again through the DOM could double-book.
+                    raise
+                except slot_fallback.SlotUnavailable:
+                    # The engine already fell back through this run's ranked slots;
+                    # the DOM flow would only retry the same ones.
+                    raise
+                except Exception as e:
+                    logging.warning("ForeUp API booking failed, falling back to the Playwright flow: %s", e)
             
-            # Toggle month right after wait to refresh calendar states
-            if getattr(booking, 'release_time', None):
+            # Click the day straight away; toggle the month to refresh datepicker states only if that fails
+            timings.step('tee_sheet')
+
+            async def click_day():
+                await day_element.click(force=True)
+
+            async def toggle_month():
+                nonlocal day_element
                 try:
                     logging.info("Precision Sync: Toggling month to refresh datepicker states.")
                     prev_btn = page.locator('th.prev, button.prev-arrow, .fc-prev-button, button[aria-label="prev"]').first
                     next_btn = page.locator('th.next, button.next-arrow, .fc-next-button, button[aria-label="next"]').first
                     if await prev_btn.is_visible(timeout=2000) and await next_btn.is_visible(timeout=2000):
+                        month_label = await _text_of(page, month_header)
                         await prev_btn.click(force=True)
-                        await page.wait_for_timeout(200)
+                        await budget.wait('month_toggle', _wait_text_change(page, month_header, month_label, timeout=200))
+                        prev_label = await _text_of(page, month_header)
                         await next_btn.click(force=True)
-                        await page.wait_for_timeout(200)
+                        await budget.wait('month_toggle', _wait_text_change(page, month_header, prev_label, timeout=200))
                         # Re-locate the day element since DOM re-rendered
                         day_element = page.locator(day_selector).first
                 except Exception as e:
                     logging.warning("Failed to toggle month: %s", e)
-            
-            await day_element.click(force=True)
-            await page.wait_for_timeout(2500)  # Explicitly wait for SPA to load new day's data
+
+            # Wait for the SPA's tee-times XHR for the new day rather than a fixed sleep.
+            if await _open_target_day(booking, watcher, budget, nav, click_day, toggle_month, timeout=2.5) is None:
+                logging.info("No tee sheet payload intercepted yet, continuing with the DOM.")
 
             # --- Players & Holes ---
             logging.info("Setting players to %d and holes to 18.", booking.players)
             try:
+                # Each filter re-queries the tee sheet; wait for that payload instead of sleeping.
+                watcher.reset()
                 await page.locator('a, button').filter(has_text=re.compile(rf'^{booking.players}$')).first.click(timeout=5000)
-                await page.wait_for_timeout(1000)
+                await budget.wait('players_filter', watcher.wait_for_slots(timeout=1.0))
+                watcher.reset()
                 await page.locator('button, a').filter(has_text=re.compile(r'18 Holes|18-Hole', re.I)).first.click(timeout=5000)
-                await page.wait_for_timeout(2000)
+                await budget.wait('holes_filter', watcher.wait_for_slots(timeout=2.0))
             except PlaywrightTimeoutError:
                 logging.warning("Could not set players/holes. Assuming defaults are OK.")
 
-            # --- Find tee time ---
+            # --- Find tee times ---
+            timings.step('slot_search')
             logging.info("Searching for tee time between %s and %s.", booking.earliest_time, booking.latest_time)
-            earliest = parse_time(target, booking.earliest_time)
-            latest = parse_time(target, booking.latest_time)
-            
-            slots_locator = page.locator('.booking-start-time-label, .time-summary-ob-left, .time-label')
-            try:
-                await slots_locator.first.wait_for(state='visible', timeout=10000)
-            except PlaywrightTimeoutError:
-                logging.warning("No tee times appeared to load, or none exist.")
-
-            slots = await slots_locator.all()
-            booking_element = None
-            best_time_str = ''
-
-            for slot in slots:
-                txt = (await slot.inner_text()).strip().lower()
-                m = re.search(r'(\d{1,2}:\d{2})\s*(am|pm)', txt)
-                if m:
-                    ts_str = f"{m.group(1)} {m.group(2)}"
-                    try:
-                        avail = datetime.strptime(f"{target.strftime('%Y-%m-%d')} {ts_str}", '%Y-%m-%d %I:%M %p')
-                        if earliest <= avail <= latest:
-                            booking_element = slot
-                            best_time_str = ts_str
-                            logging.info("Found matching tee time: %s", best_time_str)
-                            break
-                    except ValueError:
-                        continue
-            
-            if not booking_element:
+            slot_selector = '.booking-start-time-label, .time-summary-ob-left, .time-label'
+            await _wait_for_open_sheet(page, watcher, booking, timings, slot_selector, click_day)
+            if not watcher.slots:
+                try:
+                    await page.locator(slot_selector).first.wait_for(state='visible', timeout=10000)
+                except PlaywrightTimeoutError:
+                    logging.warning("No tee times appeared to load, or none exist.")
+            ranked = await _ranked_sheet_slots(page, watcher, booking, slot_selector)
+            if not ranked:
                 raise Exception(f'No tee time found between {booking.earliest_time} and {booking.latest_time}')
 
             if dry_run:
-                return f'Dry run success at {best_time_str}'
-
-            # --- Click time slot and handle modal ---
-            logging.info("Clicking tee time slot for %s", best_time_str)
-            await booking_element.click()
+                return f'Dry run success at {ranked[0].label.lower()}'
 
-            # Wait for modal or panel to appear
+            # --- Click time slot and book, falling back to the next-best slot if one is lost ---
             modal_locator = page.locator('div.modal-body, div.booking-details, #booking-modal, .modal-dialog, .booking-modal').first
-            await modal_locator.wait_for(state='visible', timeout=15000)
+            rejected = page.locator('#booking-error, .booking-error, .alert-danger').filter(
+                has_text=slot_fallback.UNAVAILABLE_TEXT).first
 
-            # --- Handle Login (if necessary) ---
-            try:
-                # Use global page selectors for login to be safe
-                email_input = page.get_by_placeholder("Email").first
-                pass_input = page.get_by_placeholder("Password").first
-                
-                is_visible = False
+            async def close_modal():
+                """Dismiss a lost slot's booking modal so the next slot can be clicked."""
                 try:
-                    is_visible = await email_input.is_visible(timeout=5000)
-                except Exception:
-                    pass
+                    await page.keyboard.press('Escape')
+                    close_btn = page.locator('.modal-dialog .close, .modal-dialog [aria-label="Close"]').first
+                    if await close_btn.is_visible():
+                        await close_btn.click(timeout=1000)
+                    await _wait_visible(modal_locator, timeout=1000, state='hidden')
+                except Exception as e:
+                    logging.warning("Could not close the booking modal: %s", e)
 
-                if is_visible:
-                    logging.info("Login form detected. Logging in...")
-                    await email_input.fill(email)
-                    await pass_input.fill(password)
-                    await pass_input.press("Enter")
-                    
-                    # Wait for login to complete
+            async def attempt(slot, deadline):
+                best_time_str = slot.label.lower()
+                timings.step('click')
+                logging.info("Clicking tee time slot for %s", best_time_str)
+                try:
+                    await _click_into_slot(page, _slot_element(page, slot_selector, slot), modal_locator,
+                                           deadline, budget, 'booking_modal', wait_ms=5000)
+                except slot_fallback.SlotUnavailable:
+                    await close_modal()
+                    raise
+
+                # --- Handle Login (fallback if the course only prompts after a slot is picked) ---
+                try:
+                    # Use global page selectors for login to be safe
+                    email_input = page.get_by_placeholder("Email").first
+                    pass_input = page.get_by_placeholder("Password").first
+                
+                    is_visible = False
                     try:
-                        await email_input.wait_for(state='hidden', timeout=15000)
-                        logging.info("Login successful, waiting for booking options...")
-                        await page.wait_for_timeout(4000) # Give UI time to load options
-                    except PlaywrightTimeoutError as e:
-                        screenshot_path = os.path.join(SCREENSHOT_DIR, 'foreup_login_error.png')
+                        is_visible = await email_input.is_visible(timeout=5000)
+                    except Exception:
+                        pass
+
+                    if is_visible:
+                        logging.info("Login form detected. Logging in...")
+                        await email_input.fill(email)
+                        await pass_input.fill(password)
+                        await pass_input.press("Enter")
+                    
+                        # Wait for login to complete
                         try:
-                            await page.screenshot(path=screenshot_path, timeout=5000, animations="disabled")
-                            logging.info(f"Saved login error screenshot to {screenshot_path}")
-                        except Exception:
-                            pass
-                        raise Exception("Golf course login failed - credentials may be incorrect, or portal blocked login.")
-            except Exception as e:
-                if "login failed" in str(e):
-                    raise
-                logging.info(f"No login required or login transition handled: {e}")
+                            await email_input.wait_for(state='hidden', timeout=15000)
+                            logging.info("Login successful, waiting for booking options...")
+                            await budget.wait('booking_options', _wait_visible(
+                                page.get_by_label(re.compile(r"18 Holes", re.I)).first, timeout=4000))
+                        except PlaywrightTimeoutError as e:
+                            await artifacts.capture(page, booking, 'foreup_login_error')
+                            raise Exception("Golf course login failed - credentials may be incorrect, or portal blocked login.")
+                except Exception as e:
+                    if "login failed" in str(e):
+                        raise
+                    logging.info(f"No login required or login transition handled: {e}")
 
-            # --- Select Booking Options ---
-            # Search globally on the page as the modal might have refreshed
-            logging.info("Selecting booking options (Holes, Players, Cart).")
-            try:
-                # Use codegen-style label selectors globally
-                await page.get_by_label(re.compile(r"18 Holes", re.I)).click(timeout=5000)
-                await page.wait_for_timeout(500)
-                await page.get_by_label(re.compile(rf"{booking.players} Players", re.I)).click(timeout=5000)
-                await page.wait_for_timeout(500)
+                # --- Select Booking Options ---
+                # Search globally on the page as the modal might have refreshed
+                logging.info("Selecting booking options (Holes, Players, Cart).")
+                try:
+                    # Use codegen-style label selectors globally
+                    await page.get_by_label(re.compile(r"18 Holes", re.I)).click(timeout=5000)
+                    await budget.wait('render', _wait_dom_quiet(page, quiet_ms=100, timeout=500))
+                    await page.get_by_label(re.compile(rf"{booking.players} Players", re.I)).click(timeout=5000)
+                    await budget.wait('render', _wait_dom_quiet(page, quiet_ms=100, timeout=500))
                 
-                # Optional cart selection
-                cart_opt = page.get_by_label(re.compile(r"Yes.*cart", re.I))
-                if await cart_opt.is_visible(timeout=2000):
-                    await cart_opt.click()
-            except Exception as e:
-                logging.warning(f"Could not select some options (may have used defaults): {e}")
+                    # Optional cart selection
+                    cart_opt = page.get_by_label(re.compile(r"Yes.*cart", re.I))
+                    if await cart_opt.is_visible(timeout=2000):
+                        await cart_opt.click()
+                except Exception as e:
+                    logging.warning(f"Could not select some options (may have used defaults): {e}")
 
-            # --- Final Booking Confirmation ---
-            logging.info("Looking for final booking confirmation button.")
-            # Search globally for the button
-            book_btn = page.get_by_role("button", name=re.compile(r"Book Time", re.I))
+                # --- Final Booking Confirmation ---
+                timings.step('confirm')
+                logging.info("Looking for final booking confirmation button.")
+                # Search globally for the button
+                book_btn = page.get_by_role("button", name=re.compile(r"Book Time", re.I))
             
-            # If role check fails, try text-based locator
-            if not await book_btn.is_visible(timeout=5000):
-                book_btn = page.locator('button, a').filter(
-                    has_text=re.compile(r'Book Time|Reserve|Continue|Confirm', re.I)
-                ).first
+                # If role check fails, try text-based locator
+                if not await book_btn.is_visible(timeout=5000):
+                    book_btn = page.locator('button, a').filter(
+                        has_text=re.compile(r'Book Time|Reserve|Continue|Confirm', re.I)
+                    ).first
             
-            await book_btn.wait_for(state='visible', timeout=10000)
-            logging.info("Clicking final booking button: %s", (await book_btn.inner_text()).strip())
-            
-            if not dry_run:
+                if not await _wait_visible(book_btn, timeout=slot_fallback.remaining_ms(deadline, 10000)):
+                    await close_modal()
+                    raise slot_fallback.SlotUnavailable("Booking modal never offered a Book Time button.")
+                logging.info("Clicking final booking button: %s", (await book_btn.inner_text()).strip())
+                racing.claim_confirm(booking)
                 await book_btn.click()
-                
+
                 if pay_at_facility:
                     logging.info("Handling 'Pay At Facility' modal.")
                     try:
@@ -624,45 +1103,36 @@ async def book_via_foreup_software(url, booking, email, password, dry_run=False,
                         await page.locator("#select-payment-type-modal").get_by_role("button", name=re.compile(r"Book Time", re.I)).click()
                     except Exception as e:
                         logging.warning(f"Could not handle 'Pay At Facility': {e}")
-                
-                # Wait for confirmation — URL change, known text, or confirmation element
-                await page.wait_for_timeout(3000)
-                current_url = page.url.lower()
-                confirmed = False
-
-                if any(k in current_url for k in ['confirm', 'success', 'reservation', 'booking']):
-                    logging.info("ForeUp: Confirmation URL detected: %s", page.url)
-                    confirmed = True
-                else:
-                    try:
-                        conf_locator = page.locator(
-                            '.booking-confirmation, .confirmation-number, .reservation-id'
-                        ).or_(
-                            page.get_by_text('Reservation #', exact=False)
-                        ).or_(
-                            page.get_by_text('Confirmed', exact=False)
-                        ).first
-                        if await conf_locator.is_visible(timeout=10000):
-                            logging.info("ForeUp: Confirmation text detected on page.")
-                            confirmed = True
-                    except Exception:
-                        pass
+
+                # Wait for confirmation — URL change or confirmation element, whichever comes first —
+                # or a "no longer available" rejection, which means it's safe to try the next slot.
+                conf_locator = page.locator(
+                    '.booking-confirmation, .confirmation-number, .reservation-id'
+                ).or_(
+                    page.get_by_text('Reservation #', exact=False)
+                ).or_(
+                    page.get_by_text('Confirmed', exact=False)
+                ).first
+                try:
+                    confirmed = await budget.wait('confirm', _wait_foreup_confirmation(
+                        page, conf_locator, timeout=13, rejected=rejected))
+                except slot_fallback.SlotUnavailable:
+                    await close_modal()
+                    raise
 
                 if not confirmed:
                     raise Exception(f"ForeUp booking completed but no confirmation found. URL: {page.url}")
-            else:
-                logging.info("DRY RUN: Skipping final click.")
+                return best_time_str
 
+            best_time_str, _ = await slot_fallback.try_in_order(ranked, attempt, timings, label=lambda s: s.label.lower())
             return f'Success! Booked {best_time_str}.'
 
-            
-
+        except racing.RaceLost:
+            raise
         except Exception as e:
             logging.error("An error occurred in book_via_foreup_software: %s", e, exc_info=True)
-            await page.screenshot(path=os.path.join(SCREENSHOT_DIR, 'foreup_error.png'), animations="disabled")
+            await artifacts.capture(page, booking, 'foreup_error')
             raise
-        finally:
-            await browser.close()
 
 
 async def book_via_foreup_index(url, booking_class_id, booking, email, password, dry_run=False, headless=True, pay_at_facility=False):
@@ -703,25 +1173,40 @@ async def book_saratoga_spa(url, booking, email, password, dry_run=False, headle
 
 async def book_via_eagleclub(url, booking, email, password, card_number=None, card_exp_month=None, card_exp_year=None, card_cvv=None, dry_run=False, headless=True):
     """Books a tee time through Eagle Club Systems."""
-    async with Stealth().use_async(async_playwright()) as p:
-        browser, context = await _new_stealth_context(p, headless=headless)
-        page = await context.new_page()
+    timings = get_timings(booking)
+    budget = timings.budget
+    session = getattr(booking, 'session', None)
+    timings.mark('arm')
+    timings.step('launch')
+    async with _stealth_session(headless=headless, storage_state=session and session.storage_state) as context:
+        page = await _new_page(context)
+        watcher = TeeSheetWatcher(page, 'eagleclub', booking.desired_date)
+        warm = prewarm.Prewarmer(page, timings)
         try:
+            timings.step('goto')
             logging.info("Navigating to Eagle Club URL: %s", url)
             await page.goto(url, wait_until='networkidle')
 
-            # --- Login ---
-            try:
-                logging.info("Attempting to log in.")
-                await page.get_by_text('Login', exact=True).first.click(timeout=5000)
-                await page.get_by_placeholder('Email').type(email, delay=50)
-                await page.get_by_placeholder('Password').type(password, delay=50)
-                await page.locator('button:has-text("Login")').first.click()
-                await page.wait_for_load_state('networkidle', timeout=15000)
-            except PlaywrightTimeoutError as e:
-                logging.warning("Login failed or not required: %s", e)
+            # --- Login (skipped when a cached login is still valid) ---
+            timings.step('login')
+            login_link = page.get_by_text('Login', exact=True).first
+            if not await _cached_login_valid(session, login_link):
+                try:
+                    logging.info("Attempting to log in.")
+                    login_started = time.monotonic()
+                    await login_link.click(timeout=5000)
+                    await page.get_by_placeholder('Email').type(email, delay=50)
+                    await page.get_by_placeholder('Password').type(password, delay=50)
+                    await page.locator('button:has-text("Login")').first.click()
+                    # The login form closing is the success signal; no need for the whole page to go idle.
+                    await page.get_by_placeholder('Password').wait_for(state='hidden', timeout=15000)
+                    if session is not None:
+                        await session.save(context, (time.monotonic() - login_started) * 1000)
+                except PlaywrightTimeoutError as e:
+                    logging.warning("Login failed or not required: %s", e)
 
             # --- Select date, players ---
+            timings.step('calendar')
             target = booking.desired_date
             logging.info("Selecting date: %s", target)
             day_element = page.locator('a, div, span').filter(has_text=re.compile(rf'{target.strftime("%a")}.*{target.day}', re.I)).first
@@ -735,79 +1220,105 @@ async def book_via_eagleclub(url, booking, email, password, card_number=None, ca
                 el.style.pointerEvents = 'auto';
             }""")
             
-            # Precision wait until release time
-            await wait_for_release(getattr(booking, 'release_time', None))
+            # --- Armed: park here until release ---
+            timings.mark('release_wait')
+            warm.start()
+            trigger = await wait_for_release(getattr(booking, 'release_time', None),
+                                             offset_seconds=getattr(booking, 'release_offset', None),
+                                             clock_offset=getattr(booking, 'clock_offset', 0.0))
+            timings.record('release_trigger', trigger)
+            timings.mark('fire')
+            warm.fire()
+            timings.step('tee_sheet')
             
+            watcher.reset()
             await day_element.click(force=True)
-            await page.wait_for_timeout(2500)
+            # Wait for the tee-slot XHR for the new day rather than a fixed sleep.
+            if await budget.wait('tee_sheet', watcher.wait_for_slots(timeout=2.5)) is None:
+                logging.info("No tee sheet payload intercepted yet, continuing with the DOM.")
             
             logging.info("Selecting players: %d", booking.players)
+            watcher.reset()
             await page.locator('a, button').filter(has_text=re.compile(rf'^{booking.players}$')).first.click()
-            await page.wait_for_timeout(2000)
+            await budget.wait('players_filter', watcher.wait_for_slots(timeout=2.0))
 
             # --- Find and click tee time tile ---
+            timings.step('slot_search')
             logging.info("Searching for tee time tile.")
-            earliest = parse_time(target, booking.earliest_time)
-            latest = parse_time(target, booking.latest_time)
-            
-            tiles = await page.locator('.tee-time-tile, .card, [class*="time"]').all()
-            booking_tile = None
-            best_time_str = ''
-
-            for tile in tiles:
-                txt = (await tile.inner_text()).strip()
-                m = re.search(r'(\d{1,2}:\d{2})\s*(AM|PM)', txt, re.IGNORECASE)
-                if m:
-                    ts_str = f"{m.group(1)} {m.group(2)}"
-                    avail = datetime.strptime(f"{target.strftime('%Y-%m-%d')} {ts_str}", '%Y-%m-%d %I:%M %p')
-                    if earliest <= avail <= latest:
-                        booking_tile = tile
-                        best_time_str = ts_str
-                        logging.info("Found matching tee time: %s", best_time_str)
-                        break
-
-            if not booking_tile:
+            slot_selector = '.tee-time-tile, .card, [class*="time"]'
+            await _wait_for_open_sheet(page, watcher, booking, timings, slot_selector,
+                                       lambda: day_element.click(force=True))
+            ranked = await _ranked_sheet_slots(page, watcher, booking, slot_selector)
+            if not ranked:
                 raise Exception('No Eagle Crest tee time found')
-            
+
             if dry_run:
-                return f'Dry run success at {best_time_str} (Eagle Crest)'
+                return f'Dry run success at {ranked[0].label} (Eagle Crest)'
 
-            await booking_tile.click()
-            
-            # --- Reservation modal ---
-            logging.info("Handling reservation modal.")
             modal = page.locator('.modal-dialog').first
-            await modal.wait_for(state='visible', timeout=10000)
-            
-            try:
-                await modal.locator('button, label').filter(has_text=re.compile(r'^18$')).first.click(timeout=2000)
-                await modal.locator('button, label').filter(has_text=re.compile(rf'^{booking.players}$')).first.click(timeout=2000)
-                await modal.locator('button, label').filter(has_text=re.compile(r'^YES$', re.I)).first.click(timeout=2000)
-                await modal.locator('input[type="checkbox"]').first.check()
-            except PlaywrightTimeoutError:
-                logging.info("Could not select all options in modal, continuing.")
-
-            await modal.locator('button:has-text("Continue")').first.click()
+            ok_btn = page.locator('button:has-text("OK")').first
+            rejected = modal.get_by_text(slot_fallback.UNAVAILABLE_TEXT).first
 
-            # --- Credit Card Payment ---
-            if card_number and card_cvv:
-                logging.info("Entering credit card information.")
-                cc_frame = page.frame_locator('iframe[title="credit card form"]').first
-                await cc_frame.get_by_placeholder('Card Number').type(card_number)
-                await cc_frame.locator('input[name*="month"]').type(card_exp_month or '07')
-                await cc_frame.locator('input[name*="year"]').type(card_exp_year or '26')
-                await cc_frame.get_by_placeholder('CVV').type(card_cvv)
-                await page.locator('button:has-text("Pre-Authorize Now")').first.click()
-                await page.wait_for_timeout(10000)
+            async def close_modal():
+                """Dismiss a lost slot's reservation modal so the next tile can be clicked."""
+                try:
+                    if await ok_btn.is_visible():
+                        await ok_btn.click(timeout=1000)
+                    else:
+                        await page.keyboard.press('Escape')
+                    await _wait_visible(modal, timeout=1000, state='hidden')
+                except Exception as e:
+                    logging.warning("Could not close the reservation modal: %s", e)
 
-            await page.locator('button:has-text("OK")').first.click()
-            await page.wait_for_timeout(3000)
+            async def attempt(slot, deadline):
+                timings.step('click')
+                try:
+                    await _click_into_slot(page, _slot_element(page, slot_selector, slot), modal,
+                                           deadline, budget, 'booking_modal', wait_ms=3000)
+                except slot_fallback.SlotUnavailable:
+                    await close_modal()
+                    raise
 
+                # --- Reservation modal ---
+                timings.step('confirm')
+                logging.info("Handling reservation modal.")
+                try:
+                    await modal.locator('button, label').filter(has_text=re.compile(r'^18$')).first.click(timeout=2000)
+                    await modal.locator('button, label').filter(has_text=re.compile(rf'^{booking.players}$')).first.click(timeout=2000)
+                    await modal.locator('button, label').filter(has_text=re.compile(r'^YES$', re.I)).first.click(timeout=2000)
+                    await modal.locator('input[type="checkbox"]').first.check()
+                except PlaywrightTimeoutError:
+                    logging.info("Could not select all options in modal, continuing.")
+
+                racing.claim_confirm(booking)
+                await modal.locator('button:has-text("Continue")').first.click()
+
+                # --- Credit Card Payment ---
+                if card_number and card_cvv:
+                    logging.info("Entering credit card information.")
+                    cc_frame = page.frame_locator('iframe[title="credit card form"]').first
+                    await cc_frame.get_by_placeholder('Card Number').type(card_number)
+                    await cc_frame.locator('input[name*="month"]').type(card_exp_month or '07')
+                    await cc_frame.locator('input[name*="year"]').type(card_exp_year or '26')
+                    await cc_frame.get_by_placeholder('CVV').type(card_cvv)
+                    await page.locator('button:has-text("Pre-Authorize Now")').first.click()
+
+                await budget.wait('confirm', ok_btn.wait_for(state='visible', timeout=10000))
+                # The result dialog carries the rejection when someone else got the slot first.
+                if await rejected.is_visible():
+                    reason = (await rejected.inner_text()).strip()
+                    await close_modal()
+                    raise slot_fallback.SlotUnavailable(reason)
+                await ok_btn.click()
+                await budget.wait('confirm', _wait_visible(modal, timeout=3000, state='hidden'))
+                return slot.label
+
+            best_time_str, _ = await slot_fallback.try_in_order(ranked, attempt, timings, label=lambda s: s.label)
             return f'Success! Booked Eagle Crest {best_time_str}'
 
+        except racing.RaceLost:
+            raise
         except Exception as e:
             logging.error("An error occurred in book_via_eagleclub: %s", e, exc_info=True)
-            await page.screenshot(path=os.path.join(SCREENSHOT_DIR, 'eagleclub_error.png'))
+            await artifacts.capture(page, booking, 'eagleclub_error')
             raise
-        finally:
-            await browser.close()
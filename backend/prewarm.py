@@ -0,0 +1,239 @@
+"""
+Connection pre-warming for the release.
+
+Everything a flow needs before the release is done in the arm phase, but the
+first post-release requests can still pay a DNS lookup, a TCP connect and a TLS
+handshake (over the Tailscale SOCKS5 path set up in start.sh, each of those is
+a few round trips). A Prewarmer keeps those connections hot instead:
+
+    origins  Every origin the page loaded a document, XHR or fetch from during
+             the arm phase (course site, tee-sheet API, auth host, ...), plus
+             PREWARM_EXTRA_ORIGINS for hosts only reached after the release
+             (checkout/payment) and any HTTP-client origins a flow adds
+             (foreup_api's engine). A page origin the HTTP client also talks to
+             is warmed over both transports, since they don't share sockets.
+    pings    From release_wait until shortly before the trigger, a credentialed
+             no-cors HEAD to each (origin, transport) every
+             PREWARM_INTERVAL_SECONDS: browser origins from the page itself so it
+             lands in the same socket pool as the flow's own requests, HTTP-client
+             origins through that client. The last ping is timed to land QUIET_SECONDS before
+             the release, so nothing competes with the trigger.
+    fire     fire() stops the pings and records whether every origin was warm
+             (last ping succeeded and is recent). From then on any request that
+             opens a new connection is logged as a cold connect, with its
+             DNS/connect/TLS time.
+
+Browser connection reuse comes from Playwright's request timing (connectStart
+is -1 on a reused socket); the httpx engine's from httpcore trace events, which
+foreup_api's client attaches to every request through attach_trace().
+
+The report is recorded as `prewarm` on the job's timings.
+
+Configuration (environment variables):
+    PREWARM_ENABLED            "1" to pre-warm connections (default), "0" to skip it.
+    PREWARM_INTERVAL_SECONDS   Keepalive ping interval. Default 4 (under common 5s server keepalives).
+    PREWARM_MAX_ORIGINS        Most page origins to keep warm, in first-seen order. Default 8.
+    PREWARM_EXTRA_ORIGINS      Comma-separated origins to warm as well, e.g. a checkout host.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+INTERVAL_SECONDS = float(os.getenv("PREWARM_INTERVAL_SECONDS", "4"))
+MAX_ORIGINS = int(os.getenv("PREWARM_MAX_ORIGINS", "8"))
+EXTRA_ORIGINS = [o.strip().rstrip('/') for o in os.getenv("PREWARM_EXTRA_ORIGINS", "").split(",") if o.strip()]
+
+# No pings inside this window before the release; the trigger has the loop to itself.
+QUIET_SECONDS = 1.0
+
+_TRACKED_TYPES = ("document", "xhr", "fetch")
+
+# Resolves true once the HEAD request got any response (opaque is fine), false on a network error.
+_PING_JS = """
+(url) => fetch(url, {method: 'HEAD', mode: 'no-cors', credentials: 'include', cache: 'no-store'})
+    .then(() => true, () => false)
+"""
+
+# The Prewarmer of the booking run in the current task, for attach_trace().
+_current = contextvars.ContextVar("prewarmer", default=None)
+
+
+def origin_of(url):
+    """scheme://host[:port] of an http(s) URL, else None."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _span_ms(timing, start, end):
+    if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+        return None
+    return round(timing[end] - timing[start], 1)
+
+
+async def attach_trace(request):
+    """httpx request hook: report connections the request opens to this run's Prewarmer."""
+    warm = _current.get()
+    origin = origin_of(str(request.url))
+    if warm is not None and origin and "trace" not in request.extensions:
+        request.extensions["trace"] = warm._http_trace(origin)
+
+
+class Prewarmer:
+    """
+    Watches the origins a page talks to and keeps them warm until fire(). Create
+    it right after the page, start() it at release_wait and fire() it after the trigger.
+    """
+
+    def __init__(self, page, timings):
+        self.page = page
+        self.timings = timings
+        self.report = {"origins": [], "pings": 0, "warm_at_fire": None, "cold_after_fire": []}
+        self._entries = {}
+        self._last_ok = {}
+        self._http = {}
+        self._seen = []
+        self._task = None
+        self._fired = False
+        timings.record('prewarm', self.report)
+        _current.set(self)
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_finished)
+
+    def add_http(self, origin, client):
+        """Also keep `client`'s (an httpx.AsyncClient) connection to `origin` warm."""
+        if origin:
+            self._http[origin] = client
+
+    def _entry(self, origin, via):
+        entry = self._entries.get((origin, via))
+        if entry is None:
+            entry = self._entries[(origin, via)] = {"origin": origin, "via": via, "pings": 0, "failures": 0,
+                                             "connects": 0, "last_ping_ms": None, "idle_ms_at_fire": None,
+                                             "warm": None}
+            self.report["origins"].append(entry)
+        return entry
+
+    def _on_request(self, request):
+        origin = origin_of(request.url)
+        if origin and origin not in self._seen and request.resource_type in _TRACKED_TYPES:
+            self._seen.append(origin)
+
+    def _on_finished(self, request):
+        origin = origin_of(request.url)
+        timing = request.timing
+        if origin is None or timing.get("connectStart", -1) < 0:
+            return
+        if not self._fired:
+            if (origin, "browser") in self._entries and request.method == "HEAD":
+                self._entries[(origin, "browser")]["connects"] += 1
+            return
+        self._cold(origin, request.url.split('?')[0],
+                   dns_ms=_span_ms(timing, "domainLookupStart", "domainLookupEnd"),
+                   connect_ms=_span_ms(timing, "connectStart", "connectEnd"),
+                   tls_ms=_span_ms(timing, "secureConnectionStart", "connectEnd"))
+
+    def _cold(self, origin, url, dns_ms=None, connect_ms=None, tls_ms=None):
+        offset_ms = None
+        if self.timings.release_epoch is not None:
+            offset_ms = round((time.time() - self.timings.release_epoch) * 1000, 1)
+        self.report["cold_after_fire"].append({"origin": origin, "url": url, "release_offset_ms": offset_ms,
+                                               "dns_ms": dns_ms, "connect_ms": connect_ms, "tls_ms": tls_ms})
+        logging.warning("Prewarm: cold connect to %s after the release (dns %s, connect %s, tls %s ms).",
+                        origin, dns_ms, connect_ms, tls_ms)
+
+    def _http_trace(self, origin, ping=False):
+        state = {}
+
+        async def trace(event, info):
+            if event.endswith("connect_tcp.started"):
+                state["started"] = time.monotonic()
+            elif event.endswith("connect_tcp.complete"):
+                state["connect_ms"] = round((time.monotonic() - state.get("started", time.monotonic())) * 1000, 1)
+                state["tls_started"] = time.monotonic()
+                if not origin.startswith("https:"):
+                    self._http_connected(origin, ping, state)
+            elif event.endswith("start_tls.complete"):
+                state["tls_ms"] = round((time.monotonic() - state["tls_started"]) * 1000, 1)
+                self._http_connected(origin, ping, state)
+        return trace
+
+    def _http_connected(self, origin, ping, state):
+        if ping:
+            self._entries[(origin, "http")]["connects"] += 1
+        elif self._fired:
+            self._cold(origin, origin, connect_ms=state.get("connect_ms"), tls_ms=state.get("tls_ms"))
+
+    def origins(self):
+        """Browser origins to keep warm: the first MAX_ORIGINS seen, plus the configured extras."""
+        return list(dict.fromkeys(self._seen[:MAX_ORIGINS] + EXTRA_ORIGINS))
+
+    def _targets(self):
+        """Each (origin, transport) to ping once: the browser origins, then the HTTP-client ones."""
+        return [(o, "browser") for o in self.origins()] + [(o, "http") for o in self._http]
+
+    async def _ping(self, origin, via):
+        entry = self._entry(origin, via)
+        started = time.monotonic()
+        try:
+            if via == "http":
+                client = self._http[origin]
+                await client.head(f"{origin}/", extensions={"trace": self._http_trace(origin, ping=True)})
+                ok = True
+            else:
+                ok = await self.page.evaluate(_PING_JS, f"{origin}/")
+        except Exception as e:
+            logging.debug("Prewarm: %s ping to %s failed: %s", via, origin, e)
+            ok = False
+        entry["pings"] += 1
+        entry["last_ping_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if ok:
+            self._last_ok[(origin, via)] = time.monotonic()
+        else:
+            entry["failures"] += 1
+            self._last_ok.pop((origin, via), None)
+
+    async def _loop(self, release_epoch):
+        while not self.page.is_closed():
+            await asyncio.gather(*(self._ping(origin, via) for origin, via in self._targets()))
+            self.report["pings"] += 1
+            remaining = release_epoch - QUIET_SECONDS - time.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(INTERVAL_SECONDS, remaining))
+
+    def start(self):
+        """Start the keepalive pings; a no-op without a release far enough ahead."""
+        release_epoch = self.timings.release_epoch
+        if not ENABLED or release_epoch is None or release_epoch - QUIET_SECONDS <= time.time():
+            return
+        targets = self._targets()
+        logging.info("Prewarm: keeping %d origin(s) warm until the release: %s",
+                     len(targets), ", ".join(f"{origin} ({via})" for origin, via in targets))
+        self._task = asyncio.create_task(self._loop(release_epoch))
+
+    def fire(self):
+        """Stop pinging, record which origins are still warm, and watch for cold connects."""
+        self._fired = True
+        if self._task is None:
+            return
+        self._task.cancel()
+        now = time.monotonic()
+        cold = []
+        for key, entry in self._entries.items():
+            last_ok = self._last_ok.get(key)
+            entry["idle_ms_at_fire"] = round((now - last_ok) * 1000, 1) if last_ok is not None else None
+            entry["warm"] = last_ok is not None and now - last_ok <= INTERVAL_SECONDS + QUIET_SECONDS
+            if not entry["warm"]:
+                cold.append(f"{key[0]} ({key[1]})")
+        self.report["warm_at_fire"] = not cold
+        if cold:
+            logging.warning("Prewarm: %d of %d origin(s) not warm at fire: %s",
+                            len(cold), len(self._entries), ", ".join(cold))
+        else:
+            logging.info("Prewarm: all %d origin(s) warm at fire.", len(self._entries))
@@ -0,0 +1,138 @@
+"""
+Multi-slot racing: several pre-armed contexts, at most one reservation.
+
+In racing mode the worker runs the same booking flow K times in parallel, each
+on its own browser context and each targeting a different ranked slot in the
+booking window (candidate 0 takes the best slot, 1 the next, ...). All of them
+arm, wait for the release and race through slot search and checkout.
+
+The final confirm step is the only one that can create a reservation, so it is
+guarded by a single turn: the first candidate to reach it claims the turn and
+every other candidate raises RaceLost at its own final step. The claim is
+never handed back, even if the winner's confirm then fails, because a failed
+confirm may still have booked. As soon as one candidate returns successfully,
+the ones still running are cancelled.
+
+Configuration (environment variables):
+    RACE_CONTEXTS   Default number of parallel candidates (1 disables racing). A job's
+                    own `race_contexts` field overrides it. Capped at MAX_CONTEXTS.
+"""
+import asyncio
+import copy
+import logging
+import os
+import time
+
+MAX_CONTEXTS = 4
+DEFAULT_CONTEXTS = int(os.getenv("RACE_CONTEXTS", "1"))
+
+
+class RaceLost(Exception):
+    """Another candidate already took the final confirm turn."""
+
+
+class RaceCoordinator:
+    """Hands the single final-confirm turn to the first candidate that asks for it."""
+
+    def __init__(self, contexts):
+        self.contexts = contexts
+        self.winner = None
+
+    def claim(self, rank):
+        """Take the confirm turn for candidate `rank`, or raise RaceLost if it's gone."""
+        if self.winner is not None and self.winner != rank:
+            raise RaceLost(f"Candidate {rank} stopped before confirming: candidate {self.winner} is confirming.")
+        if self.winner is None:
+            logging.info("Race: candidate %d claimed the confirm turn.", rank)
+        self.winner = rank
+
+
+def claim_confirm(booking):
+    """
+    Call immediately before a flow's final confirm action. A no-op outside racing
+    mode; in a race, raises RaceLost unless this candidate holds the confirm turn.
+    """
+    race = getattr(booking, 'race', None)
+    if race is not None:
+        race.claim(getattr(booking, 'candidate_rank', 0))
+
+
+def race_contexts(job_data):
+    """How many candidates to race for a job."""
+    try:
+        contexts = int(job_data.get('race_contexts') or DEFAULT_CONTEXTS)
+    except (TypeError, ValueError):
+        contexts = DEFAULT_CONTEXTS
+    return max(1, min(contexts, MAX_CONTEXTS))
+
+
+def make_candidates(booking, contexts):
+    """Clone `booking` into ranked candidates that share one RaceCoordinator."""
+    race = RaceCoordinator(contexts)
+    candidates = []
+    for rank in range(contexts):
+        candidate = copy.copy(booking)
+        candidate.timings = copy.deepcopy(booking.timings)
+        candidate.candidate_rank = rank
+        candidate.race = race
+        candidates.append(candidate)
+    return race, candidates
+
+
+async def run_race(func, url, candidates, email, password, dry_run=False):
+    """
+    Run every candidate through `func` and return (result, winning candidate, report).
+    Raises the most relevant failure if no candidate succeeds.
+    """
+    race = candidates[0].race
+    started = time.monotonic()
+    outcomes = {c.candidate_rank: {"rank": c.candidate_rank, "status": "running", "elapsed_ms": None}
+                for c in candidates}
+    tasks = {asyncio.create_task(func(url, c, email, password, dry_run=dry_run)): c for c in candidates}
+    pending = set(tasks)
+    result = winner = None
+    errors = {}
+
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = tasks[task]
+                outcome = outcomes[candidate.candidate_rank]
+                outcome["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+                if task.exception() is None:
+                    if winner is None:
+                        result, winner = task.result(), candidate
+                        outcome.update(status="won", result=result)
+                    else:
+                        outcome.update(status="finished", result=task.result())
+                else:
+                    error = task.exception()
+                    errors[candidate.candidate_rank] = error
+                    outcome.update(status="lost" if isinstance(error, RaceLost) else "failed", error=str(error))
+    finally:
+        # Whoever is still running hasn't claimed the confirm turn (the claimer is
+        # the winner or already failed), so cancelling them can't orphan a booking.
+        for task in pending:
+            task.cancel()
+            outcomes[tasks[task].candidate_rank].update(
+                status="cancelled", elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    report = {
+        "contexts": len(candidates),
+        "winner": winner.candidate_rank if winner else None,
+        "confirm_turn": race.winner,
+        "candidates": [outcomes[rank] for rank in sorted(outcomes)],
+    }
+    logging.info("Race: %s", report)
+    if winner is not None:
+        return result, winner, report
+
+    # No success: surface the confirming candidate's error if there was one, else
+    # the best-ranked real failure (RaceLost only ever means someone else confirmed).
+    rank = race.winner if race.winner in errors else min(
+        (r for r, e in errors.items() if not isinstance(e, RaceLost)), default=min(errors))
+    error = errors[rank]
+    error.race_report = report
+    raise error
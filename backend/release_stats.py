@@ -0,0 +1,178 @@
+"""
+Learned per-course release offsets.
+
+wait_for_release fires a fixed RELEASE_OFFSET_SECONDS (250ms) after the nominal
+release time, but each course's tee sheet actually opens at its own moment:
+some are live to the millisecond, some lag by a second or more. Every run that sees the booking
+window's slots appear records, per COURSE_CONFIG entry, when they became
+visible relative to the (clock-corrected) release (`slots_visible`, see
+tee_sheet.py), the round trip to the platform and whether the run won its tee
+time. Those observations live in the `course_release_stats` collection.
+
+Once a course has enough of them, the worker fires at the chosen quantile of
+"visible offset minus RTT" over the most recent observations instead of the
+fixed offset: a request sent then reaches the platform about when the sheet
+opens. A low quantile errs towards firing early, which costs little since the
+flows poll an empty sheet until it fills (see tee_sheet.poll_for_slots).
+
+Only polled observations are learned from: the flow saw the sheet empty and
+then watched it fill, so the visible time brackets the opening. When the slots
+were already there at the first look (`source == "first_load"`), the visible
+time is just when we looked, an upper bound on the opening that would only
+ratchet the offset later with every run; those are kept for the report but
+left out of the quantile. Runs that failed before the fire step (login,
+decryption, routing) record nothing.
+
+GET /api/release-offsets reports each course's distribution, offset and win rate.
+
+Configuration (environment variables):
+    RELEASE_OFFSET_LEARNING      "1" to fire at the learned offset (default), "0" to always use
+                                 the fixed one. Observations are recorded either way.
+    RELEASE_OFFSET_QUANTILE      Quantile of the observed offsets to fire at. Default 0.25.
+    RELEASE_OFFSET_MIN_SAMPLES   Observations a course needs before its offset is used. Default 5.
+    RELEASE_OFFSET_WINDOW        Most recent observations kept (and used) per course. Default 30.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+
+from google.cloud import firestore
+
+ENABLED = os.getenv("RELEASE_OFFSET_LEARNING", "1") == "1"
+QUANTILE = float(os.getenv("RELEASE_OFFSET_QUANTILE", "0.25"))
+MIN_SAMPLES = int(os.getenv("RELEASE_OFFSET_MIN_SAMPLES", "5"))
+WINDOW = int(os.getenv("RELEASE_OFFSET_WINDOW", "30"))
+COLLECTION = "course_release_stats"
+
+# wait_for_release's fixed offset, and the range a learned offset is clamped to.
+DEFAULT_OFFSET_SECONDS = 0.250
+MIN_OFFSET_SECONDS = 0.0
+MAX_OFFSET_SECONDS = 2.0
+
+
+def _quantile(values, q):
+    """Linear-interpolated quantile of a non-empty list."""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def _lead_ms(observation):
+    """When a request should have left to arrive as the sheet opened, relative to the release."""
+    return observation["visible_offset_ms"] - (observation.get("rtt_ms") or 0.0)
+
+
+def _measured(observation):
+    """True if the observation times the opening rather than bounding it (see module docstring)."""
+    return observation.get("visible_offset_ms") is not None and observation.get("source") != "first_load"
+
+
+def learned_offset(observations):
+    """Fire offset in seconds for these observations, or None if there are too few."""
+    usable = [o for o in observations[-WINDOW:] if _measured(o)]
+    if len(usable) < MIN_SAMPLES:
+        return None
+    offset = _quantile([_lead_ms(o) for o in usable], QUANTILE) / 1000
+    return max(MIN_OFFSET_SECONDS, min(MAX_OFFSET_SECONDS, offset))
+
+
+def _ref(db, course):
+    return db.collection(COLLECTION).document(course)
+
+
+def course_offset(db, course):
+    """
+    The learned fire offset for `course` in seconds, or None to keep
+    wait_for_release's default (learning disabled, too few samples, no data).
+    """
+    if not ENABLED or db is None:
+        return None
+    try:
+        snapshot = _ref(db, course).get()
+        if not snapshot.exists:
+            return None
+        offset = learned_offset(snapshot.to_dict().get("observations") or [])
+    except Exception as e:
+        logging.warning("Release stats: could not load observations for %s: %s", course, e)
+        return None
+    if offset is not None:
+        logging.info("Release stats: firing %s at its learned offset of %+.0fms.", course, offset * 1000)
+    return offset
+
+
+def observation(job_id, timings, rtt_seconds, offset_seconds, won):
+    """
+    One run's observation from its timings, or None if the run never reached
+    the fire step or never saw the slots appear relative to a known release.
+    `won` is None for dry runs.
+    """
+    fire = timings.spans.get("fire")
+    visible = timings.metrics.get("slots_visible") or {}
+    if fire is None or visible.get("release_offset_ms") is None:
+        return None
+    return {
+        "job_id": job_id,
+        "observed_at": datetime.now(timezone.utc).isoformat(),
+        "source": visible.get("source"),
+        "visible_offset_ms": visible["release_offset_ms"],
+        "rtt_ms": round(rtt_seconds * 1000, 1) if rtt_seconds is not None else None,
+        "fire_offset_ms": fire.get("release_offset_ms"),
+        "offset_ms": round((offset_seconds if offset_seconds is not None else DEFAULT_OFFSET_SECONDS) * 1000, 1),
+        "won": won,
+    }
+
+
+def record(db, course, entry):
+    """Append `entry` to the course's observations, keeping the last WINDOW."""
+    if db is None or entry is None:
+        return
+
+    @firestore.transactional
+    def append(transaction, ref):
+        snapshot = ref.get(transaction=transaction)
+        observations = (snapshot.to_dict() or {}).get("observations", []) if snapshot.exists else []
+        observations = (observations + [entry])[-WINDOW:]
+        transaction.set(ref, {
+            "course": course,
+            "observations": observations,
+            "updated_at": entry["observed_at"],
+        })
+
+    try:
+        append(db.transaction(), _ref(db, course))
+    except Exception as e:
+        logging.warning("Release stats: could not record observation for %s: %s", course, e)
+
+
+def report(db, courses):
+    """Per-course summary of the observations, for every course in `courses`."""
+    stored = {doc.id: doc.to_dict() for doc in db.collection(COLLECTION).stream()}
+    summary = []
+    for course in courses:
+        observations = (stored.get(course) or {}).get("observations") or []
+        usable = [o for o in observations if _measured(o)]
+        censored = sum(1 for o in observations if o.get("visible_offset_ms") is not None and not _measured(o))
+        decided = [o["won"] for o in observations if o.get("won") is not None]
+        rtts = [o["rtt_ms"] for o in observations if o.get("rtt_ms") is not None]
+        offset = learned_offset(observations)
+        summary.append({
+            "course": course,
+            "samples": len(usable),
+            "first_load_samples": censored,
+            "learned": offset is not None,
+            "offset_ms": round((offset if offset is not None else DEFAULT_OFFSET_SECONDS) * 1000, 1),
+            "visible_offset_ms": {f"p{int(q * 100)}": round(_quantile([o["visible_offset_ms"] for o in usable], q), 1)
+                                  for q in (0.1, 0.25, 0.5, 0.75, 0.9)} if usable else None,
+            "rtt_ms_p50": round(_quantile(rtts, 0.5), 1) if rtts else None,
+            "win_rate": round(sum(decided) / len(decided), 3) if decided else None,
+            "last_observed_at": observations[-1]["observed_at"] if observations else None,
+        })
+    return {
+        "enabled": ENABLED,
+        "quantile": QUANTILE,
+        "min_samples": MIN_SAMPLES,
+        "window": WINDOW,
+        "courses": summary,
+    }
@@ -0,0 +1,69 @@
+"""
+High-precision release trigger.
+
+The release target is converted to `time.monotonic_ns()` exactly once, so wall
+clock adjustments (NTP slews, VM clock steps) mid-wait can't move it. The event
+loop coarse-sleeps until shortly before the target, then a dedicated thread
+sleeps/spins the final stretch and signals the loop through a future. A busy
+event loop can still delay *resuming* the coroutine, so both the thread's firing
+error and the loop's wake-up error are reported per job.
+"""
+import asyncio
+import threading
+import time
+
+# The thread busy-spins only for this final window; before that it uses time.sleep.
+SPIN_NS = 2_000_000
+
+
+class ReleaseTimer:
+    """Fires once at a wall-clock epoch target, measured on the monotonic clock."""
+
+    def __init__(self, target_epoch, handoff_seconds=1.0):
+        # Single wall -> monotonic conversion; everything after this is monotonic.
+        self.target_ns = time.monotonic_ns() + int((target_epoch - time.time()) * 1e9)
+        self.handoff_ns = int(handoff_seconds * 1e9)
+        self.fired_ns = None
+        self.resumed_ns = None
+
+    def remaining_seconds(self):
+        return (self.target_ns - time.monotonic_ns()) / 1e9
+
+    def _spin(self, loop, future):
+        target = self.target_ns
+        while True:
+            remaining = target - time.monotonic_ns()
+            if remaining <= SPIN_NS:
+                break
+            time.sleep((remaining - SPIN_NS) / 1e9)
+        while time.monotonic_ns() < target:
+            pass
+        fired = time.monotonic_ns()
+        loop.call_soon_threadsafe(_resolve, future, fired)
+
+    async def wait(self):
+        """Wait until the target instant and return the jitter report."""
+        coarse = (self.target_ns - self.handoff_ns - time.monotonic_ns()) / 1e9
+        if coarse > 0:
+            await asyncio.sleep(coarse)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        thread = threading.Thread(target=self._spin, args=(loop, future), name="release-timer", daemon=True)
+        thread.start()
+        self.fired_ns = await future
+        self.resumed_ns = time.monotonic_ns()
+        return self.report()
+
+    def report(self):
+        if self.fired_ns is None:
+            return None
+        return {
+            "thread_error_ms": round((self.fired_ns - self.target_ns) / 1e6, 3),
+            "loop_error_ms": round((self.resumed_ns - self.target_ns) / 1e6, 3),
+        }
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
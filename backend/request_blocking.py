@@ -0,0 +1,88 @@
+"""
+Browser-level blocking of images, fonts, media and analytics.
+
+Booking contexts used to register `context.route("**/*", ...)`, which sends
+every request the page makes, the tee-sheet and checkout XHRs included, through
+a Python callback over the Playwright connection just to abort the few heavy
+ones. Blocking now happens inside Chromium, so requests that are let through
+never leave the browser:
+
+    images     `--blink-settings=imagesEnabled=false` at launch (LAUNCH_ARGS):
+               the renderer never requests <img> or CSS images.
+    fonts,     CDP `Fetch.enable` on each page (block()), with request patterns
+    media,     for font and media resources, by file extension and by analytics /
+    analytics  tag-manager host, e.g. the Google Analytics that the ForeUp pages
+               load (their `_gl`/`_ga` linker parameters came from it).
+
+Chromium pauses only the requests that match a pattern and the session fails
+each one with BlockedByClient (net::ERR_BLOCKED_BY_CLIENT, the same as an ad
+blocker, which the booking pages already tolerate), so Python hears about the
+blocked requests and nothing else. `Network.setBlockedURLs` would need
+`Network.enable` on the session, which streams every request's Network.* events
+to Python instead. benchmarks/request_blocking_bench.py compares page-ready
+time and the CDP events that reach Python with no blocking, the old route
+handler, Network.setBlockedURLs and this.
+
+Configuration (environment variables):
+    REQUEST_BLOCKING         "1" to block (default), "0" to load everything.
+    REQUEST_BLOCKING_EXTRA   Comma-separated extra URL patterns ('*' wildcards) to block.
+"""
+import logging
+import os
+
+ENABLED = os.getenv("REQUEST_BLOCKING", "1") == "1"
+
+# Chromium flags for a booking browser; images are off at the renderer.
+LAUNCH_ARGS = ['--blink-settings=imagesEnabled=false'] if ENABLED else []
+
+BLOCKED_RESOURCE_TYPES = ("Font", "Media")
+
+_HEAVY_EXTENSIONS = ("woff", "woff2", "ttf", "otf", "eot", "mp4", "webm", "ogg", "mp3", "m4a", "wav")
+
+_ANALYTICS_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "doubleclick.net",
+    "connect.facebook.net", "hotjar.com", "clarity.ms", "js-agent.newrelic.com", "bam.nr-data.net",
+    "cdn.segment.com", "api.segment.io", "fullstory.com",
+)
+
+BLOCKED_URL_PATTERNS = (
+    [f"*.{ext}" for ext in _HEAVY_EXTENSIONS]
+    + [f"*.{ext}?*" for ext in _HEAVY_EXTENSIONS]
+    + [f"*://*.{host}/*" for host in _ANALYTICS_HOSTS]
+    + [f"*://{host}/*" for host in _ANALYTICS_HOSTS]
+    + [p.strip() for p in os.getenv("REQUEST_BLOCKING_EXTRA", "").split(",") if p.strip()]
+)
+
+
+def fetch_patterns(patterns=None):
+    """Fetch.enable request patterns for BLOCKED_RESOURCE_TYPES plus `patterns` (default BLOCKED_URL_PATTERNS)."""
+    # Fetch patterns treat '?' as a one-character wildcard; ours mean a literal query string.
+    return ([{"resourceType": kind} for kind in BLOCKED_RESOURCE_TYPES]
+            + [{"urlPattern": p.replace("?", "\\?")} for p in (patterns or BLOCKED_URL_PATTERNS)])
+
+
+async def block(page, patterns=None):
+    """
+    Block font/media requests and `patterns` (default BLOCKED_URL_PATTERNS) in
+    `page` through its own CDP session, which is returned. Call before the page's
+    first navigation. A no-op (None) if disabled, and never fatal: a page that
+    can't be blocked just loads everything.
+    """
+    if not ENABLED:
+        return None
+    try:
+        cdp = await page.context.new_cdp_session(page)
+
+        async def fail(event):
+            try:
+                await cdp.send("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+            except Exception as e:
+                # The page navigated away or closed while the request was paused.
+                logging.debug("Request blocking: could not fail %s: %s", event.get("request", {}).get("url"), e)
+
+        cdp.on("Fetch.requestPaused", fail)
+        await cdp.send("Fetch.enable", {"patterns": fetch_patterns(patterns)})
+        return cdp
+    except Exception as e:
+        logging.warning("Request blocking: could not block URLs in the page, loading everything: %s", e)
+        return None
@@ -0,0 +1,155 @@
+"""
+Per-user, per-course cache of logged-in browser sessions.
+
+After a booking flow logs in to a course it saves the context's Playwright
+`storage_state` (cookies + localStorage), Fernet-encrypted with the same key as
+course passwords, in the `course_sessions` Firestore collection. The next run
+for the same (uid, course) restores it into its fresh context and skips the
+login entirely. If the course no longer treats the session as logged in, the
+flow marks it expired, logs in normally and saves the new state.
+
+Each cache document counts its hits, misses and expiries and the login time the
+hits saved; the per-run outcome is also written to the job's `session_cache`
+field. Race candidates (racing.py) share their job's CourseSession, so the
+flows only update its status and the worker counts the job's outcome once,
+through record(), after the run; save() likewise writes one login per job.
+
+Configuration (environment variables):
+    SESSION_CACHE_ENABLED          "1" to use the cache (default), "0" to always log in.
+    SESSION_CACHE_MAX_AGE_HOURS    Ignore saved sessions older than this. Default 12.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from google.cloud import firestore
+
+from utils import encrypt_text, decrypt_text
+
+ENABLED = os.getenv("SESSION_CACHE_ENABLED", "1") == "1"
+MAX_AGE_SECONDS = float(os.getenv("SESSION_CACHE_MAX_AGE_HOURS", "12")) * 3600
+COLLECTION = "course_sessions"
+
+
+def _doc_id(uid, course):
+    return hashlib.sha256(f"{uid}|{course}".encode()).hexdigest()[:32]
+
+
+class CourseSession:
+    """
+    Cached login for one (uid, course). Booking flows read `storage_state` and
+    report back through `hit()`, `expired()` and `save()`; the worker then calls
+    `record()` once. `load()` is sync; the worker runs it in a thread.
+    """
+
+    def __init__(self, db, uid, course):
+        self.db = db
+        self.uid = uid
+        self.course = course
+        self.storage_state = None
+        self.status = "disabled"
+        self.login_ms = None
+        self.login_saved_ms = None
+        self._saved = False
+        self._recorded = False
+
+    @property
+    def _ref(self):
+        return self.db.collection(COLLECTION).document(_doc_id(self.uid, self.course))
+
+    def load(self):
+        """Fetch and decrypt the saved session, if there is a usable one."""
+        if not (ENABLED and self.db is not None and self.uid):
+            return self
+        self.status = "miss"
+        try:
+            snapshot = self._ref.get()
+            if not snapshot.exists:
+                return self
+            data = snapshot.to_dict()
+            if time.time() - data.get("saved_epoch", 0) > MAX_AGE_SECONDS:
+                logging.info("Session cache: saved session for %s is older than the max age.", self.course)
+                return self
+            self.storage_state = json.loads(decrypt_text(data["state"]))
+            self.login_ms = data.get("login_ms")
+            self.status = "restored"
+        except Exception as e:
+            logging.warning("Session cache: could not load session for %s: %s", self.course, e)
+            self.storage_state = None
+        return self
+
+    async def _count(self, **fields):
+        try:
+            await asyncio.to_thread(self._ref.set, {k: firestore.Increment(v) for k, v in fields.items()}, merge=True)
+        except Exception as e:
+            logging.warning("Session cache: could not update counters for %s: %s", self.course, e)
+
+    def hit(self):
+        """The restored session was still logged in; the flow skipped its login."""
+        if self.status != "restored":
+            return
+        self.status = "hit"
+        self.login_saved_ms = self.login_ms
+        logging.info("Session cache: reused login for %s (saves ~%sms).", self.course, self.login_ms)
+
+    def expired(self):
+        """The restored session was rejected by the course; the flow is logging in again."""
+        if self.status != "restored":
+            return
+        self.status = "expired"
+        self.storage_state = None
+        logging.info("Session cache: saved session for %s has expired, logging in.", self.course)
+
+    async def record(self):
+        """Count the job's outcome on the cache document. Call once, after the run."""
+        if self._recorded:
+            return
+        self._recorded = True
+        if self.status == "hit":
+            await self._count(hits=1, login_ms_saved=self.login_ms or 0)
+        elif self.status == "expired":
+            await self._count(expired=1)
+        elif self.status == "miss":
+            await self._count(misses=1)
+
+    async def save(self, context, login_ms):
+        """Store the context's logged-in state after a full login (the first one, in a race)."""
+        if self.status == "disabled" or self._saved:
+            return
+        self._saved = True
+        try:
+            state = await context.storage_state()
+            await asyncio.to_thread(self._ref.set, {
+                "uid": self.uid,
+                "course": self.course,
+                "state": encrypt_text(json.dumps(state)),
+                "saved_epoch": time.time(),
+                "saved_at": datetime.now(timezone.utc).isoformat(),
+                "login_ms": round(login_ms, 1),
+            }, merge=True)
+            logging.info("Session cache: saved login for %s (%.0fms login).", self.course, login_ms)
+        except Exception as e:
+            logging.warning("Session cache: could not save session for %s: %s", self.course, e)
+
+    def to_dict(self):
+        """Per-run outcome written to the job document."""
+        return {"status": self.status, "login_saved_ms": self.login_saved_ms}
+
+
+def stats(db):
+    """Hit rate and total login time saved across every cached session."""
+    totals = {"hits": 0, "misses": 0, "expired": 0, "login_ms_saved": 0.0, "sessions": 0}
+    for doc in db.collection(COLLECTION).stream():
+        data = doc.to_dict()
+        totals["sessions"] += 1
+        for key in ("hits", "misses", "expired", "login_ms_saved"):
+            totals[key] += data.get(key, 0) or 0
+    lookups = totals["hits"] + totals["misses"] + totals["expired"]
+    totals["hit_rate"] = round(totals["hits"] / lookups, 3) if lookups else None
+    totals["login_ms_saved"] = round(totals["login_ms_saved"], 1)
+    return totals
+
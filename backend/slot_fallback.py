@@ -0,0 +1,90 @@
+"""
+Fallback to the next-best tee time when the chosen one is lost.
+
+By the time a click or confirm on the best slot fails, the slots right behind it
+are going fast too, so instead of raising, a booking flow walks a ranked list of
+candidate slots from its slot search and tries each in turn until one books or a
+total deadline runs out.
+
+An attempt moves on only when it raises SlotUnavailable: the slot was reported
+gone or held, or the flow gave up on it before pressing its final confirm
+button. Anything else is raised as-is, because after a confirm click we can't
+rule out that the reservation went through.
+
+Every attempt (slot, outcome, latency) is recorded on the job's timings as
+`slot_attempts` and written to the job document.
+
+Configuration (environment variables):
+    SLOT_FALLBACK_DEADLINE_SECONDS   Total time for all attempts, from the first click. Default 20.
+    SLOT_FALLBACK_MAX_ATTEMPTS       Most slots to try per run. Default 5.
+"""
+import logging
+import os
+import re
+import time
+
+DEADLINE_SECONDS = float(os.getenv("SLOT_FALLBACK_DEADLINE_SECONDS", "20"))
+MAX_ATTEMPTS = int(os.getenv("SLOT_FALLBACK_MAX_ATTEMPTS", "5"))
+
+# What the platforms say when someone else got there first.
+UNAVAILABLE_TEXT = re.compile(
+    r'no longer available|(tee )?time (is )?unavailable|slot (is )?unavailable|is not available'
+    r'|already (been )?(booked|reserved|taken)|has been (booked|reserved|taken)', re.I)
+
+
+class SlotUnavailable(Exception):
+    """The chosen tee time was taken (or held) before our reservation went through."""
+
+
+def candidates_for(booking, ranked):
+    """
+    This run's share of the ranked slots, best first. When racing (see racing.py)
+    each candidate takes every K-th slot from its own rank, so parallel candidates
+    don't fall back onto each other's slots.
+    """
+    race = getattr(booking, 'race', None)
+    stride = race.contexts if race is not None else 1
+    return list(ranked)[getattr(booking, 'candidate_rank', 0)::stride][:MAX_ATTEMPTS]
+
+
+async def try_in_order(candidates, attempt, timings, label):
+    """
+    Await `attempt(candidate, deadline)` for each candidate until one returns, and
+    return (result, candidate). `deadline` is a time.monotonic() value the attempt
+    should bound its pre-confirm waits by; `label(candidate)` names it in the log.
+    """
+    attempts = []
+    timings.record('slot_attempts', attempts)
+    deadline = time.monotonic() + DEADLINE_SECONDS
+    last_error = None
+    for candidate in candidates:
+        if time.monotonic() >= deadline:
+            logging.warning("Slot fallback: %.0fs deadline reached after %d attempt(s).", DEADLINE_SECONDS, len(attempts))
+            break
+        entry = {"slot": label(candidate), "outcome": None, "latency_ms": None, "error": None}
+        attempts.append(entry)
+        started = time.monotonic()
+        try:
+            result = await attempt(candidate, deadline)
+        except SlotUnavailable as e:
+            entry.update(outcome="unavailable", error=str(e))
+            last_error = e
+            logging.warning("Slot fallback: %s unavailable (%s), trying the next slot.", entry["slot"], e)
+            continue
+        except Exception as e:
+            entry.update(outcome="failed", error=str(e))
+            raise
+        finally:
+            entry["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        entry["outcome"] = "booked"
+        return result, candidate
+
+    if not attempts:
+        raise last_error or SlotUnavailable("No candidate tee times to try.")
+    raise SlotUnavailable(f"All {len(attempts)} candidate tee time(s) were lost: "
+                          f"{', '.join(a['slot'] for a in attempts)}.") from last_error
+
+
+def remaining_ms(deadline, cap_ms):
+    """Milliseconds left before `deadline`, capped at `cap_ms` and never below 1."""
+    return max(1, min(cap_ms, int((deadline - time.monotonic()) * 1000)))
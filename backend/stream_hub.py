@@ -0,0 +1,238 @@
+"""
+Live job updates for GET /api/bookings/stream (server-sent events).
+
+The dashboard used to learn about PENDING → RUNNING → SUCCESS/FAILED by
+re-reading its job list every few seconds. Instead, each user with an open
+stream gets one Firestore snapshot listener on their newest jobs (the same
+uid + created_at query and index as JobStore.list_page), shared by all of
+their tabs on this instance. Jobs run on whichever instance Cloud Tasks picks,
+so the listener rather than an in-process channel is what sees their writes,
+including the worker's `progress` field (the current phase) that execute_booking
+updates at each timings.mark().
+
+Each listener keeps the last seen LIST_FIELDS (which include `progress`) of
+every watched job and pushes only what changed:
+
+    snapshot   {"items": [...]} on connect and after a subscriber falls behind
+    added      {"item": {...}} a job entered the watched window (a new booking)
+    changed    {"id": ..., "fields": {...}} changed fields only (null = removed)
+    removed    {"id": ...} a job was deleted or aged out of the window
+    error      {"message": ...} the listener failed; the stream closes after it
+
+A `: ping` comment goes out every STREAM_HEARTBEAT_SECONDS so proxies keep the
+connection open; when Cloud Run's request timeout ends it, the client reconnects.
+The listener is stopped when the user's last stream closes.
+
+A listener that doesn't deliver its first snapshot within
+STREAM_READY_TIMEOUT_SECONDS, whose callback fails, or that stops on its own
+(Firestore's Watch gives up on non-retryable errors in its own thread, with no
+callback) fails the feed. Its streams then get an `error` event and are closed,
+so the dashboard falls back to polling, and the next stream starts a new listener.
+
+Configuration (environment variables):
+    STREAM_WATCH_LIMIT             Newest jobs per user the listener watches. Default 50.
+    STREAM_HEARTBEAT_SECONDS       Keep-alive interval. Default 15.
+    STREAM_READY_TIMEOUT_SECONDS   Longest wait for the listener's first snapshot. Default 10.
+"""
+import asyncio
+import json
+import logging
+import os
+
+from google.cloud import firestore
+
+from job_store import COLLECTION, LIST_FIELDS
+
+WATCH_LIMIT = int(os.getenv("STREAM_WATCH_LIMIT", "50"))
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+READY_TIMEOUT_SECONDS = float(os.getenv("STREAM_READY_TIMEOUT_SECONDS", "10"))
+# Events a slow tab may have queued before it is sent a fresh snapshot instead.
+QUEUE_SIZE = 100
+
+
+def _project(data):
+    return {name: data.get(name) for name in LIST_FIELDS}
+
+
+def _format(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.resync = True
+
+    def push(self, event, data):
+        if self.resync:
+            return
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # Drop the backlog; the stream sends a snapshot on its next turn.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resync = True
+            self.queue.put_nowait(None)
+
+    def wake(self):
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass  # It has events waiting, so it's about to look anyway.
+
+
+class _UserFeed:
+    """One snapshot listener for a user's newest jobs, fanned out to their streams."""
+
+    def __init__(self, client, uid, loop):
+        self.client = client
+        self.uid = uid
+        self.loop = loop
+        self.jobs = {}
+        self.subscribers = set()
+        self.ready = asyncio.Event()
+        self.error = None
+        self._watch = None
+
+    def start(self):
+        query = (
+            self.client.collection(COLLECTION)
+            .where('uid', '==', self.uid)
+            .order_by('created_at', direction=firestore.Query.DESCENDING)
+            .limit(WATCH_LIMIT)
+        )
+        self._watch = query.on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def failure(self):
+        """Why this feed can't deliver updates any more, or None while it's healthy."""
+        if self.error is None and (self._watch is None or not self._watch.is_active):
+            self.error = "listener stopped"
+        return self.error
+
+    def fail(self, reason):
+        if self.error is None:
+            self.error = reason
+        self.ready.set()
+        for subscriber in self.subscribers:
+            subscriber.wake()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Runs on the listener's thread; hand plain dicts over to the event loop.
+        try:
+            updates = [(change.type.name, change.document.id, _project(change.document.to_dict() or {}))
+                       for change in changes]
+        except Exception as e:
+            self.loop.call_soon_threadsafe(self.fail, f"snapshot callback failed: {e}")
+            return
+        self.loop.call_soon_threadsafe(self._apply, updates)
+
+    def _apply(self, updates):
+        for kind, job_id, data in updates:
+            data["id"] = job_id
+            if kind == "REMOVED":
+                if self.jobs.pop(job_id, None) is not None:
+                    self._publish("removed", {"id": job_id})
+            elif job_id not in self.jobs:
+                self.jobs[job_id] = data
+                if self.ready.is_set():
+                    self._publish("added", {"item": data})
+            else:
+                previous = self.jobs[job_id]
+                changed = {name: value for name, value in data.items() if previous.get(name) != value}
+                self.jobs[job_id] = data
+                if changed:
+                    self._publish("changed", {"id": job_id, "fields": changed})
+        self.ready.set()
+
+    def _publish(self, event, data):
+        for subscriber in self.subscribers:
+            subscriber.push(event, data)
+
+    def snapshot(self):
+        items = sorted(self.jobs.values(), key=lambda job: job.get("created_at") or "", reverse=True)
+        return {"items": items}
+
+
+class StreamHub:
+    """Per-user snapshot listeners shared by every open stream on this instance."""
+
+    def __init__(self, client):
+        self.client = client
+        self.feeds = {}
+
+    async def _subscribe(self, uid):
+        feed = self.feeds.get(uid)
+        if feed is None:
+            feed = self.feeds[uid] = _UserFeed(self.client, uid, asyncio.get_running_loop())
+            try:
+                await asyncio.to_thread(feed.start)
+            except Exception:
+                del self.feeds[uid]
+                raise
+            logging.info("Stream: listening to jobs for user %s.", uid)
+        subscriber = _Subscriber()
+        feed.subscribers.add(subscriber)
+        return feed, subscriber
+
+    def _discard(self, uid, feed):
+        if self.feeds.get(uid) is feed:
+            del self.feeds[uid]
+            # Not awaited: this runs while a disconnected stream is being cancelled.
+            asyncio.get_running_loop().run_in_executor(None, feed.stop)
+            logging.info("Stream: stopped listening for user %s.", uid)
+
+    def _unsubscribe(self, uid, feed, subscriber):
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            self._discard(uid, feed)
+
+    async def events(self, uid, request):
+        """SSE text for `uid`'s jobs until the client disconnects or the listener fails."""
+        feed, subscriber = await self._subscribe(uid)
+        try:
+            try:
+                await asyncio.wait_for(feed.ready.wait(), timeout=READY_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                feed.fail(f"no snapshot within {READY_TIMEOUT_SECONDS:.0f}s")
+            while True:
+                reason = feed.failure()
+                if reason is not None:
+                    logging.warning("Stream: listener for user %s failed (%s); closing the stream.", uid, reason)
+                    self._discard(uid, feed)
+                    yield _format("error", {"message": f"Live updates unavailable: {reason}."})
+                    return
+                if subscriber.resync:
+                    subscriber.resync = False
+                    yield _format("snapshot", feed.snapshot())
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if item is not None:
+                    yield _format(*item)
+        finally:
+            self._unsubscribe(uid, feed, subscriber)
+
+
+_hub = None
+
+
+def get_hub():
+    """The process-wide StreamHub, or None if Firestore is unavailable."""
+    global _hub
+    if _hub is None:
+        try:
+            _hub = StreamHub(firestore.Client())
+        except Exception as e:
+            logging.error("Stream: failed to create the Firestore client: %s", e)
+            return None
+    return _hub
@@ -0,0 +1,265 @@
+"""
+Tee-sheet discovery from the booking platforms' own XHR responses.
+
+Instead of waiting for Angular/React to render the tee sheet and then scraping
+the DOM, a TeeSheetWatcher listens to `page.on('response')` and parses the
+platform's tee-time JSON into typed Slots the moment it arrives. The booking flow
+picks its slot straight from that data and only touches the DOM to click the one
+element it chose.
+
+Platforms:
+    cps        CPS Golf onlineres API (.../onlinereservation/TeeTimes)
+    foreup     ForeUp booking API (/index.php/api/booking/times)
+    eagleclub  Eagle Club Systems tee-slot API (shape discovered generically)
+
+If the sheet is still empty after the release trigger (a late release, a cached
+page), poll_for_slots() re-queries it at a fixed cadence until a slot in the
+booking window shows up or a deadline passes. When slots first became visible,
+relative to the nominal release, is recorded as `slots_visible` on the job.
+
+Configuration (environment variables):
+    SLOT_POLL_INTERVAL_MS         Re-query cadence while the sheet is empty. Default 200.
+    SLOT_POLL_DEADLINE_SECONDS    Stop polling this long after it started. Default 15.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+POLL_INTERVAL_MS = float(os.getenv("SLOT_POLL_INTERVAL_MS", "200"))
+POLL_DEADLINE_SECONDS = float(os.getenv("SLOT_POLL_DEADLINE_SECONDS", "15"))
+
+URL_PATTERNS = {
+    "cps": re.compile(r'/onlinereservation/TeeTimes', re.I),
+    "foreup": re.compile(r'/api/booking/times', re.I),
+    "eagleclub": re.compile(r'tee-?(slot|time)s?', re.I),
+}
+
+_TIME_KEYS = ("startTime", "teeTime", "start_time", "tee_time", "time", "StartTime", "TeeTime", "Time")
+_SPOTS_KEYS = ("available_spots", "availableSpots", "AvailableSpots", "availablePlayers", "openSlots", "maxPlayer")
+
+
+class Slot:
+    """A bookable tee time as reported by the platform's API."""
+    def __init__(self, start, available_spots=None, raw=None):
+        self.start = start
+        self.available_spots = available_spots
+        self.raw = raw or {}
+
+    @property
+    def label(self):
+        """Human-readable time, e.g. '7:10 AM'."""
+        return self.start.strftime('%I:%M %p').lstrip('0')
+
+    def text_pattern(self):
+        """Regex matching how the platforms render this time in the DOM ('7:10 AM', '07:10am', '7:10 A')."""
+        hour = self.start.strftime('%I').lstrip('0')
+        meridiem = self.start.strftime('%p')[0]
+        return re.compile(rf'\b0?{hour}:{self.start:%M}\s*{meridiem}', re.I)
+
+    def __repr__(self):
+        return f"Slot({self.label}, spots={self.available_spots})"
+
+
+def _parse_start(value, date):
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(value[:19], fmt)
+        except ValueError:
+            continue
+    m = re.match(r'^(\d{1,2}):(\d{2})\s*([AP])\.?M?\.?$', value, re.I)
+    if m:
+        return datetime.strptime(f"{date:%Y-%m-%d} {m.group(1)}:{m.group(2)} {m.group(3).upper()}M", '%Y-%m-%d %I:%M %p')
+    m = re.match(r'^(\d{1,2}):(\d{2})(?::\d{2})?$', value)
+    if m:
+        return datetime.strptime(f"{date:%Y-%m-%d} {m.group(1)}:{m.group(2)}", '%Y-%m-%d %H:%M')
+    return None
+
+
+def _parse_spots(item):
+    for key in _SPOTS_KEYS:
+        value = item.get(key)
+        if isinstance(value, list):
+            return max((int(v) for v in value if str(v).isdigit()), default=0)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def _slot_from(item, date):
+    for key in _TIME_KEYS:
+        start = _parse_start(item.get(key), date)
+        if start is not None:
+            return Slot(start, _parse_spots(item), raw=item)
+    return None
+
+
+def _walk_lists(data):
+    """Yield every list of dicts found anywhere in a JSON payload."""
+    if isinstance(data, list):
+        if data and all(isinstance(x, dict) for x in data):
+            yield data
+        for x in data:
+            yield from _walk_lists(x)
+    elif isinstance(data, dict):
+        for v in data.values():
+            yield from _walk_lists(v)
+
+
+def parse(platform, data, date):
+    """
+    Parse a tee-time payload into Slots for `date`. Returns None when the payload
+    doesn't look like a tee sheet at all, [] when it is one with no times.
+    """
+    if platform == "foreup" and isinstance(data, list):
+        candidates = [data]
+    elif platform == "cps" and isinstance(data, dict) and isinstance(data.get("content"), list):
+        candidates = [data["content"]]
+    else:
+        candidates = list(_walk_lists(data))
+
+    for items in candidates:
+        slots = [s for s in (_slot_from(item, date) for item in items) if s is not None]
+        if slots:
+            # Times for some other day (e.g. the page's initial load) aren't our sheet.
+            return [s for s in slots if s.start.date() == date] or None
+    # A known tee-sheet envelope with nothing in it is an empty sheet, not noise.
+    if candidates and platform in ("foreup", "cps"):
+        return []
+    return None
+
+
+def rank_slots(slots, date, earliest, latest, players):
+    """Slots inside [earliest, latest] on `date` with room for `players`, earliest first."""
+    window_start = datetime.combine(date, earliest)
+    window_end = datetime.combine(date, latest)
+    ranked = []
+    for slot in sorted(slots, key=lambda s: s.start):
+        if not (window_start <= slot.start <= window_end):
+            continue
+        if slot.available_spots is not None and slot.available_spots < players:
+            continue
+        ranked.append(slot)
+    return ranked
+
+
+class TeeSheetWatcher:
+    """Parses tee-sheet XHR responses on a page into `self.slots` as they arrive."""
+
+    def __init__(self, page, platform, date):
+        self.page = page
+        self.platform = platform
+        self.date = date
+        self.pattern = URL_PATTERNS[platform]
+        self.slots = None
+        self.received_at = None
+        self.received_epoch = None
+        self.request = None
+        self._updated = asyncio.Event()
+        page.on("response", self._on_response)
+
+    async def _on_response(self, response):
+        if not self.pattern.search(response.url) or not response.ok:
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            slots = parse(self.platform, await response.json(), self.date)
+        except Exception as e:
+            logging.debug("Tee sheet: could not parse %s: %s", response.url, e)
+            return
+        if slots is None:
+            return
+        self.slots = slots
+        self.received_at = time.monotonic()
+        self.received_epoch = time.time()
+        self.request = response.request
+        self._updated.set()
+        logging.info("Tee sheet: intercepted %d slot(s) from %s", len(slots), response.url.split('?')[0])
+
+    def reset(self):
+        """Forget the current sheet; call before an action that triggers a fresh load."""
+        self.slots = None
+        self.received_at = None
+        self.received_epoch = None
+        self._updated.clear()
+
+    async def wait_for_slots(self, timeout):
+        """Wait up to `timeout` seconds for a tee sheet payload. Returns the slots or None."""
+        if self.slots is not None:
+            return self.slots
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.slots
+
+    async def refetch(self):
+        """
+        Replay the page's last tee-sheet request (same URL, headers and cookies)
+        and parse the answer, without touching the DOM. None if there is no
+        request to replay yet or it fails.
+        """
+        if self.request is None:
+            return None
+        response = await self.page.request.fetch(self.request)
+        if not response.ok:
+            return None
+        return parse(self.platform, await response.json(), self.date)
+
+
+def record_visible(timings, source, polls=0, visible_epoch=None, waited_ms=0.0):
+    """
+    Record when the booking window's slots became visible, relative to the
+    nominal release, as `slots_visible`. `visible_epoch` None means they never did.
+    """
+    report = {"source": source, "polls": polls, "visible_at": None, "release_offset_ms": None,
+              "waited_ms": round(waited_ms, 1)}
+    if visible_epoch is not None:
+        report["visible_at"] = datetime.fromtimestamp(visible_epoch, timezone.utc).isoformat()
+        if timings.release_epoch is not None:
+            report["release_offset_ms"] = round((visible_epoch - timings.release_epoch) * 1000, 1)
+    timings.record('slots_visible', report)
+    return report
+
+
+async def poll_for_slots(fetch, booking, timings, source):
+    """
+    Await `fetch()` (returning Slots or None) every POLL_INTERVAL_MS until one
+    falls in the booking window or POLL_DEADLINE_SECONDS pass. Returns the
+    matching slots best first, or [] at the deadline.
+    """
+    interval = POLL_INTERVAL_MS / 1000
+    started = time.monotonic()
+    deadline = started + POLL_DEADLINE_SECONDS
+    polls = 0
+    logging.info("Tee sheet: no slot in the window yet, polling every %.0fms for up to %.0fs.",
+                 POLL_INTERVAL_MS, POLL_DEADLINE_SECONDS)
+    while True:
+        polls += 1
+        tick = time.monotonic()
+        try:
+            slots = await fetch()
+        except Exception as e:
+            logging.debug("Tee sheet: poll %d failed: %s", polls, e)
+            slots = None
+        matches = rank_slots(slots or [], booking.desired_date, booking.earliest_time,
+                             booking.latest_time, booking.players)
+        if matches:
+            report = record_visible(timings, source, polls, time.time(), (time.monotonic() - started) * 1000)
+            logging.info("Tee sheet: slots visible after %d poll(s), %sms after release.",
+                         polls, report["release_offset_ms"])
+            return matches
+        if time.monotonic() >= deadline:
+            record_visible(timings, source, polls, waited_ms=(time.monotonic() - started) * 1000)
+            logging.warning("Tee sheet: no slot in the window after %d poll(s) over %.0fs.", polls, POLL_DEADLINE_SECONDS)
+            return []
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - tick)))
@@ -0,0 +1,167 @@
+"""AdmissionController: caps, queue order, shedding and per-admission accounting."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import admission
+
+
+def _controller(**kwargs):
+    # max_memory_mb=0 turns the memory check off, so only the context cap applies.
+    kwargs.setdefault("max_memory_mb", 0)
+    return admission.AdmissionController(**kwargs)
+
+
+async def _hold(controller, job_id, contexts, release, started=None, **kwargs):
+    async with controller.admit(job_id, contexts=contexts, **kwargs):
+        if started is not None:
+            started.append(job_id)
+        await release.wait()
+
+
+def test_admits_straight_away_and_frees_the_slot():
+    async def run():
+        controller = _controller(max_contexts=2)
+        async with controller.admit("a", contexts=2):
+            assert controller.reserved_contexts == 2
+        assert controller.reserved_contexts == 0
+        assert controller.stats()["admitted"] == 1
+
+    asyncio.run(run())
+
+
+def test_oversized_job_runs_on_an_idle_instance():
+    async def run():
+        controller = _controller(max_contexts=1)
+        async with controller.admit("big", contexts=4):
+            assert controller.reserved_contexts == 4
+
+    asyncio.run(run())
+
+
+def test_duplicate_delivery_keeps_its_own_slot():
+    async def run():
+        controller = _controller(max_contexts=4)
+        release_first, release_second = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(_hold(controller, "job", 1, release_first))
+        second = asyncio.create_task(_hold(controller, "job", 2, release_second))
+        await asyncio.sleep(0)
+        assert controller.reserved_contexts == 3
+
+        release_second.set()
+        await second
+        # The first delivery is still running and must still be counted.
+        assert controller.reserved_contexts == 1
+        release_first.set()
+        await first
+        assert controller.reserved_contexts == 0
+
+    asyncio.run(run())
+
+
+def test_queued_job_starts_when_capacity_frees():
+    async def run():
+        controller = _controller(max_contexts=1, queue_timeout=5)
+        release, started = asyncio.Event(), []
+        running = asyncio.create_task(_hold(controller, "a", 1, release, started))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_hold(controller, "b", 1, asyncio.Event(), started))
+        await asyncio.sleep(0.01)
+        assert started == ["a"] and controller.stats()["queue_depth"] == 1
+
+        release.set()
+        await running
+        await asyncio.sleep(0.01)
+        assert started == ["a", "b"]
+        queued.cancel()
+
+    asyncio.run(run())
+
+
+def test_queue_is_first_come_first_served():
+    async def run():
+        controller = _controller(max_contexts=2, queue_timeout=5)
+        release_a, started = asyncio.Event(), []
+        a = asyncio.create_task(_hold(controller, "a", 2, release_a, started))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(_hold(controller, "b", 2, asyncio.Event(), started))
+        await asyncio.sleep(0.01)
+        # "c" would fit next to nothing, but "b" is ahead of it.
+        c = asyncio.create_task(_hold(controller, "c", 1, asyncio.Event(), started))
+        await asyncio.sleep(0.01)
+        assert started == ["a"]
+
+        release_a.set()
+        await asyncio.sleep(0.01)
+        assert started == ["a", "b"]
+        for task in (a, b, c):
+            task.cancel()
+        await asyncio.gather(a, b, c, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_sheds_when_the_queue_is_full():
+    async def run():
+        controller = _controller(max_contexts=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(controller, "a", 1, release))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_hold(controller, "b", 1, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(admission.Overloaded):
+            async with controller.admit("c"):
+                pass
+        assert controller.stats()["shed"] == 1
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(run())
+
+
+def test_sheds_after_the_queue_timeout_without_a_release_time():
+    async def run():
+        controller = _controller(max_contexts=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(controller, "a", 1, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(admission.Overloaded):
+            async with controller.admit("b"):
+                pass
+        assert controller.stats()["queue_depth"] == 0
+        release.set()
+        await running
+
+    asyncio.run(run())
+
+
+def test_waits_past_the_queue_timeout_until_the_release_margin():
+    async def run():
+        controller = _controller(max_contexts=1, queue_timeout=0.05, start_margin=0)
+        release, started = asyncio.Event(), []
+        running = asyncio.create_task(_hold(controller, "a", 1, release, started))
+        await asyncio.sleep(0)
+        release_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+        queued = asyncio.create_task(_hold(controller, "b", 1, asyncio.Event(), started, release_at=release_at))
+
+        await asyncio.sleep(0.2)
+        assert not queued.done()
+        release.set()
+        await running
+        await asyncio.sleep(0.01)
+        assert started == ["a", "b"]
+        queued.cancel()
+
+    asyncio.run(run())
+
+
+def test_wait_is_never_shorter_than_the_queue_timeout():
+    controller = _controller(queue_timeout=20, start_margin=60)
+    soon = datetime.now(timezone.utc) + timedelta(seconds=30)
+    later = datetime.now(timezone.utc) + timedelta(seconds=180)
+    assert controller._wait_seconds(None) == 20
+    assert controller._wait_seconds(soon) == 20
+    assert controller._wait_seconds(later) == pytest.approx(120, abs=1)
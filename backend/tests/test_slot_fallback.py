@@ -0,0 +1,79 @@
+"""slot_fallback: which slots a run tries, and when it must stop trying."""
+import asyncio
+import types
+
+import pytest
+
+import slot_fallback
+from timings import JobTimings
+
+
+def _attempt(outcomes, tried):
+    """An attempt that raises or returns whatever `outcomes` says for each slot."""
+    async def attempt(slot, deadline):
+        tried.append(slot)
+        outcome = outcomes[slot]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return attempt
+
+
+def _run(candidates, outcomes):
+    timings, tried = JobTimings(), []
+    run = slot_fallback.try_in_order(candidates, _attempt(outcomes, tried), timings, label=str)
+    return asyncio.run(run), tried, timings.metrics['slot_attempts']
+
+
+def test_books_the_first_slot_that_works():
+    (result, slot), tried, attempts = _run(["7:00", "7:10"], {"7:00": "booked 7:00", "7:10": "booked 7:10"})
+    assert (result, slot) == ("booked 7:00", "7:00")
+    assert tried == ["7:00"]
+    assert [a["outcome"] for a in attempts] == ["booked"]
+
+
+def test_moves_on_when_a_slot_is_taken():
+    outcomes = {"7:00": slot_fallback.SlotUnavailable("taken"), "7:10": "booked 7:10"}
+    (result, slot), tried, attempts = _run(["7:00", "7:10"], outcomes)
+    assert slot == "7:10" and tried == ["7:00", "7:10"]
+    assert [a["outcome"] for a in attempts] == ["unavailable", "booked"]
+    assert all(a["latency_ms"] is not None for a in attempts)
+
+
+def test_any_other_error_stops_the_fallback():
+    # After a confirm click we can't rule out a booking, so never try another slot.
+    outcomes = {"7:00": RuntimeError("confirm timed out"), "7:10": "booked 7:10"}
+    timings, tried = JobTimings(), []
+    with pytest.raises(RuntimeError):
+        asyncio.run(slot_fallback.try_in_order(["7:00", "7:10"], _attempt(outcomes, tried), timings, label=str))
+    assert tried == ["7:00"]
+    assert timings.metrics['slot_attempts'][0]["outcome"] == "failed"
+
+
+def test_raises_slot_unavailable_when_every_slot_is_lost():
+    outcomes = {s: slot_fallback.SlotUnavailable("taken") for s in ("7:00", "7:10")}
+    with pytest.raises(slot_fallback.SlotUnavailable, match="All 2 candidate"):
+        _run(["7:00", "7:10"], outcomes)
+
+
+def test_no_candidates_is_slot_unavailable():
+    with pytest.raises(slot_fallback.SlotUnavailable):
+        _run([], {})
+
+
+def test_stops_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(slot_fallback, "DEADLINE_SECONDS", 0)
+    timings, tried = JobTimings(), []
+    with pytest.raises(slot_fallback.SlotUnavailable):
+        asyncio.run(slot_fallback.try_in_order(["7:00"], _attempt({"7:00": "booked"}, tried), timings, label=str))
+    assert tried == []
+
+
+def test_race_candidates_take_disjoint_slots(monkeypatch):
+    monkeypatch.setattr(slot_fallback, "MAX_ATTEMPTS", 2)
+    ranked = ["7:00", "7:10", "7:20", "7:30", "7:40", "7:50", "8:00"]
+    race = types.SimpleNamespace(contexts=3)
+    picks = [slot_fallback.candidates_for(types.SimpleNamespace(race=race, candidate_rank=rank), ranked)
+             for rank in range(3)]
+    assert picks == [["7:00", "7:30"], ["7:10", "7:40"], ["7:20", "7:50"]]
+    assert slot_fallback.candidates_for(types.SimpleNamespace(), ranked) == ["7:00", "7:10"]
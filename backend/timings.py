@@ -0,0 +1,186 @@
+"""
+Per-job phase timing for booking runs.
+
+A booking run is split into an "arm" phase (launch, login, navigate to the target
+date), a "release_wait" phase (parked until the tee sheet opens) and a "fire"
+phase (slot search, click, confirm). Booking functions call `mark()` at each
+transition and wrap individual steps in `span()`; the worker writes the result
+onto the job document as a `timings` map so courses and regressions can be
+compared on the same release-relative timeline. The worker also sets an
+`on_phase` hook to publish each phase change as the job's live `progress`.
+
+During the fire phase a LatencyBudget additionally splits the post-release time
+into waiting (page loads, XHRs, DOM settling) versus acting (our own clicks).
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class LatencyBudget:
+    """Accumulates how much of the post-release window went to waiting versus acting."""
+
+    def __init__(self):
+        self.started = None
+        self.stopped = None
+        self.waits = {}
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def stop(self):
+        if self.started is not None and self.stopped is None:
+            self.stopped = time.monotonic()
+
+    async def wait(self, label, awaitable):
+        """Await a condition-based wait and charge its duration to `label`."""
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.waits[label] = self.waits.get(label, 0.0) + (time.monotonic() - start)
+
+    def report(self):
+        if self.started is None:
+            return None
+        total = (self.stopped or time.monotonic()) - self.started
+        waited = sum(self.waits.values())
+        return {
+            "total_ms": round(total * 1000, 1),
+            "wait_ms": round(waited * 1000, 1),
+            "act_ms": round((total - waited) * 1000, 1),
+            "waits_ms": {label: round(d * 1000, 1) for label, d in self.waits.items()},
+        }
+
+
+class JobTimings:
+    """
+    Records named spans for a booking run: a monotonic duration plus the start
+    time both as UTC wall clock and as an offset from the release instant.
+
+    Phases ('arm', 'release_wait', 'fire') are spans opened by `mark()`. Finer
+    steps ('goto', 'login', 'calendar', 'slot_search', 'click', 'confirm') are
+    opened by `step()`, which like `mark()` runs until the next step or phase
+    change; self-contained blocks ('launch', 'clock_sync') use `with span(name):`.
+    A span entered more than once accumulates its duration and counts entries.
+    """
+
+    def __init__(self, release_time=None):
+        self.spans = {}
+        self.metrics = {}
+        self.budget = LatencyBudget()
+        self.release_epoch = None
+        self._current = None
+        self._current_start = None
+        self._step = None
+        self._step_start = None
+        # Called with the phase name on every mark(); must not block.
+        self.on_phase = None
+        self.set_release(release_time)
+
+    def set_release(self, release_time, clock_offset=0.0):
+        """
+        Anchor release-relative offsets to `release_time` (ISO string or aware datetime).
+        `clock_offset` is the platform clock minus ours, as used by wait_for_release.
+        """
+        if not release_time:
+            return
+        try:
+            if isinstance(release_time, str):
+                release_time = datetime.fromisoformat(release_time.replace('Z', '+00:00'))
+            self.release_epoch = release_time.timestamp() - clock_offset
+        except (TypeError, ValueError) as e:
+            logging.warning("Timings: could not parse release time %r: %s", release_time, e)
+
+    def _open(self, name):
+        wall = time.time()
+        entry = self.spans.get(name)
+        if entry is None:
+            entry = self.spans[name] = {
+                "started_at": datetime.fromtimestamp(wall, timezone.utc).isoformat(),
+                "release_offset_ms": None,
+                "duration_ms": None,
+                "count": 0,
+            }
+            if self.release_epoch is not None:
+                entry["release_offset_ms"] = round((wall - self.release_epoch) * 1000, 1)
+        entry["count"] += 1
+        return time.monotonic()
+
+    def _close(self, name, started):
+        entry = self.spans[name]
+        elapsed = round((time.monotonic() - started) * 1000, 1)
+        entry["duration_ms"] = round((entry["duration_ms"] or 0.0) + elapsed, 1)
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block as `name`, whether it completes or raises."""
+        started = self._open(name)
+        try:
+            yield
+        finally:
+            self._close(name, started)
+
+    def step(self, name):
+        """End the current step (if any) and start `name` within the open phase."""
+        self._end_step()
+        self._step = name
+        self._step_start = self._open(name)
+
+    def _end_step(self):
+        if self._step is not None:
+            self._close(self._step, self._step_start)
+            self._step = None
+            self._step_start = None
+
+    def mark(self, phase):
+        """End the current phase (if any) and start `phase`."""
+        self.finish()
+        self._current = phase
+        self._current_start = self._open(phase)
+        if phase == 'fire':
+            self.budget.start()
+        if self.on_phase is not None:
+            try:
+                self.on_phase(phase)
+            except Exception as e:
+                logging.warning("Timings: phase hook failed for %s: %s", phase, e)
+
+    def finish(self):
+        """Close the currently open step and phase."""
+        self._end_step()
+        if self._current is None:
+            return
+        self._close(self._current, self._current_start)
+        if self._current == 'fire':
+            self.budget.stop()
+            report = self.budget.report()
+            self.metrics['latency_budget'] = report
+            logging.info("Latency budget: %.0fms after release — %.0fms waiting, %.0fms acting. Waits: %s",
+                         report["total_ms"], report["wait_ms"], report["act_ms"], report["waits_ms"])
+        self._current = None
+        self._current_start = None
+
+    def record(self, name, value):
+        """Attach a named measurement (e.g. release trigger jitter) to this run."""
+        self.metrics[name] = value
+
+    def to_dict(self):
+        """The `timings` map written to the job document."""
+        release_at = None
+        if self.release_epoch is not None:
+            release_at = datetime.fromtimestamp(self.release_epoch, timezone.utc).isoformat()
+        return {"release_at": release_at, "spans": {name: dict(entry) for name, entry in self.spans.items()}}
+
+
+def get_timings(booking):
+    """Return the JobTimings attached to a booking, attaching a fresh one if missing."""
+    timings = getattr(booking, 'timings', None)
+    if timings is None:
+        timings = JobTimings()
+        try:
+            booking.timings = timings
+        except AttributeError:
+            pass
+    return timings
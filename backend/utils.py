@@ -3,19 +3,29 @@ from cryptography.fernet import Fernet
 import os
 import base64
 
+# How long before release a job starts its arm phase (launch, login, navigate to the
+# target date). The fire phase then only runs the post-release slot search/click/confirm.
+ARM_LEAD_SECONDS = int(os.getenv('ARM_LEAD_SECONDS', '180'))
+
 def get_cipher_suite():
     key = os.getenv('ENCRYPTION_KEY')
     if not key:
         raise ValueError("No ENCRYPTION_KEY set in .env file")
     return Fernet(key.encode())
 
-def encrypt_password(password):
+def encrypt_text(text):
     cipher = get_cipher_suite()
-    encrypted_bytes = cipher.encrypt(password.encode('utf-8'))
+    encrypted_bytes = cipher.encrypt(text.encode('utf-8'))
     return base64.urlsafe_b64encode(encrypted_bytes).decode('utf-8')
 
-def decrypt_password(encrypted_password):
+def decrypt_text(encrypted_text):
     cipher = get_cipher_suite()
-    encrypted_bytes = base64.urlsafe_b64decode(encrypted_password)
+    encrypted_bytes = base64.urlsafe_b64decode(encrypted_text)
     decrypted_bytes = cipher.decrypt(encrypted_bytes)
     return decrypted_bytes.decode('utf-8')
+
+def encrypt_password(password):
+    return encrypt_text(password)
+
+def decrypt_password(encrypted_password):
+    return decrypt_text(encrypted_password)
@@ -7,7 +7,13 @@ import sys
 from google.cloud import firestore
 
 # Import the user's Playwright logic
+import artifacts
 import playwright_logic
+import clock_sync
+import racing
+import release_stats
+import session_cache
+from job_store import get_store
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -47,33 +53,65 @@ class BookingWrapper:
         self.players = int(data['players'])
         self.course_name = data.get('course_name')
         self.release_time = data.get('release_time')
+        self.timings = JobTimings(self.release_time)
+        self.clock_offset = 0.0
+        self.release_offset = None
+        self.session = None
+        # Failure screenshots captured by this job's pages (artifacts.capture).
+        self.screenshots = []
+
+# Per-run metrics copied from JobTimings to top-level job fields, for the dashboard and queries.
+_METRIC_FIELDS = ("release_trigger", "latency_budget", "slot_attempts", "date_nav", "slots_visible", "prewarm")
+
+
+def _run_fields(booking):
+    """Fields describing a finished run, written to the job whether it succeeded or failed."""
+    fields = {"timings": booking.timings.to_dict()}
+    fields.update({name: booking.timings.metrics.get(name) for name in _METRIC_FIELDS})
+    fields.update({
+        "release_offset": booking.release_offset,
+        "session_cache": booking.session.to_dict() if booking.session else None,
+        "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    })
+    return fields
+
+
+def _progress_reporter(store, job_id):
+    """
+    JobTimings.on_phase hook that writes each new phase to the job's `progress`
+    field (streamed to the dashboard by stream_hub) without making the booking
+    flow wait for Firestore. Race candidates share it, so repeats are skipped.
+    """
+    reported, tasks = set(), set()
+
+    def done(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.warning(f"Failed to report progress for job {job_id}: {task.exception()}")
+
+    def report(phase):
+        if phase in reported:
+            return
+        reported.add(phase)
+        task = asyncio.get_running_loop().create_task(store.report_progress(job_id, phase))
+        tasks.add(task)
+        task.add_done_callback(done)
+
+    return report
 
 # Course Configuration - Single source of truth
 from course_config import COURSE_CONFIG, get_handler
+from timings import JobTimings
+from utils import ARM_LEAD_SECONDS
 
 async def execute_booking(job_id, job_data, dry_run=False):
     logging.info(f"Executing Snipe for Job {job_id} at {job_data['course_name']} (Dry Run: {dry_run})")
     
-    if db is None:
+    store = get_store()
+    if db is None or store is None:
         raise ValueError("Firestore client is not initialized.")
-        
-    doc_ref = db.collection('tee_time_jobs').document(job_id)
-
-    @firestore.transactional
-    def claim_job_transaction(transaction, ref):
-        snapshot = ref.get(transaction=transaction)
-        if not snapshot.exists:
-            return False, "Not found"
-        
-        current_status = snapshot.get('status')
-        if current_status != 'PENDING':
-            return False, f"Status is '{current_status}'"
-            
-        transaction.update(ref, {"status": "RUNNING"})
-        return True, "Claimed"
 
-    transaction = db.transaction()
-    success, reason = claim_job_transaction(transaction, doc_ref)
+    success, reason = await store.claim(job_id)
     
     if not success:
         logging.info(f"Job {job_id} could not be claimed. Reason: {reason}. Skipping execution.")
@@ -81,6 +119,7 @@ async def execute_booking(job_id, job_data, dry_run=False):
 
     # 2. Prepare the data wrapper
     booking = BookingWrapper(job_data)
+    booking.timings.on_phase = _progress_reporter(store, job_id)
     course_query = job_data.get('course_name', '').lower()
     
     email = job_data.get('course_email', 'user@example.com')
@@ -98,6 +137,7 @@ async def execute_booking(job_id, job_data, dry_run=False):
     try:
         # 3. The Course Router
         handler = None
+        rtt_seconds = None
         for key, config in COURSE_CONFIG.items():
             if key in course_query:
                 handler = config
@@ -106,95 +146,141 @@ async def execute_booking(job_id, job_data, dry_run=False):
         if not handler:
             raise Exception(f"No routing logic found for course: {course_query}")
 
+        # Restore this user's saved login for the course, if any, so the flow can skip it.
+        booking.session = await asyncio.to_thread(session_cache.CourseSession(db, job_data.get('uid'), key).load)
+
+        # Estimate how far the platform's clock is from ours so the release
+        # trigger fires on *their* clock. Never let a sync failure block the run.
+        try:
+            with booking.timings.span('clock_sync'):
+                clock = await clock_sync.estimate_offset(handler['url'])
+            booking.clock_offset = clock.correction_seconds
+            rtt_seconds = clock.rtt_seconds
+            booking.timings.set_release(booking.release_time, booking.clock_offset)
+            await store.update(job_id, {"clock_sync": clock.to_dict()})
+        except Exception as e:
+            logging.warning(f"Clock sync failed for {handler['url']}, using local clock: {e}")
+
+        # Fire when this course's tee sheet has historically opened, if we've seen enough releases.
+        booking.release_offset = await asyncio.to_thread(release_stats.course_offset, db, key)
+
         logging.info(f"Routing to {handler['func'].__name__} with URL: {handler['url']}")
-        result_message = await handler["func"](handler["url"], booking, email, password, dry_run=dry_run)
+        contexts = racing.race_contexts(job_data)
+        if contexts > 1:
+            # Racing mode: K contexts each target a different ranked slot; at most one confirms.
+            logging.info(f"Racing {contexts} candidate slots in parallel contexts.")
+            race, candidates = racing.make_candidates(booking, contexts)
+            race_report = None
+            try:
+                result_message, winner, race_report = await racing.run_race(
+                    handler["func"], handler["url"], candidates, email, password, dry_run=dry_run)
+                booking.timings = winner.timings
+            except Exception as e:
+                race_report = getattr(e, 'race_report', None)
+                booking.timings = candidates[race.winner or 0].timings
+                raise
+            finally:
+                await store.update(job_id, {"race": race_report})
+        else:
+            result_message = await handler["func"](handler["url"], booking, email, password, dry_run=dry_run)
 
         # 4. If successful:
         logging.info(f"Booking Automation Successful! Result: {result_message}")
-        doc_ref.update({
-            "status": "SUCCESS", 
+        booking.timings.finish()
+        await store.update(job_id, {
+            "status": "SUCCESS",
             "result_log": result_message,
-            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+            **_run_fields(booking),
         })
+        await asyncio.to_thread(release_stats.record, db, key, release_stats.observation(
+            job_id, booking.timings, rtt_seconds, booking.release_offset, won=None if dry_run else True))
 
     except Exception as e:
         logging.error(f"Automation failed: {e}")
-        doc_ref.update({
-            "status": "FAILED", 
+        booking.timings.finish()
+        await store.update(job_id, {
+            "status": "FAILED",
             "result_log": str(e),
-            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+            **_run_fields(booking),
         })
-        # Try to capture and upload error screenshot from screenshots/ folder
-        try:
-            import base64
-            screenshot_dir = os.path.join(os.getcwd(), 'screenshots')
-            if os.path.exists(screenshot_dir):
-                files = [f for f in os.listdir(screenshot_dir) if f.endswith('.png')]
-                if files:
-                    files.sort(key=lambda x: os.path.getmtime(os.path.join(screenshot_dir, x)), reverse=True)
-                    newest_file = files[0]
-                    full_path = os.path.join(screenshot_dir, newest_file)
-                    with open(full_path, "rb") as image_file:
-                        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-                    doc_ref.update({
-                        "error_screenshot": f"data:image/png;base64,{encoded_string}"
+        # Only a run that got to fire lost the race; login, decryption or routing failures say nothing about the release.
+        if handler and 'fire' in booking.timings.spans:
+            await asyncio.to_thread(release_stats.record, db, key, release_stats.observation(
+                job_id, booking.timings, rtt_seconds, booking.release_offset, won=None if dry_run else False))
+        # Store this job's newest failure screenshot as an artifact; only a reference and
+        # a thumbnail go on the job document.
+        if booking.screenshots:
+            artifact_store = artifacts.get_store()
+            if artifact_store is not None:
+                shot = booking.screenshots[-1]
+                try:
+                    ref = await asyncio.to_thread(artifacts.save_screenshot, artifact_store, job_id, shot)
+                    await store.update(job_id, {
+                        "error_screenshot": ref,
+                        "error_thumbnail": shot.thumbnail_url(),
                     })
-                    logging.info(f"Successfully uploaded error screenshot {newest_file} to Firestore.")
-                    os.remove(full_path)
-        except Exception as se:
-            logging.warning(f"Failed to capture and upload error screenshot: {se}")
+                    logging.info(f"Stored error screenshot {ref['key']} ({ref['bytes'] // 1024} KB).")
+                except Exception as se:
+                    logging.warning(f"Failed to store error screenshot: {se}")
+    finally:
+        # Once per job, however many race candidates restored, checked or saved the login.
+        if booking.session is not None:
+            await booking.session.record()
 
 
 async def find_and_wait_for_job():
     logging.info("Windows Sniper started. Checking for imminent jobs...")
     now_utc = datetime.datetime.now(datetime.timezone.utc)
     
-    if db is None:
+    store = get_store()
+    if store is None:
         logging.error("Firestore client is not initialized.")
         return
         
     try:
-        jobs_ref = db.collection('tee_time_jobs').where('status', '==', 'PENDING')
-        docs = jobs_ref.stream()
+        # If a job is more than 1 minute in the past, mark it as failed/stale
+        stale = await store.fail_stale(now_utc - datetime.timedelta(seconds=60), {
+            "status": "FAILED",
+            "result_log": "Missed release window (bot was not running or PC was asleep)",
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+        })
+        for job_id in stale:
+            logging.warning(f"Marked stale job {job_id} as FAILED (Missed window).")
 
-        for doc in docs:
-            job_data = doc.to_dict()
+        # The soonest job releasing in the next 6 minutes, if any
+        for job_id, job_data in await store.releasing_between(now_utc, now_utc + datetime.timedelta(minutes=6), limit=1):
             release_time_str = job_data.get('release_time')
+            seconds_until_release = (job_data['release_at'] - now_utc).total_seconds()
+
+            logging.info(f"Found imminent job {job_id}. Target Time: {release_time_str}")
+            arm_in = max(0.0, seconds_until_release - ARM_LEAD_SECONDS)
+            logging.info(f"Arming in {arm_in:.2f} seconds ({ARM_LEAD_SECONDS}s before release)...")
             
-            if not release_time_str:
-                continue
-
-            release_time = datetime.datetime.fromisoformat(release_time_str)
-            time_until_release = release_time - now_utc
-            seconds_until_release = time_until_release.total_seconds()
-
-            if 0 < seconds_until_release <= (6 * 60):
-                logging.info(f"Found imminent job {doc.id}. Target Time: {release_time_str}")
-                logging.info(f"Waiting exactly {seconds_until_release:.2f} seconds...")
-                
-                # The crucial simple wait:
-                await asyncio.sleep(seconds_until_release)
-                
-                # Time is up! Execute!
-                await execute_booking(doc.id, job_data)
-                
-                # We only process one job per wake
-                return
+            # Sleep until the arm window; execute_booking logs in, parks on the
+            # target date and fires itself at the release instant.
+            await asyncio.sleep(arm_in)
             
-            elif seconds_until_release <= -60:
-                # If the job is more than 1 minute in the past, mark it as failed/stale
-                logging.warning(f"Marking stale job {doc.id} as FAILED (Missed window).")
-                db.collection('tee_time_jobs').document(doc.id).update({
-                    "status": "FAILED",
-                    "result_log": "Missed release window (bot was not running or PC was asleep)",
-                    "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
-                })
+            await execute_booking(job_id, job_data)
+            
+            # We only process one job per wake
+            return
 
         logging.info("No imminent jobs found.")
 
     except Exception as e:
         logging.error(f"Error querying Firestore: {e}")
 
+async def run_debug_job(job_id, dry_run=False):
+    store = get_store()
+    if store is None:
+        logging.error("Firestore client is not initialized.")
+        sys.exit(1)
+    job_data = await store.get(job_id)
+    if job_data is not None:
+        await execute_booking(job_id, job_data, dry_run=dry_run)
+    else:
+        logging.error("Job ID not found in Firestore.")
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="PinSeeker Windows Worker")
     parser.add_argument('--debug-job', type=str, help="Instantly execute a specific job ID (bypasses wait timer)")
@@ -203,15 +289,7 @@ if __name__ == '__main__':
 
     if args.debug_job:
         logging.info(f"--- DEBUG MODE --- Forcing execution of job: {args.debug_job}")
-        if db is None:
-            logging.error("Firestore client is not initialized.")
-            sys.exit(1)
-        doc_ref = db.collection('tee_time_jobs').document(args.debug_job)
-        doc = doc_ref.get()
-        if doc.exists:
-            asyncio.run(execute_booking(doc.id, doc.to_dict(), dry_run=args.dry_run))
-        else:
-            logging.error("Job ID not found in Firestore.")
+        asyncio.run(run_debug_job(args.debug_job, dry_run=args.dry_run))
     else:
         # Normal production flow
         asyncio.run(find_and_wait_for_job())
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Flag, Crosshair, LayoutDashboard, PlusCircle, Calendar, LogOut, Clock, 
   CheckCircle2, AlertCircle, ChevronRight, Menu, X, Lock, Terminal, Trash2, XCircle,
@@ -45,10 +45,38 @@ interface BookingRequest {
   release_time: string;
   status: 'PENDING' | 'SUCCESS' | 'FAILED' | 'RUNNING' | 'CANCELLED';
   result_log?: string;
+  progress?: { phase: string; at: string } | null; // Booking phase of a RUNNING job
   created_at: string;
   updated_at: string;
 }
 
+const PHASE_LABELS: Record<string, string> = {
+  arm: 'Arming: logging in and opening the tee sheet',
+  release_wait: 'Armed: waiting for the release',
+  fire: 'Firing: grabbing a tee time',
+};
+
+// One page of GET /api/bookings (newest first); pass next_cursor back for the next page.
+interface BookingPage {
+  items: BookingRequest[];
+  next_cursor: string | null;
+}
+
+// Where a failure screenshot lives in the artifact store; the image itself comes from
+// GET /api/bookings/{id}/screenshot. Older jobs carry an inline data URL instead.
+interface ArtifactRef {
+  key: string;
+  content_type: string;
+  bytes: number;
+  captured_at: string;
+}
+
+// GET /api/bookings/{id}: the full job, including fields the list leaves out.
+interface BookingDetail extends BookingRequest {
+  error_screenshot?: ArtifactRef | string;
+  error_thumbnail?: string;
+}
+
 // --- Auth Components ---
 
 const LoginScreen = () => {
@@ -492,7 +520,7 @@ const StatusBadge = ({ status }: { status: string }) => {
   );
 };
 
-const BookingTable = ({ bookings, emptyMessage, onCancel }: { bookings: BookingRequest[], emptyMessage: string, onCancel: (id: string) => void }) => (
+const BookingTable = ({ bookings, emptyMessage, onCancel, onViewDetails, hasMore, isLoadingMore, onLoadMore }: { bookings: BookingRequest[], emptyMessage: string, onCancel: (id: string) => void, onViewDetails: (id: string) => void, hasMore: boolean, isLoadingMore: boolean, onLoadMore: () => void }) => (
   <div className="bg-white rounded-3xl border border-slate-200 shadow-xl shadow-slate-200/50 overflow-hidden animate-in fade-in slide-in-from-bottom-5 duration-300">
     <div className="overflow-x-auto">
       <table className="w-full text-sm text-left border-collapse">
@@ -529,7 +557,9 @@ const BookingTable = ({ bookings, emptyMessage, onCancel }: { bookings: BookingR
                 <StatusBadge status={booking.status} />
               </td>
               <td className="px-8 py-5 text-slate-500 font-medium text-xs hidden md:table-cell max-w-[200px] truncate">
-                {booking.result_log || `Releases: ${new Date(booking.release_time).toLocaleString()}`}
+                {booking.result_log
+                  || (booking.status === 'RUNNING' && booking.progress && (PHASE_LABELS[booking.progress.phase] || booking.progress.phase))
+                  || `Releases: ${new Date(booking.release_time).toLocaleString()}`}
               </td>
               <td className="px-8 py-5">
                 {booking.status === 'PENDING' && (
@@ -541,6 +571,15 @@ const BookingTable = ({ bookings, emptyMessage, onCancel }: { bookings: BookingR
                     <span>Cancel</span>
                   </button>
                 )}
+                {booking.status === 'FAILED' && (
+                  <button 
+                    onClick={() => onViewDetails(booking.id)}
+                    className="p-2 bg-slate-50 hover:bg-slate-100 text-slate-600 hover:text-slate-700 rounded-xl transition-all font-semibold text-xs flex items-center gap-1.5 border border-slate-200/50 shadow-sm"
+                  >
+                    <Eye className="w-4 h-4" />
+                    <span>Details</span>
+                  </button>
+                )}
               </td>
             </tr>
           ))}
@@ -559,10 +598,111 @@ const BookingTable = ({ bookings, emptyMessage, onCancel }: { bookings: BookingR
         </tbody>
       </table>
     </div>
+    {hasMore && (
+      <div className="border-t border-slate-100 p-4 flex justify-center">
+        <button
+          onClick={onLoadMore}
+          disabled={isLoadingMore}
+          className="px-5 py-2 bg-slate-50 hover:bg-slate-100 text-slate-600 rounded-xl transition-all font-semibold text-xs border border-slate-200/50 shadow-sm disabled:opacity-50"
+        >
+          {isLoadingMore ? 'Loading...' : 'Load older jobs'}
+        </button>
+      </div>
+    )}
   </div>
 );
 
-const Dashboard = ({ bookings, isLoading, isSyncing, onCancel }: { bookings: BookingRequest[], isLoading: boolean, isSyncing: boolean, onCancel: (id: string) => void }) => {
+const BookingDetailModal = ({ jobId, onClose }: { jobId: string | null; onClose: () => void }) => {
+  const [detail, setDetail] = useState<BookingDetail | null>(null);
+  const [screenshotUrl, setScreenshotUrl] = useState<string | null>(null);
+  const [error, setError] = useState<string | null>(null);
+
+  // Fetched on demand: the list never carries screenshots.
+  useEffect(() => {
+    setDetail(null);
+    setScreenshotUrl(null);
+    setError(null);
+    if (!jobId || !auth.currentUser) return;
+    let cancelled = false;
+    let objectUrl: string | null = null;
+    (async () => {
+      try {
+        const token = await auth.currentUser!.getIdToken();
+        const res = await fetch(`${API_URL}/bookings/${jobId}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) throw new Error((await res.json()).detail || "Failed to load job details.");
+        const data: BookingDetail = await res.json();
+        if (cancelled) return;
+        setDetail(data);
+        if (typeof data.error_screenshot === 'string') {
+          setScreenshotUrl(data.error_screenshot);
+        } else if (data.error_screenshot) {
+          // The thumbnail shows straight away; the full image needs the auth header, so fetch it as a blob.
+          const img = await fetch(`${API_URL}/bookings/${jobId}/screenshot`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+          });
+          if (img.ok && !cancelled) {
+            objectUrl = URL.createObjectURL(await img.blob());
+            setScreenshotUrl(objectUrl);
+          }
+        }
+      } catch (err: any) {
+        if (!cancelled) setError(err.message || "Failed to load job details.");
+      }
+    })();
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [jobId]);
+
+  if (!jobId) return null;
+
+  return (
+    <div className="fixed inset-0 bg-slate-950/70 backdrop-blur-md flex items-center justify-center z-50 p-4">
+      <div className="bg-white rounded-3xl w-full max-w-3xl overflow-hidden border border-slate-100 shadow-2xl animate-in fade-in zoom-in-95 duration-200">
+        <div className="bg-slate-900 p-6 text-white flex justify-between items-center border-b border-slate-800">
+          <div className="flex items-center gap-2">
+            <AlertCircle className="w-5 h-5 text-red-400" />
+            <span className="font-bold text-lg">{detail?.course_name || 'Job Details'}</span>
+          </div>
+          <button 
+            onClick={onClose}
+            className="p-1 hover:bg-slate-800 rounded-lg text-slate-400 transition-colors"
+          >
+            <X className="w-5 h-5" />
+          </button>
+        </div>
+
+        <div className="p-6 space-y-4 max-h-[75vh] overflow-y-auto">
+          {error && (
+            <div className="bg-red-50 border border-red-200 text-red-700 p-4 rounded-xl text-xs font-semibold">
+              {error}
+            </div>
+          )}
+          {!detail && !error && (
+            <div className="flex justify-center py-12">
+              <div className="w-8 h-8 border-4 border-emerald-500 border-t-transparent rounded-full animate-spin"></div>
+            </div>
+          )}
+          {detail && (
+            <>
+              <p className="text-sm text-slate-600 font-medium whitespace-pre-wrap">{detail.result_log || 'No result recorded.'}</p>
+              {detail.error_screenshot ? (
+                <img src={screenshotUrl || detail.error_thumbnail} alt="Page at the time of failure" className="w-full rounded-xl border border-slate-200" />
+              ) : (
+                <p className="text-xs text-slate-400 font-medium">No screenshot was captured for this job.</p>
+              )}
+            </>
+          )}
+        </div>
+      </div>
+    </div>
+  );
+};
+
+const Dashboard = ({ bookings, isLoading, isSyncing, onCancel, onViewDetails, hasMore, isLoadingMore, onLoadMore }: { bookings: BookingRequest[], isLoading: boolean, isSyncing: boolean, onCancel: (id: string) => void, onViewDetails: (id: string) => void, hasMore: boolean, isLoadingMore: boolean, onLoadMore: () => void }) => {
   // Only display full screen spinner on first load if we don't have bookings in cache
   if (isLoading && bookings.length === 0) return (
     <div className="flex flex-col items-center justify-center h-64 space-y-4">
@@ -602,7 +742,7 @@ const Dashboard = ({ bookings, isLoading, isSyncing, onCancel }: { bookings: Boo
       <div className="px-1 py-2">
         <h3 className="text-xl font-bold text-slate-900 mb-4">Active & Recent Jobs</h3>
       </div>
-      <BookingTable bookings={bookings} emptyMessage="No active bookings. Deploy a seeker!" onCancel={onCancel} />
+      <BookingTable bookings={bookings} emptyMessage="No active bookings. Deploy a seeker!" onCancel={onCancel} onViewDetails={onViewDetails} hasMore={hasMore} isLoadingMore={isLoadingMore} onLoadMore={onLoadMore} />
     </div>
   );
 };
@@ -1048,8 +1188,16 @@ const App = () => {
   const [isProfileOpen, setIsProfileOpen] = useState(false);
   
   const [bookings, setBookings] = useState<BookingRequest[]>([]);
+  // Pages past the first, loaded on demand; polling only refreshes the first page.
+  const [olderBookings, setOlderBookings] = useState<BookingRequest[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [detailJobId, setDetailJobId] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [isSyncing, setIsSyncing] = useState(false);
+  // The polling interval closes over the first render's state, so read older pages through a ref.
+  const olderBookingsRef = useRef<BookingRequest[]>([]);
+  olderBookingsRef.current = olderBookings;
 
   // 1. Authenticate & Profile listener
   useEffect(() => {
@@ -1078,6 +1226,8 @@ const App = () => {
       } else {
         setProfile(null);
         setBookings([]);
+        setOlderBookings([]);
+        setNextCursor(null);
       }
       setAuthLoading(false);
     });
@@ -1101,7 +1251,10 @@ const App = () => {
         }
       });
       if (res.ok) {
-        setBookings(await res.json());
+        const page: BookingPage = await res.json();
+        setBookings(page.items);
+        // Once older pages are loaded, keep paging from where they left off.
+        if (olderBookingsRef.current.length === 0) setNextCursor(page.next_cursor);
       }
     } catch (err) {
       console.warn("Retrying connection to API...");
@@ -1111,15 +1264,120 @@ const App = () => {
     }
   };
 
-  // 3. Setup background polling if user is logged in
-  useEffect(() => {
-    if (user && profile && !profile.firstLogin) {
-      fetchData(false);
-      const interval = setInterval(() => {
-        fetchData(true);
-      }, 10000); // Poll silently every 10 seconds
-      return () => clearInterval(interval);
+  const loadMoreBookings = async () => {
+    if (!auth.currentUser || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const token = await auth.currentUser.getIdToken();
+      const res = await fetch(`${API_URL}/bookings?cursor=${encodeURIComponent(nextCursor)}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      if (res.ok) {
+        const page: BookingPage = await res.json();
+        setOlderBookings(prev => [...prev, ...page.items]);
+        setNextCursor(page.next_cursor);
+      }
+    } catch (err) {
+      console.warn("Failed to load older bookings.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Apply one server-sent event from /api/bookings/stream to the loaded lists.
+  const applyStreamEvent = (block: string) => {
+    let event = 'message';
+    let data = '';
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event: ')) event = line.slice(7);
+      else if (line.startsWith('data: ')) data += line.slice(6);
     }
+    if (!data) return; // keep-alive comment
+    const payload = JSON.parse(data);
+
+    if (event === 'snapshot') {
+      // Sent on (re)connect: refresh what's loaded and pick up jobs created meanwhile.
+      const items: BookingRequest[] = payload.items;
+      const byId = new Map(items.map(item => [item.id, item]));
+      const refresh = (list: BookingRequest[]) => list.map(b => byId.has(b.id) ? { ...b, ...byId.get(b.id)! } : b);
+      setBookings(prev => {
+        const newest = prev[0]?.created_at || '';
+        const created = items.filter(item => item.created_at > newest && !prev.some(b => b.id === item.id));
+        return [...created, ...refresh(prev)];
+      });
+      setOlderBookings(refresh);
+    } else if (event === 'added') {
+      setBookings(prev => prev.some(b => b.id === payload.item.id) ? prev : [payload.item, ...prev]);
+    } else if (event === 'changed') {
+      const merge = (list: BookingRequest[]) => list.map(b => b.id === payload.id ? { ...b, ...payload.fields } : b);
+      setBookings(merge);
+      setOlderBookings(merge);
+    } else if (event === 'removed') {
+      // Deleted, or aged out of the server's watch window (which is larger than the first page).
+      setBookings(prev => prev.filter(b => b.id !== payload.id));
+    } else if (event === 'error') {
+      // The server's listener failed; it closes the stream next and we poll until reconnected.
+      console.warn(`Live updates: ${payload.message}`);
+    }
+  };
+
+  // 3. Live updates while logged in: stream job changes, falling back to polling while the stream is down
+  useEffect(() => {
+    if (!(user && profile && !profile.firstLogin)) return;
+    fetchData(false);
+
+    const controller = new AbortController();
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      if (!pollTimer) pollTimer = setInterval(() => fetchData(true), 10000); // Poll silently every 10 seconds
+    };
+    const stopPolling = () => {
+      if (pollTimer) clearInterval(pollTimer);
+      pollTimer = null;
+    };
+
+    (async () => {
+      let retryDelay = 1000;
+      while (!controller.signal.aborted) {
+        try {
+          if (!auth.currentUser) return;
+          const token = await auth.currentUser.getIdToken();
+          // fetch rather than EventSource, which can't send the Authorization header
+          const res = await fetch(`${API_URL}/bookings/stream`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+            signal: controller.signal,
+          });
+          if (!res.ok || !res.body) throw new Error(`Stream unavailable (${res.status})`);
+          stopPolling();
+          retryDelay = 1000;
+          const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = '';
+          while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+              applyStreamEvent(buffer.slice(0, boundary));
+              buffer = buffer.slice(boundary + 2);
+            }
+          }
+        } catch (err) {
+          if (controller.signal.aborted) return;
+          console.warn("Live updates disconnected; polling until reconnected.");
+        }
+        startPolling();
+        await new Promise(resolve => setTimeout(resolve, retryDelay));
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    })();
+
+    return () => {
+      controller.abort();
+      stopPolling();
+    };
   }, [user, profile]);
 
   const handleLogout = async () => {
@@ -1237,7 +1495,16 @@ const App = () => {
         {/* Dashboard / Request Area */}
         <div className="p-6 md:p-12">
           {activeTab === 'dashboard' && (
-            <Dashboard bookings={bookings} isLoading={loading} isSyncing={isSyncing} onCancel={handleCancelBooking} />
+            <Dashboard
+              bookings={[...bookings, ...olderBookings.filter(b => !bookings.some(f => f.id === b.id))]}
+              isLoading={loading}
+              isSyncing={isSyncing}
+              onCancel={handleCancelBooking}
+              onViewDetails={setDetailJobId}
+              hasMore={nextCursor !== null}
+              isLoadingMore={loadingMore}
+              onLoadMore={loadMoreBookings}
+            />
           )}
           {activeTab === 'new-request' && (
             <NewRequestForm onSubmit={handleNewBooking} />
@@ -1247,6 +1514,7 @@ const App = () => {
 
       {/* Account Settings modal */}
       <ProfileModal isOpen={isProfileOpen} onClose={() => setIsProfileOpen(false)} />
+      <BookingDetailModal jobId={detailJobId} onClose={() => setDetailJobId(null)} />
     </div>
   );
 };